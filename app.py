@@ -1,11 +1,14 @@
 import os
 import sys
+import hmac
 import logging
-from flask import Flask, render_template, jsonify
+import threading
+from flask import Flask, render_template, jsonify, request, abort, appcontext_pushed
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
+from utils.tracing import TRACER, read_slowest_traces
 
 # Configure logging
 logging.basicConfig(
@@ -56,16 +59,65 @@ db.init_app(app)
 # Create necessary templates directory and basic template if it doesn't exist
 os.makedirs('templates', exist_ok=True)
 
-# Create tables
-try:
-    with app.app_context():
-        # Import models here to avoid circular imports
-        import models
-        logger.info("Creating database tables")
-        db.create_all()
-        logger.info("Database tables created successfully")
-except Exception as e:
-    logger.error(f"Error creating database tables: {e}")
+# Schema creation is deferred until the database is first used, so importing
+# this module stays cheap and doesn't hang when the database is slow to answer
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "true").lower() not in ("0", "false", "no")
+_schema_lock = threading.RLock()
+_schema_ready = False
+# Set while this thread creates the schema, whose own app context push comes back through here
+_schema_local = threading.local()
+
+def ensure_schema(force=False):
+    """Create missing tables and indexes, once per process
+    
+    Called automatically the first time an app context is pushed unless
+    AUTO_MIGRATE is off, and explicitly by `python create_db.py`.
+    
+    Returns:
+        bool: True if the schema is in place, False if creating it failed
+    """
+    global _schema_ready
+    
+    if _schema_ready and not force:
+        return True
+    
+    with _schema_lock:
+        if _schema_ready and not force:
+            return True
+        if getattr(_schema_local, "creating", False):
+            # Re-entered from the app context pushed below; other threads wait on the lock
+            return True
+        
+        _schema_local.creating = True
+        try:
+            with app.app_context():
+                # Import models here to avoid circular imports
+                import models
+                logger.info("Creating database tables")
+                db.create_all()
+                
+                # create_all skips tables that already exist, so add any indexes they are missing
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(bind=db.engine, checkfirst=True)
+                logger.info("Database tables created successfully")
+            
+            # Only now may other threads skip the lock
+            _schema_ready = True
+            return True
+        except Exception as e:
+            # Try again on the next use rather than running without tables
+            logger.error(f"Error creating database tables: {e}")
+            return False
+        finally:
+            _schema_local.creating = False
+
+def _schema_on_first_use(sender, **kwargs):
+    if not _schema_ready:
+        ensure_schema()
+
+if AUTO_MIGRATE:
+    appcontext_pushed.connect(_schema_on_first_use, app)
 
 # Home route
 @app.route('/')
@@ -87,6 +139,17 @@ def status():
             'message': str(e)
         })
 
+# Slowest sampled bot traces, read from the bot's trace export file
+@app.route('/api/traces')
+def traces():
+    token = os.environ.get("DEBUG_TOKEN")
+    given = request.headers.get("X-Debug-Token") or request.args.get("token")
+    if not token or not given or not hmac.compare_digest(given, token):
+        abort(404)
+    
+    limit = min(100, request.args.get("limit", 20, type=int))
+    return jsonify(read_slowest_traces(TRACER.export_path, limit))
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
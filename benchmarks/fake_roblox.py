@@ -0,0 +1,109 @@
+"""
+Local stand-in for the Roblox web API
+
+Serves utils.roblox_fake.FakeRobloxBackend over HTTP, so the real request
+path of RobloxAPI (sessions, TLS setup, JSON decoding) is exercised too.
+Latency, server errors and 429 rate limiting can be injected so benchmarks
+see the same failure modes as the real API without touching the network.
+
+Point a client at it with RobloxAPI(api_root=server.url) or by setting
+ROBLOX_API_ROOT before the bot starts.
+
+Usage:
+    python -m benchmarks.fake_roblox [--port 8765] [--latency 50] [--error-rate 0.01]
+"""
+
+import asyncio
+import argparse
+
+from aiohttp import web
+
+from utils.roblox_fake import FakeRobloxBackend
+
+class FakeRobloxServer:
+    """HTTP front for a FakeRobloxBackend"""
+    
+    def __init__(self, backend=None, **backend_options):
+        self.backend = backend or FakeRobloxBackend(**backend_options)
+        self.runner = None
+        self.url = None
+    
+    @property
+    def stats(self):
+        return self.backend.stats
+    
+    async def handle(self, request):
+        data = None
+        if request.can_read_body:
+            try:
+                data = await request.json()
+            except ValueError:
+                data = None
+        
+        response = await self.backend.request(
+            request.method,
+            str(request.url),
+            data=data,
+            params=dict(request.query),
+            headers=request.headers
+        )
+        return web.json_response(response.data, status=response.status, headers=response.headers)
+    
+    def make_app(self):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        return app
+    
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving; port 0 picks a free port. Returns the base URL"""
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+    
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+async def serve(args):
+    server = FakeRobloxServer(
+        user_count=args.users,
+        group_count=args.groups,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    url = await server.start(args.host, args.port)
+    print(f"Fake Roblox API listening on {url} (set ROBLOX_API_ROOT={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local Roblox API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=1000000, help="Number of generated users")
+    parser.add_argument("--groups", type=int, default=10000, help="Number of generated groups")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the generated data")
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Gateway event load simulator
+
+Feeds synthetic member joins, messages and raw reaction events through a
+real commands.Bot dispatcher into ModerationCommands (and so ModerationSystem)
+and ReactionActionsCog, at a configurable rate. The guild, its members and
+channels are simulated, and every Discord REST call they make goes through a
+latency model with per-route rate-limit buckets, so handlers wait the way
+they would against Discord.
+
+Reports handler latency per listener, events dropped (handlers that errored,
+missed the deadline or never finished), event-loop lag and memory growth,
+as JSON for comparison across commits.
+
+Usage:
+    python -m benchmarks.gateway_sim [--joins 10000] [--messages 20000] [--reactions 5000]
+        [--duration 60] [--rest-latency 80] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from collections import deque
+
+import discord
+from discord.ext import commands
+
+from benchmarks.roblox_load import StaticConfig, git_commit, percentile
+
+# Snowflake ranges for the simulated objects
+GUILD_ID = 910000000000000001
+BOT_USER_ID = 910000000000000002
+ID_BASE = 920000000000000000
+
+# Rate-limit buckets as (requests, per seconds), close to Discord's
+REST_BUCKETS = {
+    "send_message": (5, 5.0),
+    "edit_message": (5, 5.0),
+    "get_message": (50, 1.0),
+    "delete_message": (5, 1.0),
+    "pin_message": (5, 5.0),
+    "remove_reaction": (1, 0.25),
+    "dm": (5, 5.0),
+    "create_channel": (10, 10.0),
+    "moderate_member": (10, 10.0)
+}
+
+class SimulatedRest:
+    """Latency model for Discord REST calls, with per-route buckets"""
+    
+    def __init__(self, latency, jitter, rng):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng
+        self.calls = {}
+        self.rate_limit_waits = 0
+        self.rate_limit_wait_seconds = 0.0
+        # (route, major ID) -> recent request times
+        self._windows = {}
+    
+    async def request(self, route, major_id=None):
+        limit, per = REST_BUCKETS.get(route, (50, 1.0))
+        window = self._windows.setdefault((route, major_id), deque())
+        
+        # Wait for room in the bucket, like discord.py's HTTP client does
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while window and now - window[0] >= per:
+                window.popleft()
+            if len(window) < limit:
+                break
+            wait = window[0] + per - now
+            self.rate_limit_waits += 1
+            self.rate_limit_wait_seconds += wait
+            await asyncio.sleep(wait)
+        window.append(loop.time())
+        
+        self.calls[route] = self.calls.get(route, 0) + 1
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+
+class SimulatedRole:
+    def __init__(self, role_id, name, position, permissions):
+        self.id = role_id
+        self.name = name
+        self.position = position
+        self.permissions = permissions
+        self.mention = f"<@&{role_id}>"
+    
+    def __lt__(self, other):
+        return self.position < other.position
+    
+    def __le__(self, other):
+        return self.position <= other.position
+
+class SimulatedMember:
+    def __init__(self, member_id, guild, roles, bot=False):
+        self.id = member_id
+        self.name = f"user{member_id % 1000000}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+        self.guild = guild
+        self.roles = roles
+        self.bot = bot
+        self.guild_permissions = discord.Permissions(sum(role.permissions.value for role in roles))
+    
+    def __str__(self):
+        return self.name
+    
+    @property
+    def top_role(self):
+        return max(self.roles)
+    
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest.request("dm", self.id)
+    
+    async def kick(self, reason=None):
+        await self.guild.rest.request("moderate_member", self.guild.id)
+        self.guild.members.pop(self.id, None)
+    
+    async def timeout(self, until, reason=None):
+        await self.guild.rest.request("moderate_member", self.guild.id)
+    
+    async def add_roles(self, *roles, reason=None):
+        await self.guild.rest.request("moderate_member", self.guild.id)
+
+class SimulatedMessage:
+    def __init__(self, message_id, channel, author=None, content="", embeds=None):
+        self.id = message_id
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+    
+    async def fetch(self):
+        await self.guild.rest.request("get_message", self.channel.id)
+        return self.channel.messages.get(self.id, self)
+    
+    async def edit(self, **kwargs):
+        await self.guild.rest.request("edit_message", self.channel.id)
+    
+    async def pin(self):
+        await self.guild.rest.request("pin_message", self.channel.id)
+    
+    async def delete(self):
+        await self.guild.rest.request("delete_message", self.channel.id)
+        self.channel.messages.pop(self.id, None)
+    
+    async def remove_reaction(self, emoji, member):
+        await self.guild.rest.request("remove_reaction", self.channel.id)
+
+class SimulatedChannel:
+    def __init__(self, channel_id, name, guild):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.mention = f"<#{channel_id}>"
+        self.messages = {}
+        self.sent = 0
+    
+    async def send(self, content=None, embed=None, delete_after=None, **kwargs):
+        await self.guild.rest.request("send_message", self.id)
+        self.sent += 1
+    
+    def get_partial_message(self, message_id):
+        return SimulatedMessage(message_id, self)
+
+class SimulatedCategory:
+    def __init__(self, category_id, name, guild):
+        self.id = category_id
+        self.name = name
+        self.guild = guild
+        self.channels = []
+    
+    async def create_text_channel(self, name, overwrites=None, topic=None):
+        await self.guild.rest.request("create_channel", self.guild.id)
+        channel = self.guild.add_channel(name)
+        self.channels.append(channel)
+        return channel
+
+class SimulatedGuild:
+    """Guild with members, channels and roles, backed by SimulatedRest"""
+    
+    def __init__(self, guild_id, rest):
+        self.id = guild_id
+        self.name = "Simulated Guild"
+        self.rest = rest
+        self.members = {}
+        self.channels = {}
+        self.categories = []
+        self._next_id = ID_BASE
+        
+        self.default_role = SimulatedRole(guild_id, "@everyone", 0, discord.Permissions.none())
+        self.moderator_role = SimulatedRole(self.new_id(), "Moderator", 5, discord.Permissions(manage_messages=True))
+        self.roles = [self.default_role, self.moderator_role]
+        
+        self.owner_id = self.new_id()
+        self.me = SimulatedMember(BOT_USER_ID, self, [self.default_role], bot=True)
+    
+    def new_id(self):
+        self._next_id += 1
+        return self._next_id
+    
+    def add_member(self, moderator=False):
+        roles = [self.default_role, self.moderator_role] if moderator else [self.default_role]
+        member = SimulatedMember(self.new_id(), self, roles)
+        self.members[member.id] = member
+        return member
+    
+    def add_channel(self, name):
+        channel = SimulatedChannel(self.new_id(), name, self)
+        self.channels[channel.id] = channel
+        return channel
+    
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+    
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+    
+    def get_channel_or_thread(self, channel_id):
+        return self.channels.get(channel_id)
+    
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+    
+    async def create_category(self, name):
+        await self.rest.request("create_channel", self.id)
+        category = SimulatedCategory(self.new_id(), name, self)
+        self.categories.append(category)
+        return category
+    
+    async def ban(self, member, reason=None, delete_message_days=0):
+        await self.rest.request("moderate_member", self.id)
+        self.members.pop(member.id, None)
+
+class HandlerRecorder:
+    """Times every listener task from dispatch to completion"""
+    
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.latencies = {}
+        self.late = {}
+        self.errors = {}
+        self.pending = set()
+    
+    def track(self, name, task):
+        dispatched_at = time.perf_counter()
+        self.pending.add(task)
+        
+        def done(task):
+            self.pending.discard(task)
+            if task.cancelled():
+                return
+            latency = time.perf_counter() - dispatched_at
+            self.latencies.setdefault(name, []).append(latency)
+            if latency > self.deadline:
+                self.late[name] = self.late.get(name, 0) + 1
+        
+        task.add_done_callback(done)
+    
+    def summary(self):
+        handlers = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            handlers[name] = {
+                "completed": len(latencies),
+                "errors": self.errors.get(name, 0),
+                "late": self.late.get(name, 0),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+                "max_ms": round(latencies[-1] * 1000, 3)
+            }
+        return handlers
+
+class SimulatedGatewayBot(commands.Bot):
+    """Bot whose gateway is the simulator: no login, local guild, timed listeners"""
+    
+    def __init__(self, guild, recorder):
+        super().__init__(command_prefix="!", intents=discord.Intents.default())
+        self.guild = guild
+        self.recorder = recorder
+        self._user = guild.me
+    
+    @property
+    def user(self):
+        return self._user
+    
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+    
+    def get_channel(self, channel_id):
+        return self.guild.get_channel(channel_id)
+    
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.recorder.track(getattr(coro, "__qualname__", event_name), task)
+        return task
+    
+    async def on_message(self, message):
+        # Prefix commands aren't part of the simulation; the cogs' listeners still run
+        pass
+    
+    async def on_error(self, event_method, *args, **kwargs):
+        self.recorder.errors[event_method] = self.recorder.errors.get(event_method, 0) + 1
+
+def build_timeline(args, rng):
+    """Spread each kind of event randomly over the run, sorted by time"""
+    timeline = []
+    for kind, count in (("join", args.joins), ("message", args.messages), ("reaction", args.reactions)):
+        timeline.extend((rng.uniform(0, args.duration), kind) for _ in range(count))
+    timeline.sort()
+    return timeline
+
+def state_sizes(moderation, handler, guild):
+    """Sizes of the per-guild state the handlers keep, to spot unbounded growth"""
+    return {
+        "guild_members": len(guild.members),
+        "recent_join_timestamps": sum(len(joins) for joins in moderation.recent_joins.values()),
+        "recent_message_authors": sum(len(authors) for authors in moderation.recent_messages.values()),
+        "recent_message_timestamps": sum(
+            len(timestamps) for authors in moderation.recent_messages.values() for timestamps in authors.values()
+        ),
+        "recent_action_users": sum(len(users) for users in moderation.recent_actions.values()),
+        "reaction_debounce_entries": len(handler._recent_actions),
+        "registered_reaction_messages": len(handler.active_messages)
+    }
+
+async def simulate(args):
+    from cogs.moderation_commands import ModerationCommands
+    from cogs.reaction_actions_cog import ReactionActionsCog
+    from utils.loop_monitor import MONITOR
+    
+    rng = random.Random(args.seed)
+    rest = SimulatedRest(args.rest_latency / 1000, args.rest_jitter / 1000, rng)
+    guild = SimulatedGuild(GUILD_ID, rest)
+    log_channel = guild.add_channel("mod-log")
+    chat_channels = [guild.add_channel(f"chat-{i}") for i in range(args.channels)]
+    
+    authors = [guild.add_member() for _ in range(args.members)]
+    moderators = [guild.add_member(moderator=True) for _ in range(args.moderators)]
+    spammers = authors[:max(1, int(len(authors) * args.spammer_fraction))]
+    
+    recorder = HandlerRecorder(args.deadline)
+    bot = SimulatedGatewayBot(guild, recorder)
+    bot.config = StaticConfig({str(GUILD_ID): {"log_channel": str(log_channel.id)}})
+    
+    async with bot:
+        moderation_cog = ModerationCommands(bot)
+        await bot.add_cog(moderation_cog)
+        reaction_cog = ReactionActionsCog(bot)
+        await bot.add_cog(reaction_cog)
+        moderation = moderation_cog.moderation
+        handler = reaction_cog.handler
+        
+        if args.antiraid:
+            await moderation.setup_anti_raid(guild)
+        
+        # Reaction panels: approval requests and reported messages for moderators
+        panels = []
+        for i in range(args.panels):
+            channel = rng.choice(chat_channels)
+            author = rng.choice(authors)
+            message = SimulatedMessage(guild.new_id(), channel, author, "Please review", [discord.Embed(title="Request")])
+            channel.messages[message.id] = message
+            action_type, emojis = ("approval", ["✅", "❌"]) if i % 2 else ("moderation", ["⚠️", "📌"])
+            handler.register_message(message.id, channel.id, author.id, guild.id, action_type, emojis)
+            panels.append((message, emojis, action_type))
+        
+        timeline = build_timeline(args, rng)
+        
+        MONITOR.start()
+        if args.trace_memory:
+            tracemalloc.start()
+            memory_before = tracemalloc.take_snapshot()
+        sizes_before = state_sizes(moderation, handler, guild)
+        
+        dispatched = {"join": 0, "message": 0, "reaction": 0}
+        max_behind = 0.0
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        
+        for at, kind in timeline:
+            delay = started_at + at - loop.time()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+            else:
+                max_behind = max(max_behind, -delay)
+            
+            if kind == "join":
+                bot.dispatch("member_join", guild.add_member())
+            elif kind == "message":
+                author = rng.choice(spammers) if rng.random() < args.spam_rate else rng.choice(authors)
+                channel = rng.choice(chat_channels)
+                bot.dispatch("message", SimulatedMessage(guild.new_id(), channel, author, "hello"))
+            else:
+                if panels and rng.random() >= args.noise_reactions:
+                    message, emojis, action_type = rng.choice(panels)
+                    reactor = rng.choice(moderators) if action_type == "moderation" or rng.random() < 0.5 else rng.choice(authors)
+                    emoji, message_id, channel_id = rng.choice(emojis), message.id, message.channel.id
+                else:
+                    reactor = rng.choice(authors)
+                    emoji, message_id, channel_id = "👍", guild.new_id(), rng.choice(chat_channels).id
+                payload = discord.RawReactionActionEvent(
+                    {"message_id": message_id, "channel_id": channel_id, "user_id": reactor.id,
+                     "guild_id": guild.id, "type": 0},
+                    discord.PartialEmoji(name=emoji),
+                    "REACTION_ADD"
+                )
+                payload.member = reactor
+                bot.dispatch("raw_reaction_add", payload)
+            dispatched[kind] += 1
+        
+        schedule_seconds = loop.time() - started_at
+        
+        # Give queued handlers a chance to finish, then count the rest as dropped
+        drain_started_at = loop.time()
+        while recorder.pending and loop.time() - drain_started_at < args.drain:
+            await asyncio.sleep(0.05)
+        unfinished = len(recorder.pending)
+        for task in list(recorder.pending):
+            task.cancel()
+        await asyncio.sleep(0)
+        
+        MONITOR.stop()
+        memory = {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+        if args.trace_memory:
+            memory_after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            growth = memory_after.compare_to(memory_before, "lineno")
+            memory.update({
+                "traced_current_kb": round(current / 1024, 1),
+                "traced_peak_kb": round(peak / 1024, 1),
+                "growth_kb": round(sum(stat.size_diff for stat in growth) / 1024, 1),
+                "top_growth": [
+                    {"location": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1)}
+                    for stat in growth[:args.top]
+                ]
+            })
+            tracemalloc.stop()
+        
+        handlers = recorder.summary()
+        late = sum(summary["late"] for summary in handlers.values())
+        errors = sum(recorder.errors.values())
+        
+        return {
+            "dispatched": dispatched,
+            "schedule_seconds": round(schedule_seconds, 3),
+            "max_behind_schedule_ms": round(max_behind * 1000, 3),
+            "dropped": {
+                "total": unfinished + late + errors,
+                "unfinished": unfinished,
+                "past_deadline": late,
+                "errors": errors
+            },
+            "handlers": handlers,
+            "suppressed_duplicate_reactions": handler.suppressed_duplicates,
+            "rest": {
+                "calls": rest.calls,
+                "rate_limit_waits": rest.rate_limit_waits,
+                "rate_limit_wait_seconds": round(rest.rate_limit_wait_seconds, 3)
+            },
+            "event_loop": MONITOR.report(args.top),
+            "state_before": sizes_before,
+            "state_after": state_sizes(moderation, handler, guild),
+            "memory": memory
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate gateway event load against the moderation and reaction cogs")
+    parser.add_argument("--joins", type=int, default=10000, help="Member joins to dispatch")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages to dispatch")
+    parser.add_argument("--reactions", type=int, default=5000, help="Raw reaction adds to dispatch")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to spread the events over")
+    parser.add_argument("--members", type=int, default=5000, help="Existing members who send messages and react")
+    parser.add_argument("--moderators", type=int, default=10, help="Members with the moderator role")
+    parser.add_argument("--channels", type=int, default=20, help="Chat channels")
+    parser.add_argument("--panels", type=int, default=200, help="Messages registered for reaction actions")
+    parser.add_argument("--noise-reactions", type=float, default=0.8, help="Fraction of reactions on unregistered messages")
+    parser.add_argument("--spammer-fraction", type=float, default=0.01, help="Fraction of members who spam")
+    parser.add_argument("--spam-rate", type=float, default=0.2, help="Fraction of messages sent by spammers")
+    parser.add_argument("--no-antiraid", dest="antiraid", action="store_false", help="Leave anti-raid detection off")
+    parser.add_argument("--rest-latency", type=float, default=80.0, help="Mean Discord REST latency in ms")
+    parser.add_argument("--rest-jitter", type=float, default=30.0, help="REST latency standard deviation in ms")
+    parser.add_argument("--deadline", type=float, default=3.0, help="Seconds after which a handler counts as dropped")
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for handlers after the last event")
+    parser.add_argument("--top", type=int, default=5, help="Entries in the memory growth and loop handler tables")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="Skip tracemalloc, which slows the run down")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own log output")
+    args = parser.parse_args()
+    
+    # The reaction handler keeps its state under ./data, so run in a scratch directory
+    scratch = tempfile.TemporaryDirectory(prefix="gateway_sim_")
+    original_cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.chdir(scratch.name)
+    
+    # The cogs configure logging on import, so quieten it afterwards
+    import cogs.reaction_actions_cog  # noqa: F401
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+    
+    try:
+        results = asyncio.run(simulate(args))
+    finally:
+        os.chdir(original_cwd)
+        scratch.cleanup()
+    
+    report = {
+        "benchmark": "gateway_sim",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "verbose")
+        },
+        **results
+    }
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
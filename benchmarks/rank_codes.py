@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark for rank code matching
+
+Compares VerificationSystem.get_rank_code, as nickname updates call it,
+against the linear scan it used before, over a generated corpus of rank
+names. The matcher alone is timed too, to show what the per-call lookup of
+the server's matcher costs on top of it.
+
+Usage:
+    python -m benchmarks.rank_codes [--size 200000] [--unique 2000] [--seed 1]
+"""
+
+import argparse
+import random
+import time
+
+from utils.rank_codes import DEFAULT_RANK_CODES, RankCodeMatcher
+from utils.verification import VerificationSystem
+
+PREFIXES = ["", "", "", "Senior ", "Junior ", "Acting ", "[HQ] ", "Chief ", "Head "]
+SUFFIXES = ["", "", "", " I", " II", " III", " (Retired)", " | Division A"]
+UNKNOWN_RANKS = ["Guest", "Visitor", "Ambassador", "Honorary", "Affiliate", "Medic", "Pilot", "Engineer"]
+
+# A server's own codes, as /rankcode would store them
+CUSTOM_CODES = {"Medic": "MED", "Pilot": "PLT", "Engineer": "ENG", "Senior Captain": "SCAPT"}
+
+def legacy_get_rank_code(rank_codes, rank_name):
+    """The original linear scan, kept here as the baseline"""
+    if not rank_name:
+        return None
+    
+    if rank_name in rank_codes:
+        return rank_codes[rank_name]
+    
+    for known_rank, code in rank_codes.items():
+        if known_rank.lower() in rank_name.lower() or rank_name.lower() in known_rank.lower():
+            return code
+    
+    if len(rank_name) >= 4:
+        return rank_name[:4].upper()
+    else:
+        return rank_name.upper()
+
+def build_corpus(size, unique, seed):
+    """Build a list of rank names with a realistic amount of repetition"""
+    rng = random.Random(seed)
+    bases = list(DEFAULT_RANK_CODES) + UNKNOWN_RANKS
+    
+    names = set()
+    while len(names) < unique:
+        base = rng.choice(bases)
+        if rng.random() < 0.2:
+            base = base.upper() if rng.random() < 0.5 else base.lower()
+        names.add(f"{rng.choice(PREFIXES)}{base}{rng.choice(SUFFIXES)}")
+    
+    names = sorted(names)
+    return [rng.choice(names) for _ in range(size)], names
+
+def run(label, func, corpus):
+    """Time one implementation over the corpus"""
+    start = time.perf_counter()
+    for rank_name in corpus:
+        func(rank_name)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>10.1f} ms  {elapsed / len(corpus) * 1e9:>8.0f} ns/lookup")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rank code matching")
+    parser.add_argument("--size", type=int, default=200000, help="Number of lookups")
+    parser.add_argument("--unique", type=int, default=2000, help="Number of distinct rank names")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the corpus")
+    args = parser.parse_args()
+    
+    corpus, unique_names = build_corpus(args.size, args.unique, args.seed)
+    print(f"Corpus: {len(corpus)} lookups over {len(unique_names)} distinct rank names\n")
+    
+    legacy = run("legacy linear scan", lambda name: legacy_get_rank_code(DEFAULT_RANK_CODES, name), corpus)
+    
+    # Without memoization every lookup walks the table and pattern
+    cold_matcher = RankCodeMatcher(DEFAULT_RANK_CODES)
+    run("matcher (no memo)", cold_matcher._match, corpus)
+    
+    warm_matcher = RankCodeMatcher(DEFAULT_RANK_CODES)
+    run("matcher (memoized)", warm_matcher.match, corpus)
+    
+    verification_system = VerificationSystem(None)
+    current = run("get_rank_code", verification_system.get_rank_code, corpus)
+    
+    # Server configs are handed out as fresh copies, so every call sees a new dict
+    legacy_custom = run(
+        "legacy scan, custom codes",
+        lambda name: legacy_get_rank_code({**CUSTOM_CODES, **DEFAULT_RANK_CODES}, name),
+        corpus
+    )
+    current_custom = run(
+        "get_rank_code, custom codes",
+        lambda name: verification_system.get_rank_code(name, dict(CUSTOM_CODES)),
+        corpus
+    )
+    
+    print(f"\nget_rank_code speedup: {legacy / current:.1f}x default codes, "
+          f"{legacy_custom / current_custom:.1f}x custom codes")
+    
+    # Report where the longest-match rule changes the result
+    changed = [
+        (name, legacy_get_rank_code(DEFAULT_RANK_CODES, name), cold_matcher._match(name))
+        for name in unique_names
+        if legacy_get_rank_code(DEFAULT_RANK_CODES, name) != cold_matcher._match(name)
+    ]
+    print(f"Changed codes: {len(changed)} of {len(unique_names)} distinct names")
+    for name, old_code, new_code in changed[:10]:
+        print(f"  {name!r}: {old_code} -> {new_code}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the Roblox-facing code paths
+
+Starts the local Roblox stand-in from benchmarks.fake_roblox (or, with
+--in-process, plugs its FakeRobloxBackend straight into RobloxAPI) and drives
+RobloxAPI, BlacklistSystem, VerificationSystem and the /rank command through
+simulated Discord interactions, with the requested latency, error and 429
+rates injected by the server. Nothing leaves the machine: the API client is
+pointed at the local server and the database is a throwaway SQLite file.
+
+Each scenario reports throughput, p50/p95/p99 latency and peak traced
+memory. The report is JSON so runs can be saved per commit and compared.
+
+Usage:
+    python -m benchmarks.roblox_load [--requests 2000] [--concurrency 50] [--latency 40]
+        [--error-rate 0.01] [--rate-limit-rate 0.02] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+import discord
+
+from benchmarks.fake_roblox import FakeRobloxServer
+from utils.roblox_fake import FakeRobloxBackend
+
+SCENARIOS = ["lookup", "group_roles", "blacklist", "verify", "rank"]
+
+# Guild the simulated interactions come from
+GUILD_ID = 900000000000000001
+
+class SimulatedResponse:
+    def __init__(self):
+        self.deferred = False
+    
+    async def defer(self, ephemeral=False, thinking=False):
+        self.deferred = True
+    
+    async def send_message(self, content=None, **kwargs):
+        self.deferred = True
+
+class SimulatedFollowup:
+    def __init__(self):
+        self.messages = []
+    
+    async def send(self, content=None, embed=None, ephemeral=False, **kwargs):
+        self.messages.append({"content": content, "embed": embed, "ephemeral": ephemeral})
+
+class SimulatedMember:
+    def __init__(self, member_id, guild, permissions=None):
+        self.id = member_id
+        self.name = f"member{member_id}"
+        self.display_name = self.name
+        self.guild = guild
+        self.guild_permissions = permissions or discord.Permissions.none()
+
+class SimulatedGuild:
+    def __init__(self, guild_id, owner_id):
+        self.id = guild_id
+        self.owner_id = owner_id
+        self.members = {}
+    
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+    
+    async def fetch_member(self, member_id):
+        member = self.members.get(member_id)
+        if member is None:
+            raise discord.errors.NotFound(_NotFoundResponse(), "Unknown Member")
+        return member
+
+class _NotFoundResponse:
+    status = 404
+    reason = "Not Found"
+
+class SimulatedInteraction:
+    """Just enough of discord.Interaction for a command callback to run"""
+    
+    def __init__(self, guild, user):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.response = SimulatedResponse()
+        self.followup = SimulatedFollowup()
+        self.extras = {}
+
+class StaticConfig:
+    """Server config source for the benchmarked systems"""
+    
+    def __init__(self, server_configs):
+        self.server_configs = server_configs
+    
+    def get_server_config(self, guild_id):
+        return self.server_configs.get(str(guild_id), {})
+
+class SimulatedBot:
+    def __init__(self, config):
+        self.config = config
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(name, operation, count, concurrency, api, trace_memory):
+    """Run operation(i) count times with bounded concurrency and summarise it"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {"ok": 0, "failed": 0, "exceptions": 0}
+    requests_before = api.request_count
+    rate_limited_before = api.rate_limited_count
+    
+    async def timed(i):
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                ok = await operation(i)
+            except Exception:
+                outcomes["exceptions"] += 1
+            else:
+                outcomes["ok" if ok else "failed"] += 1
+            latencies.append(time.perf_counter() - started_at)
+    
+    if trace_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    
+    started_at = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(count)))
+    elapsed = time.perf_counter() - started_at
+    
+    latencies.sort()
+    result = {
+        "operations": count,
+        **outcomes,
+        "seconds": round(elapsed, 4),
+        "throughput_per_second": round(count / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "roblox_requests": api.request_count - requests_before,
+        "roblox_rate_limited": api.rate_limited_count - rate_limited_before
+    }
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        result["peak_memory_kb"] = round((peak - memory_before) / 1024, 1)
+        result["retained_memory_kb"] = round((current - memory_before) / 1024, 1)
+    return name, result
+
+def seed_database(token):
+    """Create the schema and store the ranking token for the benchmark guild"""
+    # Import the database models here to avoid circular imports
+    from app import app, db
+    from models import RobloxToken
+    
+    with app.app_context():
+        db.create_all()
+        RobloxToken.query.filter_by(discord_id=GUILD_ID).delete()
+        db.session.add(RobloxToken(discord_id=GUILD_ID, encrypted_token=token))
+        db.session.commit()
+
+async def run_benchmark(args):
+    from utils.roblox_api import RobloxAPI
+    from utils.blacklist import BlacklistSystem
+    from utils.verification import VerificationSystem
+    from cogs.group_commands import GroupCommands
+    
+    rng = random.Random(args.seed)
+    group_id = rng.randint(1, args.groups)
+    backend = FakeRobloxBackend(
+        seed=args.seed,
+        user_count=args.users,
+        group_count=args.groups,
+        groups_per_user=args.groups_per_user,
+        primary_group_id=group_id,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+    server = FakeRobloxServer(backend)
+    url = None if args.in_process else await server.start()
+    seed_database("bench-token")
+    
+    blacklisted = rng.sample(range(1, args.groups + 1), min(args.blacklisted, args.groups))
+    config = StaticConfig({str(GUILD_ID): {"group_id": str(group_id), "blacklisted_groups": blacklisted}})
+    
+    guild = SimulatedGuild(GUILD_ID, owner_id=1)
+    moderator = SimulatedMember(2, guild, discord.Permissions(manage_roles=True))
+    guild.members[moderator.id] = moderator
+    
+    user_ids = range(1, args.users + 1)
+    rank_names = [role["name"] for role in backend.group_roles(group_id)[:-1]]
+    username = backend.username
+    
+    def group_member():
+        while True:
+            user_id = rng.choice(user_ids)
+            if group_id in backend.memberships(user_id):
+                return user_id
+    
+    results = {}
+    try:
+        # Fresh client per scenario so caches only help within a scenario
+        def fresh_api():
+            api = RobloxAPI(api_root=url)
+            api.backend = backend if args.in_process else None
+            return api
+        
+        if "lookup" in args.scenarios:
+            api = fresh_api()
+            
+            async def lookup(i):
+                user_id = await api.get_user_id_from_username(username(rng.choice(user_ids)))
+                if not user_id:
+                    return False
+                await api.get_user_description(user_id)
+                return True
+            
+            name, results[name] = await run_scenario("lookup", lookup, args.requests, args.concurrency, api, args.trace_memory)
+        
+        if "group_roles" in args.scenarios:
+            api = fresh_api()
+            
+            async def group_roles(i):
+                batch = rng.sample(user_ids, min(args.batch_size, len(user_ids)))
+                roles = await api.get_user_group_roles(batch, group_id, concurrency=args.batch_concurrency)
+                return len(roles) == len(batch)
+            
+            batches = max(1, args.requests // args.batch_size)
+            name, results[name] = await run_scenario("group_roles", group_roles, batches, args.concurrency, api, args.trace_memory)
+        
+        if "blacklist" in args.scenarios:
+            api = fresh_api()
+            blacklist = BlacklistSystem(api, config)
+            
+            async def blacklist_check(i):
+                _, _, message = await blacklist.check_user_blacklisted_groups(GUILD_ID, username(rng.choice(user_ids)))
+                return not message.startswith(("An error", "Could not find"))
+            
+            name, results[name] = await run_scenario("blacklist", blacklist_check, args.requests, args.concurrency, api, args.trace_memory)
+        
+        if "verify" in args.scenarios:
+            api = fresh_api()
+            verification = VerificationSystem(api)
+            
+            async def verify(i):
+                user_id = rng.choice(user_ids)
+                code = verification.generate_verification_code()
+                backend.set_description(user_id, f"Verifying for Discord: {code}")
+                member = SimulatedMember(10_000_000 + i, guild)
+                verified, _ = await verification.verify_user(member, username(user_id), code)
+                return verified
+            
+            name, results[name] = await run_scenario("verify", verify, args.requests, args.concurrency, api, args.trace_memory)
+        
+        if "rank" in args.scenarios:
+            cog = GroupCommands(SimulatedBot(config))
+            api = cog.roblox_api = fresh_api()
+            
+            async def rank(i):
+                interaction = SimulatedInteraction(guild, moderator)
+                await cog.rank.callback(cog, interaction, username(group_member()), rng.choice(rank_names))
+                sent = interaction.followup.messages
+                return bool(sent) and sent[-1]["embed"] is not None and sent[-1]["embed"].title.startswith("Rank Changed")
+            
+            name, results[name] = await run_scenario("rank", rank, args.requests, args.concurrency, api, args.trace_memory)
+    finally:
+        await server.stop()
+    
+    return results, backend.stats
+
+def git_commit():
+    """Current commit of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Roblox-facing code against a local fake API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=2000, help="Operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="Simulated interactions in flight at once")
+    parser.add_argument("--batch-size", type=int, default=50, help="Users per group_roles batch")
+    parser.add_argument("--batch-concurrency", type=int, default=5, help="Concurrency inside each group_roles batch")
+    parser.add_argument("--users", type=int, default=1000000, help="Users generated by the fake API")
+    parser.add_argument("--groups", type=int, default=10000, help="Groups generated by the fake API")
+    parser.add_argument("--groups-per-user", type=int, default=5, help="Groups each generated user is in")
+    parser.add_argument("--blacklisted", type=int, default=25, help="Blacklisted groups in the benchmark guild")
+    parser.add_argument("--latency", type=float, default=40.0, help="Mean fake API latency in ms")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Fake API latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for data and fault injection")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Call the fake backend directly instead of over HTTP, to measure the bot's own overhead")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="Skip tracemalloc, which slows the run down")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own log output")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    
+    # Keep the benchmark's writes away from the bot's real database
+    database_dir = tempfile.TemporaryDirectory(prefix="roblox_load_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(database_dir.name, 'bench.db')}"
+    os.environ.pop("ROBLOX_API_ROOT", None)
+    os.environ.pop("ROBLOX_FAKE_BACKEND", None)
+    
+    # app configures logging on import, so quieten it afterwards
+    import app  # noqa: F401
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+    
+    if args.trace_memory:
+        tracemalloc.start()
+    
+    try:
+        results, server_stats = asyncio.run(run_benchmark(args))
+    finally:
+        database_dir.cleanup()
+    
+    report = {
+        "benchmark": "roblox_load",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "verbose")
+        },
+        "scenarios": results,
+        "fake_server": server_stats,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the bot and web entry points
+
+Imports each target module in a fresh interpreter under `python -X importtime`
+and reports the wall time of the process, the cumulative import time of the
+target and its slowest direct imports, plus whether Flask and SQLAlchemy got
+pulled in. The config_first_use target also times the first Config call, which
+is where the database engine and schema check now happen.
+
+Every run gets its own temporary directory and SQLite database, so nothing
+touches the bot's real data. The report is JSON so runs can be saved per
+commit and compared.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--targets config,discord_main,app] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+from benchmarks.roblox_load import git_commit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run in the fresh interpreter for each target
+TARGETS = {
+    "config": "import config",
+    "discord_main": "import discord_main",
+    "app": "import app",
+    "webapp": "import webapp",
+    "config_first_use": (
+        "import time, config\n"
+        "started = time.perf_counter()\n"
+        "config.Config().get_server_config(1)\n"
+        "print(f'first_call_seconds={time.perf_counter() - started}')"
+    )
+}
+
+# Modules whose presence after import is worth calling out
+HEAVY_MODULES = ["flask", "flask_sqlalchemy", "sqlalchemy", "discord", "aiohttp"]
+
+def parse_importtime(output):
+    """Parse `-X importtime` lines into (name, depth, self_us, cumulative_us) tuples"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip(" ")
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append((stripped.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+def summarize_imports(entries, interpreter_modules, top):
+    """Total import time and the slowest imports of one run
+    
+    Modules the bare interpreter imports on its own are left out, and only
+    the top two levels of the import tree are ranked so a slow leaf isn't
+    listed once for every module above it.
+    """
+    entries = [entry for entry in entries if entry[0] not in interpreter_modules]
+    top_level = [entry for entry in entries if entry[1] == 0]
+    loaded = {name for name, _, _, _ in entries}
+    
+    return {
+        "import_seconds": sum(entry[3] for entry in top_level) / 1_000_000,
+        "modules_imported": len(entries),
+        "heavy_modules": {name: name in loaded for name in HEAVY_MODULES},
+        "slowest": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 2), "self_ms": round(own / 1000, 2)}
+            for name, depth, own, cumulative in sorted(entries, key=lambda entry: entry[3], reverse=True)
+            if depth <= 1
+        ][:top]
+    }
+
+def run_target(code, importtime=True):
+    """Run code in a fresh interpreter and return (wall seconds, stdout, stderr)"""
+    with tempfile.TemporaryDirectory(prefix="startup_") as workdir:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        
+        # Entry points refuse to import without a token; nothing here logs in
+        env.setdefault("DISCORD_TOKEN", "startup-benchmark")
+        
+        command = [sys.executable]
+        if importtime:
+            command += ["-X", "importtime"]
+        command += ["-c", code]
+        
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"Target failed with exit code {result.returncode}:\n{result.stderr[-2000:]}")
+    return wall, result.stdout, result.stderr
+
+def benchmark_target(name, runs, interpreter_modules, top):
+    """Median figures over several cold starts of one target"""
+    code = TARGETS[name]
+    
+    # Wall time is measured without importtime, whose bookkeeping slows imports down
+    walls = [run_target(code, importtime=False)[0] for _ in range(runs)]
+    _, stdout, stderr = run_target(code)
+    
+    report = {
+        "wall_seconds": {
+            "median": statistics.median(walls),
+            "min": min(walls),
+            "max": max(walls)
+        }
+    }
+    report.update(summarize_imports(parse_importtime(stderr), interpreter_modules, top))
+    
+    for line in stdout.splitlines():
+        if line.startswith("first_call_seconds="):
+            report["first_call_seconds"] = float(line.split("=", 1)[1])
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the bot's entry points")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per target for the wall time")
+    parser.add_argument("--targets", default=",".join(TARGETS),
+                        help=f"Comma separated targets ({', '.join(TARGETS)})")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list per target")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    args.targets = [name.strip() for name in args.targets.split(",") if name.strip()]
+    
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(sorted(unknown))}")
+    
+    # Bare interpreter start, to subtract from the targets by eye
+    baseline = statistics.median(run_target("pass", importtime=False)[0] for _ in range(args.runs))
+    interpreter_modules = {entry[0] for entry in parse_importtime(run_target("pass")[2])}
+    
+    results = {}
+    for name in args.targets:
+        try:
+            results[name] = benchmark_target(name, args.runs, interpreter_modules, args.top)
+        except RuntimeError as e:
+            results[name] = {"error": str(e)}
+    
+    report = {
+        "benchmark": "startup",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key != "output"
+        },
+        "interpreter_seconds": baseline,
+        "targets": results
+    }
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,13 @@ import json
 from pathlib import Path
 import logging
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Verification codes stop working this long after they are created
+VERIFICATION_CODE_TTL = timedelta(minutes=15)
+
 class BotConfig:
     """
     A simplified config class for the Discord bot that doesn't depend on Flask.
@@ -19,16 +22,17 @@ class BotConfig:
         
         # File paths for various configuration data
         self.server_configs_file = self.data_directory / "server_configs.json"
-        self.verification_codes_file = self.data_directory / "verification_codes.json"
         self.blacklisted_groups_file = self.data_directory / "blacklisted_groups.json"
         self.tickets_counter_file = self.data_directory / "tickets_counter.json"
         
         # Load data from files or create empty defaults
         self.server_configs = self._load_or_create(self.server_configs_file, {})
-        self.verification_codes = self._load_or_create(self.verification_codes_file, {})
         self.blacklisted_groups = self._load_or_create(self.blacklisted_groups_file, {})
         self.tickets_counter = self._load_or_create(self.tickets_counter_file, {})
         
+        # Verification codes are short-lived, so they are only kept in memory
+        self.verification_codes = {}
+        
     def _load_or_create(self, file_path, default_data):
         """Helper method to load JSON data from a file or create with defaults"""
         if file_path.exists():
@@ -65,9 +69,17 @@ class BotConfig:
                 "logs_channel": None,
                 "ticket_category": None,
                 "ticket_logs_channel": None,
-                "blacklisted_groups": []
+                "blacklisted_groups": [],
+                "rank_codes": {},
+                "join_screening": "off",
+                "quarantine_role": None
             }
             self._save_to_file(self.server_configs_file, self.server_configs)
+        
+        # Configs saved before newer keys existed get their defaults
+        self.server_configs[str_guild_id].setdefault("rank_codes", {})
+        self.server_configs[str_guild_id].setdefault("join_screening", "off")
+        self.server_configs[str_guild_id].setdefault("quarantine_role", None)
             
         return self.server_configs[str_guild_id]
     
@@ -112,6 +124,52 @@ class BotConfig:
         else:
             logger.warning(f"Unknown config key: {key}")
     
+    def add_blacklisted_group(self, guild_id, group_id):
+        """Add one group to a server's blacklist
+        
+        Returns:
+            bool: True if the group was added, False if it was already blacklisted
+        """
+        return bool(self.bulk_add_blacklisted_groups(guild_id, [group_id]))
+    
+    def bulk_add_blacklisted_groups(self, guild_id, group_ids):
+        """Add many groups to a server's blacklist with a single save
+        
+        Returns:
+            list: The group IDs that were newly added
+        """
+        server_config = self.get_server_config(guild_id)
+        blacklisted_groups = server_config["blacklisted_groups"]
+        existing = set(blacklisted_groups)
+        
+        added = []
+        for group_id in group_ids:
+            group_id = str(group_id)
+            if group_id not in existing:
+                existing.add(group_id)
+                added.append(group_id)
+        
+        if added:
+            blacklisted_groups.extend(added)
+            self._save_to_file(self.server_configs_file, self.server_configs)
+            logger.info(f"Added {len(added)} blacklisted groups for guild {guild_id}")
+        return added
+    
+    def remove_blacklisted_group(self, guild_id, group_id):
+        """Remove one group from a server's blacklist
+        
+        Returns:
+            bool: True if the group was removed, False if it was not blacklisted
+        """
+        blacklisted_groups = self.get_server_config(guild_id)["blacklisted_groups"]
+        if str(group_id) not in blacklisted_groups:
+            return False
+        
+        blacklisted_groups.remove(str(group_id))
+        self._save_to_file(self.server_configs_file, self.server_configs)
+        logger.info(f"Removed blacklisted group {group_id} for guild {guild_id}")
+        return True
+    
     def get_next_ticket_number(self, guild_id):
         """Get the next ticket number for a server"""
         str_guild_id = str(guild_id)
@@ -127,31 +185,33 @@ class BotConfig:
         return self.tickets_counter[str_guild_id]
     
     def add_verification_code(self, user_id, code, roblox_username):
-        """Store a verification code for a user"""
+        """Store a verification code for a user, valid for VERIFICATION_CODE_TTL"""
         str_user_id = str(user_id)
         
         # Add the verification code
         self.verification_codes[str_user_id] = {
             "code": code,
             "roblox_username": roblox_username,
-            "created_at": datetime.utcnow().isoformat()
+            "expires_at": datetime.utcnow() + VERIFICATION_CODE_TTL
         }
-        
-        # Save to file
-        self._save_to_file(self.verification_codes_file, self.verification_codes)
         logger.info(f"Added verification code for user {user_id}")
     
     def get_verification_code(self, user_id):
-        """Get the verification code for a user"""
+        """Get the unexpired verification code for a user"""
         str_user_id = str(user_id)
         
-        if str_user_id in self.verification_codes:
-            return {
-                "code": self.verification_codes[str_user_id]["code"],
-                "roblox_username": self.verification_codes[str_user_id]["roblox_username"]
-            }
+        entry = self.verification_codes.get(str_user_id)
+        if entry is None:
+            return None
         
-        return None
+        if entry["expires_at"] <= datetime.utcnow():
+            del self.verification_codes[str_user_id]
+            return None
+        
+        return {
+            "code": entry["code"],
+            "roblox_username": entry["roblox_username"]
+        }
     
     def remove_verification_code(self, user_id):
         """Remove the verification code for a user"""
@@ -159,5 +219,19 @@ class BotConfig:
         
         if str_user_id in self.verification_codes:
             del self.verification_codes[str_user_id]
-            self._save_to_file(self.verification_codes_file, self.verification_codes)
-            logger.info(f"Removed verification code for user {user_id}")
\ No newline at end of file
+            logger.info(f"Removed verification code for user {user_id}")
+    
+    def purge_expired_verification_codes(self):
+        """Delete all expired verification codes
+        
+        Returns:
+            int: Number of expired codes deleted
+        """
+        now = datetime.utcnow()
+        expired = [user_id for user_id, entry in self.verification_codes.items() if entry["expires_at"] <= now]
+        for user_id in expired:
+            del self.verification_codes[user_id]
+        
+        if expired:
+            logger.info(f"Deleted {len(expired)} expired verification codes")
+        return len(expired)
\ No newline at end of file
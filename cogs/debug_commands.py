@@ -0,0 +1,103 @@
+"""
+Debug Commands Cog - Owner-only diagnostics
+
+Shows what the event-loop monitor has seen: current lag and the handlers
+that blocked the loop the longest, with the stack of their worst stall.
+Also syncs slash commands to a single guild for testing, which Discord
+applies immediately, unlike global syncs.
+"""
+
+import logging
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord import Embed, Color
+
+from utils.loop_monitor import MONITOR
+from utils.command_sync import sync_commands
+
+logger = logging.getLogger(__name__)
+
+class DebugCommands(commands.Cog):
+    """Cog with owner-only diagnostic commands"""
+    
+    debug = app_commands.Group(name="debug", description="Bot diagnostics (bot owner only)")
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @debug.command(name="loop", description="Show event loop lag and the slowest blocking handlers")
+    @app_commands.describe(stack="Include the stack of the worst stall")
+    async def loop(self, interaction: discord.Interaction, stack: bool = False):
+        """Show the event loop monitor report"""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+            return
+        
+        report = MONITOR.report(limit=5)
+        embed = Embed(
+            title="Event Loop",
+            description=(
+                f"Monitor: {'running' if report['running'] else 'stopped'}\n"
+                f"Last lag: {report['last_lag_seconds'] * 1000:.1f} ms\n"
+                f"Max lag: {report['max_lag_seconds'] * 1000:.1f} ms\n"
+                f"Stalls over {report['threshold_seconds'] * 1000:.0f} ms: {report['stalls']}"
+            ),
+            color=Color.orange() if report["stalls"] else Color.green()
+        )
+        
+        for handler in report["top_handlers"]:
+            embed.add_field(
+                name=handler["handler"][:256],
+                value=(
+                    f"{handler['count']} stalls, {handler['total']:.2f}s total, {handler['max']:.2f}s worst\n"
+                    f"at `{handler['location']}`"
+                )[:1024],
+                inline=False
+            )
+        
+        worst = report["top_handlers"][0] if report["top_handlers"] else None
+        if stack and worst and worst["stack"]:
+            # Keep the end of the stack, where the blocking call is
+            embed.add_field(name="Worst stack", value=f"```\n{worst['stack'][-1000:]}\n```", inline=False)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @debug.command(name="sync", description="Sync slash commands to this server or globally")
+    @app_commands.describe(
+        scope="guild copies the global commands to this server, clear removes them again",
+        force="Sync even if the commands look unchanged"
+    )
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="guild", value="guild"),
+        app_commands.Choice(name="clear", value="clear"),
+        app_commands.Choice(name="global", value="global")
+    ])
+    async def sync(self, interaction: discord.Interaction, scope: str = "guild", force: bool = False):
+        """Sync the command tree for one scope"""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+            return
+        
+        if scope != "global" and not interaction.guild:
+            await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        tree = self.bot.tree
+        if scope == "guild":
+            tree.copy_global_to(guild=interaction.guild)
+            synced, message = await sync_commands(tree, guild=interaction.guild, force=force)
+        elif scope == "clear":
+            tree.clear_commands(guild=interaction.guild)
+            synced, message = await sync_commands(tree, guild=interaction.guild, force=force)
+        else:
+            synced, message = await sync_commands(tree, force=force)
+        
+        logger.info(f"{interaction.user} ran a {scope} command sync: {message}")
+        await interaction.followup.send(message, ephemeral=True)
+
+async def setup(bot):
+    """Add the cog to the bot"""
+    await bot.add_cog(DebugCommands(bot))
@@ -5,7 +5,6 @@ from discord import Embed, Color
 import logging
 from datetime import datetime
 from utils.roblox_api import RobloxAPI
-from app import db
 
 logger = logging.getLogger(__name__)
 
@@ -40,21 +39,6 @@ class GroupCommands(commands.Cog):
             return
         
         try:
-            # Save in database first to establish connection between group and guild
-            from app import app, db
-            from models import Guild
-            
-            with app.app_context():
-                guild_record = Guild.query.get(interaction.guild.id)
-                if guild_record:
-                    guild_record.group_id = group_id
-                    logger.info(f"Updated group ID for guild {interaction.guild.id} to {group_id}")
-                else:
-                    new_guild = Guild(id=interaction.guild.id, group_id=group_id)
-                    db.session.add(new_guild)
-                    logger.info(f"Created new guild record with group ID {group_id}")
-                db.session.commit()
-            
             # Validate group ID
             group_info = await self.roblox_api.get_group_info(group_id)
             
@@ -81,7 +65,7 @@ class GroupCommands(commands.Cog):
             
             # Add a reminder to set up the token if not already set
             guild_id = interaction.guild.id
-            from app import app
+            from app import app, db
             from models import RobloxToken
             
             token_exists = False
@@ -487,3 +471,7 @@ class GroupCommands(commands.Cog):
     async def ranksetup(self, interaction: discord.Interaction, group_id: str):
         """Alias for setupid command"""
         await self.setupid(interaction, group_id)
+
+async def setup(bot):
+    """Add the cog to the bot"""
+    await bot.add_cog(GroupCommands(bot))
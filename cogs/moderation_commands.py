@@ -211,3 +211,7 @@ class ModerationCommands(commands.Cog):
         
         await interaction.followup.send(embed=embed, ephemeral=True)
         logger.info(f"Roles set up by {interaction.user.name}")
+
+async def setup(bot):
+    """Add the cog to the bot"""
+    await bot.add_cog(ModerationCommands(bot))
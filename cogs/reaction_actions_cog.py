@@ -40,31 +40,43 @@ class ReactionActionsCog(commands.Cog):
         if payload.user_id == self.bot.user.id:
             return
         
-        # Check if this is a message we're tracking
-        if payload.message_id in self.handler.active_messages:
-            # Get the necessary objects
-            guild = self.bot.get_guild(payload.guild_id)
-            if not guild:
-                return
-            
-            channel = guild.get_channel(payload.channel_id)
-            if not channel:
-                return
-            
-            try:
-                message = await channel.fetch_message(payload.message_id)
-                user = guild.get_member(payload.user_id)
-                
-                if not message or not user:
-                    return
-                
-                # Find the reaction
-                for reaction in message.reactions:
-                    if str(reaction.emoji) == str(payload.emoji):
-                        await self.handler.handle_reaction_add(reaction, user)
-                        break
-            except Exception as e:
-                logger.error(f"Error handling reaction: {e}")
+        try:
+            await self.handler.handle_raw_reaction_add(payload)
+        except Exception as e:
+            logger.error(f"Error handling reaction: {e}")
+    
+    # Moderator cache invalidation: role and member permission changes
+    
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.handler.mod_cache.invalidate_guild(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.handler.mod_cache.invalidate_guild(after.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.handler.mod_cache.invalidate_guild(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        # The owner implicitly has every permission
+        if before.owner_id != after.owner_id:
+            self.handler.mod_cache.invalidate_guild(after.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.handler.mod_cache.invalidate_guild(guild.id)
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.handler.mod_cache.invalidate_member(after.guild.id, after.id)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.handler.mod_cache.invalidate_member(member.guild.id, member.id)
     
     # === Commands ===
     
@@ -120,15 +132,7 @@ class ReactionActionsCog(commands.Cog):
                 allowed_reactions = ["🎫"]
                 
                 # Get mod roles for ticket permissions
-                mod_roles = []
-                for role in interaction.guild.roles:
-                    if (role.permissions.manage_messages or 
-                        role.permissions.administrator or
-                        "mod" in role.name.lower() or
-                        "admin" in role.name.lower()):
-                        mod_roles.append(role.id)
-                
-                data["mod_roles"] = mod_roles
+                data["mod_roles"] = list(self.handler.mod_cache.get_mod_role_ids(interaction.guild))
                 
             elif action_type.lower() == "approval":
                 allowed_reactions = ["✅", "❌"]
@@ -251,13 +255,7 @@ class ReactionActionsCog(commands.Cog):
             panel_message = await target_channel.send(embed=embed)
             
             # Register the message
-            mod_roles = []
-            for role in interaction.guild.roles:
-                if (role.permissions.manage_messages or 
-                    role.permissions.administrator or
-                    "mod" in role.name.lower() or
-                    "admin" in role.name.lower()):
-                    mod_roles.append(role.id)
+            mod_roles = list(self.handler.mod_cache.get_mod_role_ids(interaction.guild))
             
             self.handler.register_message(
                 message_id=panel_message.id,
@@ -468,6 +466,4 @@ class ReactionActionsCog(commands.Cog):
 async def setup(bot):
     """Add the cog to the bot"""
     await bot.add_cog(ReactionActionsCog(bot))
-    # Sync commands to make them available immediately
-    bot.tree.sync()
     logger.info("ReactionActionsCog added to bot")
\ No newline at end of file
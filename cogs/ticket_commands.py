@@ -56,3 +56,7 @@ class TicketCommands(commands.Cog):
         
         # Close the ticket
         await self.ticket_system.close_ticket(interaction, interaction.channel)
+
+async def setup(bot):
+    """Add the cog to the bot"""
+    await bot.add_cog(TicketCommands(bot))
@@ -1,11 +1,16 @@
 import random
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import Embed, Color, ButtonStyle
 import logging
 import string
+import asyncio
 from utils.verification import VerificationSystem
+from utils.bulk_sync import BulkSyncJob, has_saved_progress
+from utils.rank_poller import RankPoller
+from utils.blacklist_screener import BlacklistScreener
+from utils.join_screener import JoinScreener
 from utils.roblox_api import RobloxAPI
 from utils.blacklist import BlacklistSystem
 
@@ -24,11 +29,36 @@ class VerifyButton(discord.ui.View):
         button.disabled = True
         await interaction.response.edit_message(view=self)
         
-        # Perform verification
         member = interaction.user
-        success, result = await self.verification_system.verify_user(member, self.roblox_username, self.code)
+        config = self.verification_system.roblox_api.bot.config
+        
+        # The code must still be stored for this user, otherwise it expired or was replaced
+        stored_code = config.get_verification_code(member.id)
+        if not stored_code or stored_code["code"] != self.code:
+            await interaction.followup.send(
+                "This verification code has expired. Use `/verify` again to get a new one.",
+                ephemeral=True
+            )
+            return
+        
+        # Poll the profile in a background job shared by repeated presses
+        job, created = self.verification_system.jobs.submit(member, self.roblox_username, self.code)
+        if not created:
+            await interaction.followup.send(
+                "Your profile is already being checked. You'll get a message here when it's done.",
+                ephemeral=True
+            )
+            return
+        
+        await interaction.followup.send(
+            "Checking your Roblox profile for the code. Profile changes can take a minute to show up, so hang tight.",
+            ephemeral=True
+        )
+        success, result = await job.task
         
         if success:
+            config.remove_verification_code(member.id)
+            
             # Get server config
             server_config = self.verification_system.roblox_api.bot.config.get_server_config(interaction.guild.id)
             
@@ -39,7 +69,8 @@ class VerifyButton(discord.ui.View):
             nickname_success, nickname_result = await self.verification_system.update_nickname(
                 member,
                 self.roblox_username,
-                group_id
+                group_id,
+                server_config.get("rank_codes")
             )
             
             # Assign verified role if configured
@@ -86,6 +117,76 @@ class VerificationCommands(commands.Cog):
         self.roblox_api.bot = bot  # Add bot reference to access config
         self.verification_system = VerificationSystem(self.roblox_api)
         self.blacklist_system = BlacklistSystem(self.roblox_api, bot.config)
+        
+        # Running /syncall jobs by guild ID
+        self.sync_jobs = {}
+        
+        # Background rank-change polling
+        self.rank_poller = RankPoller(bot, self.verification_system)
+        
+        # Background blacklist screening
+        self.blacklist_screener = BlacklistScreener(bot, self.blacklist_system)
+        # Running /screenblacklist tasks by guild ID, kept so they aren't garbage collected
+        self.screening_tasks = {}
+        self.join_screener = JoinScreener(bot, self.blacklist_system)
+    
+    async def cog_load(self):
+        self.rank_poll_loop.start()
+        self.blacklist_screen_loop.start()
+        self.code_reaper_loop.start()
+    
+    async def cog_unload(self):
+        self.rank_poll_loop.cancel()
+        self.blacklist_screen_loop.cancel()
+        self.code_reaper_loop.cancel()
+    
+    @tasks.loop(seconds=RankPoller.BASE_INTERVAL)
+    async def rank_poll_loop(self):
+        """Poll group ranks and update nicknames of members whose rank changed"""
+        try:
+            await self.rank_poller.run_cycle()
+        except Exception as e:
+            logger.error(f"Error in rank poll loop: {e}")
+        
+        # Follow the poller's rate-limit budget
+        if self.rank_poll_loop.seconds != self.rank_poller.interval:
+            self.rank_poll_loop.change_interval(seconds=self.rank_poller.interval)
+    
+    @rank_poll_loop.before_loop
+    async def before_rank_poll_loop(self):
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(hours=1)
+    async def blacklist_screen_loop(self):
+        """Re-screen verified members of every guild that is due against its blacklist"""
+        for guild in self.bot.guilds:
+            # Restarts don't make a guild due again, only SCREEN_INTERVAL passing does
+            if not self.blacklist_screener.is_due(guild.id):
+                continue
+            try:
+                await self.blacklist_screener.screen_guild(guild)
+            except Exception as e:
+                logger.error(f"Error screening guild {guild.id} against the blacklist: {e}")
+    
+    @blacklist_screen_loop.before_loop
+    async def before_blacklist_screen_loop(self):
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(minutes=5)
+    async def code_reaper_loop(self):
+        """Delete verification codes that have expired"""
+        try:
+            self.bot.config.purge_expired_verification_codes()
+        except Exception as e:
+            logger.error(f"Error purging expired verification codes: {e}")
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Screen members who were verified before against the blacklist"""
+        try:
+            await self.join_screener.on_member_join(member)
+        except Exception as e:
+            logger.error(f"Error in join screening for {member.id}: {e}")
     
     @app_commands.command(name="verify", description="Verify your Roblox account")
     @app_commands.describe(roblox_username="Your Roblox username")
@@ -233,6 +334,222 @@ class VerificationCommands(commands.Cog):
         await interaction.followup.send(message, ephemeral=True)
         logger.info(f"Removed group {group_id} from blacklist by {interaction.user.name}")
     
+    @app_commands.command(name="importblacklist", description="Add many Roblox groups to the blacklist at once")
+    @app_commands.describe(
+        group_ids="Roblox group IDs separated by spaces, commas or new lines"
+    )
+    async def importblacklist(self, interaction: discord.Interaction, group_ids: str):
+        """Add a pasted list of Roblox group IDs to the blacklist"""
+        await interaction.response.defer(ephemeral=True)
+        
+        # Check if user has admin permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("You need administrator permissions to use this command.", ephemeral=True)
+            return
+        
+        try:
+            added, already, invalid = await self.blacklist_system.import_blacklisted_groups(interaction.guild.id, group_ids)
+        except Exception as e:
+            logger.error(f"Error importing blacklisted groups: {e}")
+            await interaction.followup.send("An error occurred while importing the groups. Nothing was added.", ephemeral=True)
+            return
+        
+        embed = Embed(
+            title="Blacklist Import",
+            description=f"Added **{len(added)}** groups to the blacklist.",
+            color=Color.green() if added else Color.blue()
+        )
+        if already:
+            embed.add_field(name="Already Blacklisted", value=str(len(already)), inline=True)
+        if invalid:
+            shown = ", ".join(invalid[:10]) + (" ..." if len(invalid) > 10 else "")
+            embed.add_field(name=f"Skipped {len(invalid)} Invalid Entries", value=shown[:1024], inline=False)
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        logger.info(f"Imported {len(added)} blacklisted groups for guild {interaction.guild.id} by {interaction.user.name}")
+    
+    @app_commands.command(name="screenblacklist", description="Check all verified members against the blacklist now")
+    @app_commands.describe(
+        restart="Start over instead of resuming an interrupted screening"
+    )
+    async def screenblacklist(self, interaction: discord.Interaction, restart: bool = False):
+        """Run a blacklist screening of all verified members in the background"""
+        await interaction.response.defer(ephemeral=True)
+        
+        # Check if user has admin permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("You need administrator permissions to use this command.", ephemeral=True)
+            return
+        
+        guild = interaction.guild
+        if guild.id in self.blacklist_screener.running:
+            await interaction.followup.send("A blacklist screening is already running for this server.", ephemeral=True)
+            return
+        
+        if not self.blacklist_system.get_blacklist_index(guild.id):
+            await interaction.followup.send("No groups are currently blacklisted.", ephemeral=True)
+            return
+        
+        async def run_screening():
+            try:
+                await self.blacklist_screener.screen_guild(guild, restart=restart)
+            except Exception as e:
+                logger.error(f"Error screening guild {guild.id} against the blacklist: {e}")
+            finally:
+                self.screening_tasks.pop(guild.id, None)
+        
+        self.screening_tasks[guild.id] = asyncio.create_task(run_screening())
+        await interaction.followup.send(
+            "Blacklist screening started. New hits will be reported in the logs channel.",
+            ephemeral=True
+        )
+        logger.info(f"Started blacklist screening for guild {guild.id} by {interaction.user.name}")
+    
+    @app_commands.command(name="joinscreening", description="Check previously verified members against the blacklist when they join")
+    @app_commands.describe(
+        mode="What to do when a joining member is in a blacklisted group",
+        quarantine_role="Role to give flagged members in quarantine mode"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="Off", value="off"),
+        app_commands.Choice(name="Flag in logs channel", value="flag"),
+        app_commands.Choice(name="Quarantine role", value="quarantine"),
+        app_commands.Choice(name="Kick", value="kick")
+    ])
+    async def joinscreening(
+        self, 
+        interaction: discord.Interaction, 
+        mode: app_commands.Choice[str],
+        quarantine_role: discord.Role = None
+    ):
+        """Configure join-time blacklist screening"""
+        await interaction.response.defer(ephemeral=True)
+        
+        # Check if user has admin permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("You need administrator permissions to use this command.", ephemeral=True)
+            return
+        
+        if mode.value == "quarantine" and not quarantine_role:
+            server_config = self.bot.config.get_server_config(interaction.guild.id)
+            if not server_config.get("quarantine_role"):
+                await interaction.followup.send("Quarantine mode needs a quarantine role.", ephemeral=True)
+                return
+        
+        self.bot.config.update_server_config(interaction.guild.id, "join_screening", mode.value)
+        if quarantine_role:
+            self.bot.config.update_server_config(interaction.guild.id, "quarantine_role", quarantine_role.id)
+        
+        message = f"Join screening set to **{mode.name}**."
+        if mode.value != "off":
+            message += " Members who verified before will be checked against the blacklist when they join."
+        await interaction.followup.send(message, ephemeral=True)
+        logger.info(f"Join screening set to {mode.value} in guild {interaction.guild.id} by {interaction.user.name}")
+    
+    @app_commands.command(name="rankcode", description="Set the nickname code used for a Roblox group rank")
+    @app_commands.describe(
+        rank_name="The Roblox rank name (e.g. Lieutenant General)",
+        code="The code to show in nicknames (leave empty to remove the custom code)"
+    )
+    async def rankcode(
+        self, 
+        interaction: discord.Interaction, 
+        rank_name: str,
+        code: str = None
+    ):
+        """Set or remove a custom rank code for this server"""
+        await interaction.response.defer(ephemeral=True)
+        
+        # Check if user has admin permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("You need administrator permissions to use this command.", ephemeral=True)
+            return
+        
+        rank_name = rank_name.strip()
+        server_config = self.bot.config.get_server_config(interaction.guild.id)
+        rank_codes = dict(server_config.get("rank_codes") or {})
+        
+        if code:
+            code = code.strip().upper()
+            if not code.isalnum() or len(code) > 8:
+                await interaction.followup.send("Rank codes must be 1-8 letters or numbers.", ephemeral=True)
+                return
+            
+            rank_codes[rank_name] = code
+            message = f"Members with the rank **{rank_name}** will now get the code **[{code}]**."
+        elif rank_name in rank_codes:
+            del rank_codes[rank_name]
+            default_code = self.verification_system.get_rank_code(rank_name, rank_codes)
+            message = f"Removed the custom code for **{rank_name}**. It will now use **[{default_code}]**."
+        else:
+            await interaction.followup.send(f"There is no custom code for **{rank_name}**.", ephemeral=True)
+            return
+        
+        self.bot.config.update_server_config(interaction.guild.id, "rank_codes", rank_codes)
+        await interaction.followup.send(message, ephemeral=True)
+        logger.info(f"Rank code for '{rank_name}' set to {code} in guild {interaction.guild.id} by {interaction.user.name}")
+    
+    @app_commands.command(name="syncall", description="Update the nickname and verified role of every verified member")
+    @app_commands.describe(
+        restart="Start over instead of resuming an interrupted sync"
+    )
+    async def syncall(self, interaction: discord.Interaction, restart: bool = False):
+        """Sync nicknames and roles for the whole server in the background"""
+        await interaction.response.defer(ephemeral=True)
+        
+        # Check if user has admin permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.followup.send("You need administrator permissions to use this command.", ephemeral=True)
+            return
+        
+        guild = interaction.guild
+        running_job = self.sync_jobs.get(guild.id)
+        if running_job and not running_job.finished and not running_job.error:
+            stats = running_job.stats
+            await interaction.followup.send(
+                f"A sync is already running: {stats['processed']}/{stats['total']} members checked, {stats['updated']} updated.",
+                ephemeral=True
+            )
+            return
+        
+        server_config = self.bot.config.get_server_config(guild.id)
+        resuming = not restart and has_saved_progress(guild.id)
+        job = BulkSyncJob(guild, self.verification_system, server_config, restart=restart)
+        self.sync_jobs[guild.id] = job
+        
+        status_message = await interaction.followup.send(
+            f"{'Resuming' if resuming else 'Starting'} sync for {guild.member_count} members. This runs in the background.",
+            ephemeral=True,
+            wait=True
+        )
+        
+        async def report_progress(job):
+            stats = job.stats
+            try:
+                await status_message.edit(
+                    content=f"Syncing... {stats['processed']}/{stats['total']} members checked, {stats['updated']} updated, {stats['failed']} failed."
+                )
+            except discord.HTTPException:
+                pass  # The interaction token expires after 15 minutes
+        
+        async def run_job():
+            try:
+                stats = await job.run(report_progress)
+                content = (
+                    f"Sync complete: {stats['updated']} updated, {stats['unchanged']} already up to date, "
+                    f"{stats['not_verified']} not verified, {stats['failed']} failed."
+                )
+            except Exception:
+                content = "The sync stopped because of an error. Run `/syncall` again to resume it."
+            
+            try:
+                await status_message.edit(content=content)
+            except discord.HTTPException:
+                pass
+        
+        job.task = asyncio.create_task(run_job())
+        logger.info(f"Started member sync for guild {guild.id} by {interaction.user.name} (restart={restart})")
+    
     @app_commands.command(name="update", description="Update your nickname with your current Roblox group rank")
     async def update(self, interaction: discord.Interaction):
         """Update your Discord nickname with your current Roblox group rank"""
@@ -268,7 +585,8 @@ class VerificationCommands(commands.Cog):
         success, result = await self.verification_system.update_nickname(
             interaction.user,
             roblox_username,
-            group_id
+            group_id,
+            server_config.get("rank_codes")
         )
         
         if success:
@@ -277,4 +595,7 @@ class VerificationCommands(commands.Cog):
         else:
             await interaction.followup.send(f"Failed to update nickname: {result}", ephemeral=True)
             logger.error(f"Failed to update nickname for {interaction.user.name}: {result}")
-        
+
+async def setup(bot):
+    """Add the cog to the bot"""
+    await bot.add_cog(VerificationCommands(bot))
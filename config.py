@@ -1,23 +1,91 @@
 import os
+import copy
 import json
+import time
 from pathlib import Path
 import logging
-from app import db, app
-from datetime import datetime
+from datetime import datetime, timedelta
+from utils.metrics import REGISTRY, time_calls
+from utils.tracing import TRACER
+from utils.invalidation import BUS
 
 logger = logging.getLogger(__name__)
 
+# Timing of every Config call, which are all database round trips
+DB_CALL_SECONDS = REGISTRY.histogram(
+    "config_db_call_duration_seconds",
+    "Time spent in Config database calls",
+    ["operation"]
+)
+
+def time_db_call(function):
+    """Time a Config method and record it as a span in sampled traces"""
+    return TRACER.traced(f"db.{function.__name__}")(time_calls(DB_CALL_SECONDS, "operation")(function))
+
+# Verification codes stop working this long after they are created
+VERIFICATION_CODE_TTL = timedelta(minutes=15)
+
+# Cached server configs are reloaded after this many seconds even if no
+# invalidation arrives, in case one was lost
+SERVER_CONFIG_CACHE_TTL = 60
+
+# Settings stored as JSON in the GuildSetting table, with their defaults
+GUILD_SETTING_DEFAULTS = {
+    "rank_codes": {},
+    "join_screening": "off",
+    "quarantine_role": None
+}
+
 class Config:
     def __init__(self):
         # For backward compatibility, keep track of the old paths
         self.data_directory = Path("data")
-        self.verification_codes = {}  # Keep in memory for now
+        self.verification_codes = {}  # Memory cache of unexpired codes
+        
+        # Server configs by guild ID as (expires at, config), evicted through
+        # the invalidation bus whenever any process changes them
+        self.server_config_cache = {}
+        # Bumped on every eviction, so a load racing one isn't cached
+        self.server_config_generation = 0
+        BUS.subscribe("guild_config", self.invalidate_server_config)
+        BUS.subscribe("blacklist", self.invalidate_server_config)
+        BUS.start()
         
         # Create data directory if it doesn't exist (for compatibility)
         self.data_directory.mkdir(exist_ok=True)
-        
+    
     def get_server_config(self, guild_id):
-        """Get configuration for a specific server"""
+        """Get configuration for a specific server
+        
+        Served from a per-process cache; the returned dict is a copy the
+        caller is free to change.
+        """
+        # Convert to int if it's a string
+        if isinstance(guild_id, str):
+            guild_id = int(guild_id)
+        
+        cached = self.server_config_cache.get(guild_id)
+        if cached and cached[0] > time.monotonic():
+            return copy.deepcopy(cached[1])
+        
+        generation = self.server_config_generation
+        config = self.fetch_server_config(guild_id)
+        if generation == self.server_config_generation:
+            self.server_config_cache[guild_id] = (time.monotonic() + SERVER_CONFIG_CACHE_TTL, copy.deepcopy(config))
+        return config
+    
+    def invalidate_server_config(self, guild_id=None):
+        """Forget the cached config for one guild, or for every guild"""
+        self.server_config_generation += 1
+        if guild_id is None:
+            self.server_config_cache.clear()
+        else:
+            self.server_config_cache.pop(int(guild_id), None)
+    
+    @time_db_call
+    def fetch_server_config(self, guild_id):
+        """Load the configuration for a specific server from the database"""
+        from app import app, db
         from models import Guild
         
         # Convert to int if it's a string
@@ -53,10 +121,20 @@ class Config:
             blacklisted_groups = BlacklistedGroup.query.filter_by(guild_id=guild_id).all()
             config["blacklisted_groups"] = [group.group_id for group in blacklisted_groups]
             
+            # Load extra settings, falling back to their defaults
+            from models import GuildSetting
+            for key, default in GUILD_SETTING_DEFAULTS.items():
+                config[key] = copy.deepcopy(default)
+            for setting in GuildSetting.query.filter_by(guild_id=guild_id).all():
+                if setting.key in GUILD_SETTING_DEFAULTS:
+                    config[setting.key] = json.loads(setting.value)
+            
             return config
     
+    @time_db_call
     def update_server_config(self, guild_id, key, value):
         """Update a specific configuration value for a server"""
+        from app import app, db
         from models import Guild, BlacklistedGroup, RobloxToken
         
         # Convert to int if it's a string
@@ -85,19 +163,38 @@ class Config:
         with app.app_context():
             # Handle special case for blacklisted groups
             if key == "blacklisted_groups":
-                # First delete all existing blacklisted groups
-                BlacklistedGroup.query.filter_by(guild_id=guild_id).delete()
+                # Only touch the rows that actually changed
+                wanted = {str(group_id) for group_id in value}
+                existing = {
+                    group.group_id for group in BlacklistedGroup.query.filter_by(guild_id=guild_id).all()
+                }
                 
-                # Then add the new ones
-                for group_id in value:
-                    blacklisted_group = BlacklistedGroup(
-                        guild_id=guild_id,
-                        group_id=group_id
-                    )
-                    db.session.add(blacklisted_group)
+                removed = existing - wanted
+                if removed:
+                    BlacklistedGroup.query.filter(
+                        BlacklistedGroup.guild_id == guild_id,
+                        BlacklistedGroup.group_id.in_(removed)
+                    ).delete(synchronize_session=False)
+                self._insert_blacklisted_groups(guild_id, wanted - existing)
                 
                 db.session.commit()
                 logger.info(f"Updated blacklisted groups for guild {guild_id}")
+                BUS.publish("blacklist", guild_id)
+                return
+            
+            # Handle settings stored in the GuildSetting table
+            if key in GUILD_SETTING_DEFAULTS:
+                from models import GuildSetting
+                
+                setting = GuildSetting.query.filter_by(guild_id=guild_id, key=key).first()
+                if setting:
+                    setting.value = json.dumps(value)
+                else:
+                    db.session.add(GuildSetting(guild_id=guild_id, key=key, value=json.dumps(value)))
+                
+                db.session.commit()
+                logger.info(f"Updated {key} for guild {guild_id}")
+                BUS.publish("guild_config", guild_id)
                 return
             
             # Otherwise update the guild config
@@ -123,11 +220,117 @@ class Config:
                 setattr(guild, column_mapping[key], value)
                 db.session.commit()
                 logger.info(f"Updated {key} for guild {guild_id}")
+                BUS.publish("guild_config", guild_id)
             else:
                 logger.warning(f"Unknown config key: {key}")
     
+    @time_db_call
+    def add_blacklisted_group(self, guild_id, group_id):
+        """Add one group to a server's blacklist
+        
+        Returns:
+            bool: True if the group was added, False if it was already blacklisted
+        """
+        return bool(self._add_blacklisted_groups(guild_id, [group_id]))
+    
+    @time_db_call
+    def bulk_add_blacklisted_groups(self, guild_id, group_ids):
+        """Add many groups to a server's blacklist in one transaction
+        
+        Returns:
+            list: The group IDs that were newly added
+        """
+        return self._add_blacklisted_groups(guild_id, group_ids)
+    
+    def _add_blacklisted_groups(self, guild_id, group_ids):
+        """Add groups to a server's blacklist, untimed so each public method records one DB call"""
+        from app import app, db
+        
+        # Convert to int if it's a string
+        if isinstance(guild_id, str):
+            guild_id = int(guild_id)
+        
+        # Keep the caller's order but drop duplicates
+        group_ids = list(dict.fromkeys(str(group_id) for group_id in group_ids))
+        if not group_ids:
+            return []
+        
+        with app.app_context():
+            added = self._insert_blacklisted_groups(guild_id, group_ids)
+            db.session.commit()
+        
+        if added:
+            logger.info(f"Added {len(added)} blacklisted groups for guild {guild_id}")
+            BUS.publish("blacklist", guild_id)
+        return [group_id for group_id in group_ids if group_id in added]
+    
+    @time_db_call
+    def remove_blacklisted_group(self, guild_id, group_id):
+        """Remove one group from a server's blacklist
+        
+        Returns:
+            bool: True if the group was removed, False if it was not blacklisted
+        """
+        from app import app, db
+        from models import BlacklistedGroup
+        
+        # Convert to int if it's a string
+        if isinstance(guild_id, str):
+            guild_id = int(guild_id)
+        
+        with app.app_context():
+            deleted = BlacklistedGroup.query.filter_by(guild_id=guild_id, group_id=str(group_id)).delete()
+            db.session.commit()
+        
+        if deleted:
+            logger.info(f"Removed blacklisted group {group_id} for guild {guild_id}")
+            BUS.publish("blacklist", guild_id)
+        return bool(deleted)
+    
+    def _insert_blacklisted_groups(self, guild_id, group_ids):
+        """Insert blacklist rows, skipping ones that already exist
+        
+        Must be called inside an app context; the caller commits.
+        
+        Returns:
+            set: The group IDs that were inserted
+        """
+        from app import db
+        from models import BlacklistedGroup
+        
+        rows = [{"guild_id": guild_id, "group_id": group_id} for group_id in group_ids]
+        if not rows:
+            return set()
+        
+        dialect = db.engine.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            # Single statement relying on the unique (guild_id, group_id) constraint
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            
+            statement = insert(BlacklistedGroup).values(rows).on_conflict_do_nothing(
+                index_elements=["guild_id", "group_id"]
+            ).returning(BlacklistedGroup.group_id)
+            return set(db.session.execute(statement).scalars())
+        
+        # Other databases: skip the rows we can see already exist
+        existing = {
+            group.group_id for group in BlacklistedGroup.query.filter(
+                BlacklistedGroup.guild_id == guild_id,
+                BlacklistedGroup.group_id.in_(list(group_ids))
+            ).all()
+        }
+        new_rows = [row for row in rows if row["group_id"] not in existing]
+        for row in new_rows:
+            db.session.add(BlacklistedGroup(**row))
+        return {row["group_id"] for row in new_rows}
+    
+    @time_db_call
     def get_next_ticket_number(self, guild_id):
         """Get the next ticket number for a server"""
+        from app import app
         from models import Ticket
         
         # Convert to int if it's a string
@@ -147,14 +350,18 @@ class Config:
                 
             return next_number
     
+    @time_db_call
     def add_verification_code(self, user_id, code, roblox_username):
-        """Store a verification code for a user"""
+        """Store a verification code for a user, valid for VERIFICATION_CODE_TTL"""
+        from app import app, db
         from models import VerificationCode
         
         # Convert to int if it's a string
         if isinstance(user_id, str):
             user_id = int(user_id)
         
+        created_at = datetime.utcnow()
+        
         # Use Flask application context for database operations
         with app.app_context():
             # Check if code already exists
@@ -162,12 +369,13 @@ class Config:
             if existing_code:
                 existing_code.code = code
                 existing_code.roblox_username = roblox_username
-                existing_code.created_at = datetime.utcnow()
+                existing_code.created_at = created_at
             else:
                 new_code = VerificationCode(
                     discord_id=user_id,
                     code=code,
-                    roblox_username=roblox_username
+                    roblox_username=roblox_username,
+                    created_at=created_at
                 )
                 db.session.add(new_code)
             
@@ -177,14 +385,22 @@ class Config:
         # Also store in memory for quicker access
         self.verification_codes[str(user_id)] = {
             "code": code,
-            "roblox_username": roblox_username
+            "roblox_username": roblox_username,
+            "expires_at": created_at + VERIFICATION_CODE_TTL
         }
     
+    @time_db_call
     def get_verification_code(self, user_id):
-        """Get the verification code for a user"""
+        """Get the unexpired verification code for a user"""
+        from app import app
+        
         # First try to get from memory cache
-        if str(user_id) in self.verification_codes:
-            return self.verification_codes[str(user_id)]
+        cached = self.verification_codes.get(str(user_id))
+        if cached:
+            if cached["expires_at"] > datetime.utcnow():
+                return {"code": cached["code"], "roblox_username": cached["roblox_username"]}
+            del self.verification_codes[str(user_id)]
+            return None
         
         # Otherwise get from database
         from models import VerificationCode
@@ -195,20 +411,28 @@ class Config:
         
         # Use Flask application context for database operations
         with app.app_context():
-            code_entry = VerificationCode.query.filter_by(discord_id=user_id).first()
+            code_entry = VerificationCode.query.filter(
+                VerificationCode.discord_id == user_id,
+                VerificationCode.created_at >= datetime.utcnow() - VERIFICATION_CODE_TTL
+            ).first()
             if code_entry:
-                code_data = {
+                # Update memory cache
+                self.verification_codes[str(user_id)] = {
+                    "code": code_entry.code,
+                    "roblox_username": code_entry.roblox_username,
+                    "expires_at": code_entry.created_at + VERIFICATION_CODE_TTL
+                }
+                return {
                     "code": code_entry.code,
                     "roblox_username": code_entry.roblox_username
                 }
-                # Update memory cache
-                self.verification_codes[str(user_id)] = code_data
-                return code_data
             
             return None
     
+    @time_db_call
     def remove_verification_code(self, user_id):
         """Remove the verification code for a user"""
+        from app import app, db
         from models import VerificationCode
         
         # Remove from memory cache
@@ -224,3 +448,31 @@ class Config:
             VerificationCode.query.filter_by(discord_id=user_id).delete()
             db.session.commit()
             logger.info(f"Removed verification code for user {user_id}")
+    
+    @time_db_call
+    def purge_expired_verification_codes(self):
+        """Delete all expired verification codes
+        
+        Returns:
+            int: Number of expired codes deleted from the database
+        """
+        from app import app, db
+        from models import VerificationCode
+        
+        now = datetime.utcnow()
+        
+        # Drop expired entries from the memory cache
+        expired = [user_id for user_id, entry in self.verification_codes.items() if entry["expires_at"] <= now]
+        for user_id in expired:
+            del self.verification_codes[user_id]
+        
+        # Single bulk delete using the created_at index
+        with app.app_context():
+            deleted = VerificationCode.query.filter(
+                VerificationCode.created_at < now - VERIFICATION_CODE_TTL
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        
+        if deleted:
+            logger.info(f"Deleted {deleted} expired verification codes")
+        return deleted
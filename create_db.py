@@ -2,8 +2,13 @@
 """
 Database Setup Script for ForCorn Discord Bot
 
-This script creates all the necessary database tables based on the models
-defined in models.py. It handles both SQLite and PostgreSQL configurations.
+This script creates all the necessary database tables and indexes based on
+the models defined in models.py. It handles both SQLite and PostgreSQL
+configurations.
+
+The bot and web app also create missing tables the first time they use the
+database. Set AUTO_MIGRATE=false to turn that off and run this script as an
+explicit migration step before starting them instead.
 
 Usage:
     python create_db.py
@@ -17,7 +22,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import app with database configuration
-from app import app, db
+from app import app, db, ensure_schema
 
 def setup_database():
     """Set up the database by creating all tables defined in models."""
@@ -32,12 +37,12 @@ def setup_database():
     print(f"Using database: {database_url.split('@')[1] if '@' in database_url else database_url}")
     
     try:
-        # Import all models to ensure they're registered with SQLAlchemy
-        import models
+        # Create all tables and any missing indexes
+        if not ensure_schema(force=True):
+            print("Error setting up database: see the log above for details")
+            sys.exit(1)
         
-        # Create all tables within the Flask application context
         with app.app_context():
-            db.create_all()
             print("Tables created successfully:")
             
             # List all created tables
@@ -2,16 +2,45 @@
 """
 Main entry point for the Discord bot
 
-This script initializes and runs the Discord bot.
+This script initializes and runs the Discord bot. It is the one launcher
+production runs: the commands live in the cogs/ package and are loaded as
+extensions, so only the enabled cogs (and their dependencies) get imported.
+
+Environment variables:
+    DISCORD_TOKEN       Bot token (required)
+    BOT_STORAGE         "sql" (default) keeps server settings in the database
+                        through config.Config, "json" keeps them in data/
+                        through bot_config.BotConfig. Only settings move:
+                        verification records, Roblox tokens, rank snapshots
+                        and screening state stay in the DATABASE_URL database
+                        (sqlite:///bot.db if unset) either way
+    BOT_COGS            Comma separated cogs to load, defaults to DEFAULT_COGS
+    BOT_DISABLED_COGS   Comma separated cogs to leave out
+    NO_WEB_SERVER       Don't start the status server, e.g. when a supervisor
+                        process already serves one
+    FORCE_COMMAND_SYNC  Sync the slash commands even if they look unchanged
+    SHARD_COUNT         Run an AutoShardedBot with this many shards in total,
+                        or "auto" to let Discord pick
+    SHARD_IDS           Comma separated shards this process runs (needs SHARD_COUNT)
+    CLUSTER_ID          Worker number when persistent_bot.py runs a cluster;
+                        only cluster 0 syncs slash commands
+    CLUSTER_STATUS_DIR  Directory to publish this worker's shard status in
 """
 
 import os
 import sys
 import logging
-import asyncio
+import importlib
+import traceback
 import discord
 from discord.ext import commands
-import traceback
+from dotenv import load_dotenv
+
+from utils.bot_metrics import MetricsCommandTree, instrument_bot
+from utils.command_sync import sync_commands
+from utils.cluster import ClusterReporter
+from utils.status_server import create_bot_status_server
+from utils.tracing import TRACER
 
 # Configure logging
 logging.basicConfig(
@@ -21,112 +50,209 @@ logging.basicConfig(
 )
 logger = logging.getLogger("discord_bot")
 
-# Import cogs
-from cogs.verification_commands import VerificationCommands
-from cogs.moderation_commands import ModerationCommands
-from cogs.ticket_commands import TicketCommands
-from cogs.group_commands import GroupCommands
-
-# Import utility modules
-from utils.roblox_api import RobloxAPI
-from utils.verification import VerificationSystem
-from utils.moderation import ModerationSystem
-from utils.ticket_system import TicketSystem
-from utils.blacklist import BlacklistSystem
-from config import Config
-
-# Check for Discord token
-if not os.environ.get("DISCORD_TOKEN"):
-    logger.critical("DISCORD_TOKEN environment variable is missing")
-    sys.exit(1)
-
-# Initialize bot with appropriate intents
-intents = discord.Intents.default()
-intents.members = True
-intents.message_content = True
-intents.guilds = True
-
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
-
-# Initialize configuration and utility systems
-config = Config()
-roblox_api = RobloxAPI()
-verification_system = VerificationSystem(roblox_api)
-moderation_system = ModerationSystem(bot)
-ticket_system = TicketSystem(bot, config)
-blacklist_system = BlacklistSystem(roblox_api, config)
-
-@bot.event
-async def on_ready():
-    """Event triggered when the bot is connected and ready"""
-    logger.info(f"Bot connected as {bot.user.name} (ID: {bot.user.id})")
-    logger.info(f"Connected to {len(bot.guilds)} servers")
+# Cogs loaded when BOT_COGS is not set, by module name in cogs/
+DEFAULT_COGS = [
+    "verification_commands",
+    "moderation_commands",
+    "ticket_commands",
+    "group_commands",
+    "reaction_actions_cog",
+    "debug_commands"
+]
+
+# Server settings storage by BOT_STORAGE value, as (module, class) imported on demand
+STORAGE_BACKENDS = {
+    "sql": ("config", "Config"),
+    "json": ("bot_config", "BotConfig")
+}
+
+def env_list(name):
+    """Comma separated environment variable as a list of names"""
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+def env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+def enabled_extensions():
+    """Extension paths of the cogs selected by BOT_COGS and BOT_DISABLED_COGS"""
+    disabled = set(env_list("BOT_DISABLED_COGS"))
+    return [f"cogs.{name}" for name in env_list("BOT_COGS") or DEFAULT_COGS if name not in disabled]
+
+def create_config(storage=None):
+    """Create the settings store selected by BOT_STORAGE"""
+    storage = (storage or os.environ.get("BOT_STORAGE", "sql")).lower()
+    if storage not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown BOT_STORAGE {storage!r}, expected one of: {', '.join(STORAGE_BACKENDS)}")
+    
+    module_name, class_name = STORAGE_BACKENDS[storage]
+    logger.info(f"Using {storage} storage ({module_name}.{class_name})")
+    if storage == "json":
+        logger.info(
+            "Server settings are kept in data/; verification records, Roblox tokens and "
+            "screening state still use the DATABASE_URL database (sqlite:///bot.db if unset)"
+        )
+    return getattr(importlib.import_module(module_name), class_name)()
+
+class ForCornBotMixin:
+    """Bot that loads its commands from the cogs/ package
     
-    # Add cogs
-    await bot.add_cog(VerificationCommands(bot, verification_system, roblox_api, blacklist_system))
-    await bot.add_cog(ModerationCommands(bot, moderation_system))
-    await bot.add_cog(TicketCommands(bot, ticket_system))
-    await bot.add_cog(GroupCommands(bot, roblox_api, config))
+    Mixed into both commands.Bot and commands.AutoShardedBot below.
+    """
     
-    logger.info("All cogs have been loaded")
+    def __init__(self, config, extensions, status_server=True, cluster_id=None, cluster_status_dir=None, **options):
+        """
+        Args:
+            config: Settings store, shared with the cogs as bot.config
+            extensions: Extension paths to load in setup_hook
+            status_server: Whether to serve the status page for port binding
+            cluster_id: Worker number in cluster mode, None when running alone
+            cluster_status_dir: Directory to publish shard status in for the supervisor
+            **options: Passed on to the discord.py bot class
+        """
+        # Initialize bot with appropriate intents
+        intents = discord.Intents.default()
+        intents.members = True
+        intents.message_content = True
+        intents.guilds = True
+        
+        super().__init__(
+            command_prefix='!',
+            intents=intents,
+            help_command=None,
+            activity=discord.Activity(type=discord.ActivityType.watching, name="for /verify commands"),
+            tree_cls=MetricsCommandTree,
+            http_trace=TRACER.http_trace_config("discord"),
+            **options
+        )
+        instrument_bot(self)
+        
+        self.config = config
+        self.initial_extensions = list(extensions)
+        self.status_server = create_bot_status_server(self, "Discord Bot Status") if status_server else None
+        self.cluster_id = cluster_id
+        self.cluster_reporter = ClusterReporter(self, cluster_id or 0, cluster_status_dir) if cluster_status_dir else None
     
-    # Set bot activity
-    await bot.change_presence(activity=discord.Activity(
-        type=discord.ActivityType.watching, 
-        name="for /verify commands"
-    ))
+    async def setup_hook(self):
+        """Start the status server and load the cogs before connecting"""
+        if self.status_server:
+            await self.status_server.start()
+        if self.cluster_reporter:
+            self.cluster_reporter.start()
+        
+        for extension in self.initial_extensions:
+            try:
+                await self.load_extension(extension)
+                logger.info(f"Loaded extension: {extension}")
+            except Exception as e:
+                logger.error(f"Failed to load extension {extension}: {e}")
+                logger.error(traceback.format_exc())
+        
+        # Commands are global, so one worker of a cluster syncing them is enough
+        if self.cluster_id:
+            logger.info(f"Cluster {self.cluster_id} leaves the command sync to cluster 0")
+            return
+        
+        # Only calls Discord when the commands changed since the last sync
+        await sync_commands(self.tree, force=env_flag("FORCE_COMMAND_SYNC"))
     
-    logger.info("Bot is fully ready")
-
-@bot.event
-async def on_guild_join(guild):
-    """Event triggered when the bot joins a new server"""
-    logger.info(f"Bot joined new server: {guild.name} (ID: {guild.id})")
+    async def close(self):
+        if self.cluster_reporter:
+            self.cluster_reporter.stop()
+        if self.status_server:
+            await self.status_server.stop()
+        await super().close()
     
-    # Find a suitable channel to send welcome message
-    target_channel = None
-    for channel in guild.text_channels:
-        if channel.permissions_for(guild.me).send_messages:
-            target_channel = channel
-            break
+    async def on_ready(self):
+        """Event triggered when the bot is connected and ready"""
+        logger.info(f"Bot connected as {self.user.name} (ID: {self.user.id})")
+        logger.info(f"Connected to {len(self.guilds)} servers")
+        logger.info("Bot is fully ready")
     
-    if target_channel:
-        embed = discord.Embed(
-            title="Thanks for adding ForCorn!",
-            description=(
-                "ForCorn is a powerful Roblox utility bot for Discord.\n\n"
-                "**Key features:**\n"
-                "• `/verify` - Link Discord and Roblox accounts\n"
-                "• `/rank` - Manage Roblox group ranks\n"
-                "• `/ticket` - Support ticket system\n"
-                "• `/kick`, `/ban`, `/timeout` - Moderation commands\n\n"
-                "Type `/help` to see all commands!"
-            ),
-            color=discord.Color.blue()
-        )
-        embed.set_footer(text="Use /setuproles to configure roles for your server")
-        await target_channel.send(embed=embed)
-
-@bot.event
-async def on_error(event, *args, **kwargs):
-    """Global error handler for bot events"""
-    logger.error(f"Error in event {event}: {sys.exc_info()[1]}")
-    logger.error(traceback.format_exc())
-
-@bot.event
-async def on_command_error(ctx, error):
-    """Error handler for command errors"""
-    if isinstance(error, commands.CommandNotFound):
-        return
+    async def on_shard_ready(self, shard_id):
+        """Event triggered when one shard of a sharded bot is ready"""
+        logger.info(f"Shard {shard_id} ready")
+    
+    async def on_guild_join(self, guild):
+        """Event triggered when the bot joins a new server"""
+        logger.info(f"Bot joined new server: {guild.name} (ID: {guild.id})")
+        
+        # Find a suitable channel to send welcome message
+        target_channel = None
+        for channel in guild.text_channels:
+            if channel.permissions_for(guild.me).send_messages:
+                target_channel = channel
+                break
+        
+        if target_channel:
+            embed = discord.Embed(
+                title="Thanks for adding ForCorn!",
+                description=(
+                    "ForCorn is a powerful Roblox utility bot for Discord.\n\n"
+                    "**Key features:**\n"
+                    "• `/verify` - Link Discord and Roblox accounts\n"
+                    "• `/rank` - Manage Roblox group ranks\n"
+                    "• `/ticket` - Support ticket system\n"
+                    "• `/kick`, `/ban`, `/timeout` - Moderation commands\n\n"
+                    "Type `/help` to see all commands!"
+                ),
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text="Use /setuproles to configure roles for your server")
+            await target_channel.send(embed=embed)
+    
+    async def on_error(self, event, *args, **kwargs):
+        """Global error handler for bot events"""
+        logger.error(f"Error in event {event}: {sys.exc_info()[1]}")
+        logger.error(traceback.format_exc())
+    
+    async def on_command_error(self, ctx, error):
+        """Error handler for command errors"""
+        if isinstance(error, commands.CommandNotFound):
+            return
+        
+        logger.error(f"Command error in {ctx.command}: {error}")
+        await ctx.send(f"An error occurred: {error}")
+
+class ForCornBot(ForCornBotMixin, commands.Bot):
+    """Single-shard bot"""
+
+class ShardedForCornBot(ForCornBotMixin, commands.AutoShardedBot):
+    """Bot running several shards, or a group of them in cluster mode"""
+
+def create_bot(**options):
+    """Build the bot from the environment's storage, cog and shard selection"""
+    bot_class = ForCornBot
+    shard_count = os.environ.get("SHARD_COUNT", "").strip().lower()
+    shard_ids = [int(shard_id) for shard_id in env_list("SHARD_IDS")]
+    if shard_count or shard_ids:
+        bot_class = ShardedForCornBot
+        if shard_count and shard_count != "auto":
+            options["shard_count"] = int(shard_count)
+        if shard_ids:
+            options["shard_ids"] = shard_ids
     
-    logger.error(f"Command error in {ctx.command}: {error}")
-    await ctx.send(f"An error occurred: {error}")
+    cluster_id = os.environ.get("CLUSTER_ID")
+    return bot_class(
+        create_config(),
+        enabled_extensions(),
+        status_server=not env_flag("NO_WEB_SERVER"),
+        cluster_id=int(cluster_id) if cluster_id else None,
+        cluster_status_dir=os.environ.get("CLUSTER_STATUS_DIR"),
+        **options
+    )
 
 def main():
     """Main function to run the bot"""
+    load_dotenv()
+    
+    # Check for Discord token
+    token = os.environ.get("DISCORD_TOKEN")
+    if not token:
+        logger.critical("DISCORD_TOKEN environment variable is missing")
+        sys.exit(1)
+    
     try:
-        # Run the bot with the token from environment variables
-        token = os.environ.get("DISCORD_TOKEN")
+        bot = create_bot()
         bot.run(token)
     except Exception as e:
         logger.critical(f"Fatal error: {e}")
@@ -134,4 +260,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -15,16 +15,19 @@ import time
 import random
 import string
 import logging
-import threading
 import traceback
 import asyncio
-from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # Third-party imports
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from utils.status_server import create_bot_status_server
+from utils.bot_metrics import MetricsCommandTree, instrument_bot
+from utils.command_sync import sync_commands
+from utils.tracing import TRACER
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -66,11 +69,23 @@ intents.presences = False  # Can be disabled to save resources
 
 # Create the bot using commands.Bot for cog support
 activity = discord.Activity(type=discord.ActivityType.watching, name="ForCorn Bot | /help")
-bot = commands.Bot(command_prefix='!', intents=intents, activity=activity, status=discord.Status.online)
+bot = commands.Bot(
+    command_prefix='!',
+    intents=intents,
+    activity=activity,
+    status=discord.Status.online,
+    tree_cls=MetricsCommandTree,
+    http_trace=TRACER.http_trace_config("discord")
+)
+instrument_bot(bot)
+
+# Status page for port binding, served on the bot's own event loop
+status_server = create_bot_status_server(bot, "Discord Bot Status")
 
 # List of cogs to load
 initial_cogs = [
-    'cogs.reaction_actions_cog'
+    'cogs.reaction_actions_cog',
+    'cogs.debug_commands'
 ]
 
 # We'll use bot.tree instead of creating a new command tree
@@ -105,54 +120,6 @@ def save_json_file(file_path, data):
         logger.error(f"Error saving JSON file {file_path}: {e}")
         return False
 
-# Simple HTTP server for port binding
-class StatusHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        
-        html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Discord Bot Status</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
-                h1 {{ color: #5865F2; }}
-                .status {{ padding: 20px; border-radius: 5px; background-color: #f0f0f0; }}
-                .online {{ color: green; }}
-            </style>
-        </head>
-        <body>
-            <h1>Discord Bot Status</h1>
-            <div class="status">
-                <p><strong>Bot Status:</strong> <span class="online">Online</span></p>
-                <p><strong>Connected Servers:</strong> {len(bot.guilds)}</p>
-                <p><strong>Uptime:</strong> Since {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p><strong>Commands:</strong> 20 commands available</p>
-            </div>
-            <p>This is the HTTP server for the Discord bot. The actual bot functionality runs in Discord.</p>
-        </body>
-        </html>
-        '''
-        
-        self.wfile.write(html.encode())
-    
-    def log_message(self, format, *args):
-        """Override to use our logger instead of printing to stderr"""
-        logger.info(f"HTTP Server: {format % args}")
-
-def start_http_server():
-    """Start a minimal HTTP server for port binding"""
-    port = int(os.environ.get("PORT", 9000))
-    server = HTTPServer(('0.0.0.0', port), StatusHandler)
-    logger.info(f"Starting minimal HTTP server on port {port}")
-    server_thread = threading.Thread(target=server.serve_forever)
-    server_thread.daemon = True
-    server_thread.start()
-    return server
-
 # ======================================
 # Discord Bot Event Handlers
 # ======================================
@@ -163,13 +130,11 @@ async def on_ready():
     logger.info(f"{bot.user.name} has connected to Discord!")
     logger.info(f"Bot is in {len(bot.guilds)} servers")
     
-    # Sync commands
-    try:
-        logger.info("Syncing application commands...")
-        synced = await bot.sync_commands()
-        logger.info(f"Synced {len(synced)} commands")
-    except Exception as e:
-        logger.error(f"Error syncing commands: {e}")
+    # Only calls Discord when the commands changed since the last sync
+    await sync_commands(
+        bot.tree,
+        force=os.environ.get("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
+    )
     
     # Set bot status
     await bot.change_presence(
@@ -918,6 +883,9 @@ async def setup_hook():
     """Setup hook for the bot"""
     logger.info("Setting up the bot...")
     
+    # Start the status server for port binding
+    await status_server.start()
+    
     # Load all initial cogs
     for cog in initial_cogs:
         try:
@@ -944,12 +912,6 @@ def main():
         logger.info("Please create a .env file with DISCORD_TOKEN=your_token")
         return
     
-    # Start HTTP server for port binding
-    try:
-        server = start_http_server()
-    except Exception as e:
-        logger.error(f"Error starting HTTP server: {e}")
-    
     # Run the bot with cogs
     try:
         logger.info("Starting bot with cogs and commands...")
@@ -34,9 +34,9 @@ if os.environ.get("DISCORD_BOT_WORKFLOW") or os.environ.get("BOT_ONLY_MODE"):
     try:
         # Run the standalone bot as a subprocess to ensure complete isolation
         import subprocess
-        logger.info("Running standalone_discord_bot.py as a separate process...")
+        logger.info("Running discord_main.py as a separate process...")
         result = subprocess.run(
-            ["python", "standalone_discord_bot.py"], 
+            ["python", "discord_main.py"], 
             check=True,
             env=os.environ
         )
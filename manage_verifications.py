@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Verified User Import/Export for ForCorn Discord Bot
+
+Moves verified Discord/Roblox account links in and out of the database as
+CSV or JSONL, for example when migrating from another verification bot.
+Files are streamed, so large exports and imports don't need to fit in memory.
+
+Usage:
+    python manage_verifications.py export verified.csv
+    python manage_verifications.py import verified.jsonl
+    python manage_verifications.py lookup <roblox_id>
+"""
+
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from utils.verification_transfer import (
+    CHUNK_SIZE,
+    detect_format,
+    export_verifications,
+    import_verifications,
+    find_discord_ids
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export verified users")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Write all verified users to a file")
+    export_parser.add_argument("path", help="Output .csv or .jsonl file")
+    
+    import_parser = subparsers.add_parser("import", help="Add or update verified users from a file")
+    import_parser.add_argument("path", help="Input .csv or .jsonl file")
+    import_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per database batch")
+    
+    lookup_parser = subparsers.add_parser("lookup", help="Find the Discord users verified as a Roblox account")
+    lookup_parser.add_argument("roblox_id", type=int, help="Roblox user ID")
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.command == "lookup":
+            discord_ids = find_discord_ids(args.roblox_id)
+            if not discord_ids:
+                print(f"No Discord users are verified as Roblox user {args.roblox_id}")
+            for discord_id in discord_ids:
+                print(discord_id)
+            return
+        
+        fmt = detect_format(args.path)
+        if args.command == "export":
+            with open(args.path, "w", newline="") as file:
+                count = export_verifications(file, fmt)
+            print(f"Exported {count} verified users to {args.path}")
+        else:
+            with open(args.path, "r", newline="") as file:
+                stats = import_verifications(file, fmt, args.chunk_size)
+            print(f"Imported {stats['imported']} verified users from {args.path} ({stats['invalid']} invalid rows skipped)")
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -17,22 +17,44 @@ class Guild(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class GuildSetting(db.Model):
+    """Model for extra per-guild settings stored as JSON values"""
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False)  # Discord Guild ID
+    key = db.Column(db.String(50), nullable=False)  # Setting name
+    value = db.Column(db.Text, nullable=False)  # JSON encoded value
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('guild_id', 'key', name='unique_guild_setting'),)
+
+
 class RobloxVerification(db.Model):
     """Model for storing Discord to Roblox user verification"""
     id = db.Column(db.Integer, primary_key=True)
     discord_id = db.Column(db.BigInteger, unique=True, nullable=False)  # Discord User ID
-    roblox_id = db.Column(db.BigInteger, nullable=False)  # Roblox User ID
+    roblox_id = db.Column(db.BigInteger, nullable=False, index=True)  # Roblox User ID, indexed for reverse lookups
     roblox_username = db.Column(db.String(50), nullable=False)  # Roblox Username
     verified_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class RankSnapshot(db.Model):
+    """Model for the last seen group role of verified users, used to detect rank changes"""
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False)  # Discord Guild ID
+    roblox_id = db.Column(db.BigInteger, nullable=False)  # Roblox User ID
+    role_id = db.Column(db.BigInteger, nullable=True)  # Roblox Role ID, None if not in the group
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('guild_id', 'roblox_id', name='unique_rank_snapshot'),)
+
+
 class VerificationCode(db.Model):
     """Model for temporary verification codes"""
     id = db.Column(db.Integer, primary_key=True)
     discord_id = db.Column(db.BigInteger, unique=True, nullable=False)  # Discord User ID
     roblox_username = db.Column(db.String(50), nullable=False)  # Roblox Username
     code = db.Column(db.String(10), nullable=False)  # Verification Code
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Indexed for expiry sweeps
 
 
 class BlacklistedGroup(db.Model):
@@ -45,6 +67,19 @@ class BlacklistedGroup(db.Model):
     __table_args__ = (db.UniqueConstraint('guild_id', 'group_id', name='unique_blacklisted_group'),)
 
 
+class BlacklistScreening(db.Model):
+    """Model for the last blacklist screening result of a verified user"""
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False)  # Discord Guild ID
+    roblox_id = db.Column(db.BigInteger, nullable=False)  # Roblox User ID
+    groups_hash = db.Column(db.String(64), nullable=False)  # Hash of the user's group IDs
+    blacklist_hash = db.Column(db.String(64), nullable=False)  # Hash of the guild blacklist at the time
+    flagged_groups = db.Column(db.Text, nullable=True)  # Comma separated blacklisted group IDs found
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('guild_id', 'roblox_id', name='unique_blacklist_screening'),)
+
+
 class Ticket(db.Model):
     """Model for support tickets"""
     id = db.Column(db.Integer, primary_key=True)
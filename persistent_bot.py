@@ -12,6 +12,9 @@ Features:
 - Automatic restarts if the bot crashes
 - Connection supervision with circuit breaker pattern
 - Status endpoints for health checks
+- Cluster mode: with CLUSTER_COUNT above 1, runs that many bot processes,
+  each an AutoShardedBot for its own group of shards (SHARD_COUNT total, or
+  Discord's recommendation), and reports per-shard latency and guild counts
 """
 
 import os
@@ -21,9 +24,12 @@ import signal
 import logging
 import traceback
 import subprocess
+import tempfile
 import threading
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from utils.status_server import StatusServer
+from utils.cluster import export_shard_metrics, read_cluster_status, recommended_shard_count, shard_groups
 
 # Configure logging
 logging.basicConfig(
@@ -37,221 +43,226 @@ logging.basicConfig(
 logger = logging.getLogger("persistent_bot")
 
 # Configuration
-BOT_SCRIPT = "discord_bot_only_run.py"  # The main bot script to run
+BOT_SCRIPT = "discord_main.py"  # The main bot script to run
 CHECK_INTERVAL = 60  # Check bot health every 60 seconds
 MAX_RESTARTS = 10    # Maximum number of restarts before cooling down
 COOLDOWN_TIME = 300  # 5 minutes cooldown after hitting max restarts
 HTTP_PORT = 9000     # Port for health check HTTP server
+IDENTIFY_INTERVAL = 5  # Discord allows one shard to identify every 5 seconds
+
+# Number of bot processes; with more than one, each runs its own group of shards
+CLUSTER_COUNT = max(1, int(os.environ.get("CLUSTER_COUNT", 1)))
 
 # Global state
-bot_process = None
-restart_count = 0
-last_restart_time = None
+workers = []
+status_dir = None
 is_running = True
 
-class HealthServer(BaseHTTPRequestHandler):
-    """Simple HTTP server for health checks"""
+class BotWorker:
+    """One supervised bot process, running a group of shards in cluster mode"""
     
-    def do_GET(self):
-        """Handle GET requests with status information"""
-        global bot_process, restart_count, last_restart_time
-        
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            
-            status = "RUNNING" if bot_process and bot_process.poll() is None else "STOPPED"
-            uptime = "N/A"
-            
-            if bot_process and bot_process.poll() is None and last_restart_time:
-                uptime_seconds = (datetime.now() - last_restart_time).total_seconds()
-                days, remainder = divmod(uptime_seconds, 86400)
-                hours, remainder = divmod(remainder, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                uptime = f"{int(days)}d {int(hours)}h {int(minutes)}m {int(seconds)}s"
-            
-            response = (
-                f"Status: {status}\n"
-                f"Uptime: {uptime}\n"
-                f"Restarts: {restart_count}\n"
-                f"PID: {bot_process.pid if bot_process else 'N/A'}\n"
-                f"Last Restart: {last_restart_time.strftime('%Y-%m-%d %H:%M:%S') if last_restart_time else 'N/A'}\n"
-            )
-            
-            self.wfile.write(response.encode())
-        elif self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            # Get uptime string if available
-            uptime_str = "N/A"
-            if bot_process and bot_process.poll() is None and last_restart_time:
-                uptime_seconds = (datetime.now() - last_restart_time).total_seconds()
-                days, remainder = divmod(uptime_seconds, 86400)
-                hours, remainder = divmod(remainder, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                uptime_str = f"{int(days)}d {int(hours)}h {int(minutes)}m {int(seconds)}s"
-            
-            # Get status class and text
-            status_class = 'running' if bot_process and bot_process.poll() is None else 'stopped'
-            status_text = 'RUNNING' if bot_process and bot_process.poll() is None else 'STOPPED'
-            
-            # Get PID and last restart time formatted
-            pid_text = str(bot_process.pid) if bot_process else 'N/A'
-            last_restart_text = last_restart_time.strftime('%Y-%m-%d %H:%M:%S') if last_restart_time else 'N/A'
-            
-            html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Discord Bot Status</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
-                    h1 {{ color: #333; }}
-                    .status {{ padding: 10px; border-radius: 5px; margin: 20px 0; }}
-                    .running {{ background-color: #d4edda; color: #155724; }}
-                    .stopped {{ background-color: #f8d7da; color: #721c24; }}
-                    pre {{ background: #f4f4f4; padding: 15px; border-radius: 5px; }}
-                </style>
-            </head>
-            <body>
-                <h1>Discord Bot Status Monitor</h1>
-                <div class="status {status_class}">
-                    Status: {status_text}
-                </div>
-                <pre>
-Uptime: {uptime_str}
-Restarts: {restart_count}
-PID: {pid_text}
-Last Restart: {last_restart_text}
-                </pre>
-                <p><a href="/health">Raw Health Check</a></p>
-            </body>
-            </html>
-            """
-            
-            self.wfile.write(html.encode())
-        else:
-            self.send_response(404)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Not Found')
+    def __init__(self, cluster_id, shard_ids=None, shard_count=None):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.restart_count = 0
+        self.last_restart_time = None
+        self.cooldown_until = None
     
-    def log_message(self, format, *args):
-        """Override to use our custom logger"""
-        logger.debug(f"Health server: {format % args}")
-
-def start_health_server():
-    """Start the health check HTTP server in a separate thread"""
-    port = int(os.environ.get("PORT", HTTP_PORT))
-    server = HTTPServer(('0.0.0.0', port), HealthServer)
-    logger.info(f"Starting health check server on port {port}")
+    @property
+    def name(self):
+        return f"cluster {self.cluster_id}" if CLUSTER_COUNT > 1 else "bot"
     
-    # Run the server in a daemon thread so it exits when the main program exits
-    server_thread = threading.Thread(target=server.serve_forever)
-    server_thread.daemon = True
-    server_thread.start()
-    logger.info("Health check server started")
-
-def start_bot():
-    """Start the Discord bot as a subprocess"""
-    global bot_process, restart_count, last_restart_time
+    def is_running(self):
+        """Check if the bot subprocess is alive"""
+        return self.process is not None and self.process.poll() is None
     
-    logger.info(f"Starting Discord bot using {BOT_SCRIPT}")
+    def start(self):
+        """Start the Discord bot as a subprocess"""
+        logger.info(f"Starting {self.name} using {BOT_SCRIPT}")
+        
+        # Set appropriate environment variables
+        env = os.environ.copy()
+        env["DISCORD_BOT_WORKFLOW"] = "true"
+        env["NO_WEB_SERVER"] = "true"
+        env["BOT_ONLY_MODE"] = "true"
+        env["CLUSTER_ID"] = str(self.cluster_id)
+        env["CLUSTER_STATUS_DIR"] = status_dir
+        if self.shard_ids is not None:
+            env["SHARD_COUNT"] = str(self.shard_count)
+            env["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in self.shard_ids)
+        
+        # Start the bot process
+        self.process = subprocess.Popen(
+            [sys.executable, BOT_SCRIPT],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env
+        )
+        
+        self.last_restart_time = datetime.now()
+        self.restart_count += 1
+        
+        shards = f", shards {self.shard_ids[0]}-{self.shard_ids[-1]} of {self.shard_count}" if self.shard_ids else ""
+        logger.info(f"{self.name.capitalize()} started with PID {self.process.pid} (restart #{self.restart_count}{shards})")
+        
+        # Start a thread to relay the output of the bot process
+        process = self.process
+        prefix = f"[cluster {self.cluster_id}] " if CLUSTER_COUNT > 1 else ""
+        
+        def read_output():
+            try:
+                for line in iter(process.stdout.readline, b""):
+                    print(prefix + line.decode(errors="replace").rstrip())
+            except Exception as e:
+                logger.error(f"Error reading {self.name} output: {e}")
+        
+        output_thread = threading.Thread(target=read_output)
+        output_thread.daemon = True
+        output_thread.start()
     
-    # Set appropriate environment variables
-    env = os.environ.copy()
-    env["DISCORD_BOT_WORKFLOW"] = "true"
-    env["NO_WEB_SERVER"] = "true"
-    env["BOT_ONLY_MODE"] = "true"
+    def stop(self):
+        """Terminate the process, killing it if it doesn't exit in time"""
+        if not self.process:
+            return
+        
+        logger.info(f"Terminating {self.name} (PID: {self.process.pid})")
+        try:
+            self.process.terminate()
+            # Give it a moment to shut down gracefully
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                # Force kill if it didn't terminate
+                self.process.kill()
+        except Exception as e:
+            logger.error(f"Error terminating {self.name}: {e}")
     
-    # Start the bot process
-    bot_process = subprocess.Popen(
-        [sys.executable, BOT_SCRIPT],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        env=env
-    )
+    def check(self):
+        """Restart the process if it died, respecting the restart limit"""
+        if self.is_running():
+            logger.debug(f"Health check: {self.name} is running (PID: {self.process.pid})")
+            return
+        
+        logger.warning(f"{self.name.capitalize()} is not running or has stopped")
+        
+        # Check if we've hit the restart limit
+        if self.restart_count >= MAX_RESTARTS:
+            if self.cooldown_until is None:
+                logger.warning(f"{self.name.capitalize()} hit the maximum restart limit ({MAX_RESTARTS}), cooling down for {COOLDOWN_TIME} seconds")
+                self.cooldown_until = time.time() + COOLDOWN_TIME
+            if time.time() < self.cooldown_until:
+                return
+            self.cooldown_until = None
+            self.restart_count = 0
+        
+        # Restart the bot
+        self.start()
     
-    last_restart_time = datetime.now()
-    restart_count += 1
+    def status(self):
+        """Status page section describing this process"""
+        uptime = "N/A"
+        if self.is_running() and self.last_restart_time:
+            uptime_seconds = (datetime.now() - self.last_restart_time).total_seconds()
+            days, remainder = divmod(uptime_seconds, 86400)
+            hours, remainder = divmod(remainder, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            uptime = f"{int(days)}d {int(hours)}h {int(minutes)}m {int(seconds)}s"
+        
+        return {
+            "cluster_id": self.cluster_id,
+            "status": "running" if self.is_running() else "stopped",
+            "shard_ids": self.shard_ids,
+            "bot_uptime": uptime,
+            "restarts": self.restart_count,
+            "pid": self.process.pid if self.process else None,
+            "last_restart": self.last_restart_time.strftime('%Y-%m-%d %H:%M:%S') if self.last_restart_time else None
+        }
+
+def bot_is_running():
+    """Check if every bot subprocess is alive"""
+    return bool(workers) and all(worker.is_running() for worker in workers)
+
+def supervisor_status():
+    """Status page section describing the supervised bot processes"""
+    running = sum(1 for worker in workers if worker.is_running())
+    if running == len(workers):
+        status = "running"
+    else:
+        status = "degraded" if running else "stopped"
     
-    logger.info(f"Bot started with PID {bot_process.pid} (restart #{restart_count})")
+    # Shard latency and guild counts, as published by the workers themselves;
+    # the workers run without a web server, so their gauges are served here
+    cluster = read_cluster_status(status_dir)
+    export_shard_metrics(cluster["shards"])
+    return {
+        "status": status,
+        "workers": [worker.status() for worker in workers],
+        "guilds": cluster["guilds"],
+        "shards_online": cluster["shards_online"],
+        "max_latency_ms": cluster["max_latency_ms"],
+        "shards": cluster["shards"]
+    }
+
+def plan_workers():
+    """Create one worker per cluster, each with its group of shards"""
+    if CLUSTER_COUNT == 1:
+        # A single process handles sharding itself if SHARD_COUNT is set
+        return [BotWorker(0)]
     
-    # Start a thread to read the output from the bot process
-    def read_output():
-        while bot_process and bot_process.poll() is None:
-            try:
-                if bot_process and bot_process.stdout:
-                    # Use a non-blocking approach
-                    try:
-                        output = bot_process.stdout.readline()
-                        if output:
-                            print(output.decode().strip())
-                    except AttributeError:
-                        # Handle case where stdout doesn't have readline
-                        pass
-                else:
-                    # If stdout is None, wait and then continue
-                    time.sleep(1)
-                    continue
-            except Exception as e:
-                logger.error(f"Error reading bot output: {e}")
-            time.sleep(0.1)
+    shard_count = os.environ.get("SHARD_COUNT", "auto").strip().lower()
+    if shard_count == "auto":
+        shard_count = recommended_shard_count(os.environ.get("DISCORD_TOKEN", "")) or CLUSTER_COUNT
     
-    output_thread = threading.Thread(target=read_output)
-    output_thread.daemon = True
-    output_thread.start()
+    # Every cluster needs at least one shard
+    shard_count = max(int(shard_count), CLUSTER_COUNT)
+    logger.info(f"Running {shard_count} shards across {CLUSTER_COUNT} clusters")
+    return [
+        BotWorker(cluster_id, shard_ids, shard_count)
+        for cluster_id, shard_ids in enumerate(shard_groups(shard_count, CLUSTER_COUNT))
+    ]
+
+def start_health_server():
+    """Start the shared status server on its own event loop thread"""
+    server = StatusServer("Discord Bot Status Monitor", health_check=bot_is_running)
+    server.add_source(supervisor_status)
+    server.start_in_thread(int(os.environ.get("PORT", HTTP_PORT)))
+    return server
+
+def start_workers():
+    """Start every worker, staggered so their shards don't identify at once"""
+    for index, worker in enumerate(workers):
+        if index:
+            time.sleep(IDENTIFY_INTERVAL * len(workers[index - 1].shard_ids or [0]))
+        if not is_running:
+            return
+        worker.start()
 
 def check_bot_health():
-    """Check if the bot is still running and restart if needed"""
-    global bot_process, restart_count, is_running
-    
+    """Check if the bots are still running and restart them if needed"""
     while is_running:
         time.sleep(CHECK_INTERVAL)
-        
-        # Check if bot process is still running
-        if not bot_process or bot_process.poll() is not None:
-            logger.warning("Bot process is not running or has stopped")
-            
-            # Check if we've hit the restart limit
-            if restart_count >= MAX_RESTARTS:
-                logger.warning(f"Hit maximum restart limit ({MAX_RESTARTS}), cooling down for {COOLDOWN_TIME} seconds")
-                time.sleep(COOLDOWN_TIME)
-                restart_count = 0
-            
-            # Restart the bot
-            start_bot()
-        else:
-            # Bot is still running, log a health check message
-            logger.debug(f"Health check: Bot is running (PID: {bot_process.pid})")
+        for worker in workers:
+            worker.check()
 
 def signal_handler(sig, frame):
     """Handle termination signals gracefully"""
-    global is_running, bot_process
+    global is_running
     
     logger.info(f"Received signal {sig}, shutting down")
     is_running = False
     
-    if bot_process:
-        logger.info(f"Terminating bot process (PID: {bot_process.pid})")
-        try:
-            bot_process.terminate()
-            # Give it a moment to shut down gracefully
-            time.sleep(2)
-            if bot_process.poll() is None:
-                # Force kill if it didn't terminate
-                bot_process.kill()
-        except Exception as e:
-            logger.error(f"Error terminating bot process: {e}")
+    for worker in workers:
+        worker.stop()
     
     logger.info("Shutdown complete")
     sys.exit(0)
 
 def main():
     """Main entry point"""
+    global workers, status_dir
+    
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -262,15 +273,20 @@ def main():
     print("="*70)
     print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Bot script: {BOT_SCRIPT}")
+    print(f"Clusters: {CLUSTER_COUNT}")
     print(f"Health check interval: {CHECK_INTERVAL} seconds")
     print("="*70 + "\n")
     
     try:
+        # Workers publish their shard status here for the status page
+        status_dir = os.environ.get("CLUSTER_STATUS_DIR") or tempfile.mkdtemp(prefix="forcorn_cluster_")
+        workers = plan_workers()
+        
         # Start the health check server
         start_health_server()
         
         # Initial bot start
-        start_bot()
+        start_workers()
         
         # Start the health check thread
         health_thread = threading.Thread(target=check_bot_health)
@@ -280,7 +296,7 @@ def main():
         # Keep the main thread alive
         while is_running:
             time.sleep(1)
-            
+    
     except Exception as e:
         logger.critical(f"Fatal error in main loop: {e}")
         logger.critical(traceback.format_exc())
@@ -16,6 +16,7 @@ import os
 import json
 import logging
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Callable, Union, Optional, Any, Tuple
 
@@ -62,11 +63,135 @@ DEFAULT_ACTIONS = {
     "🔨": "kick_user"           # Kick the message author (mod only)
 }
 
+# Actions that read the message's author, content or embeds. Every other
+# action works on a partial message, so no REST fetch is needed for them.
+MESSAGE_CONTENT_ACTIONS = frozenset({
+    "approve_request",
+    "deny_request",
+    "delete_message",
+    "timeout_user",
+    "warn_user",
+    "kick_user"
+})
+
+# Actions that should only run once per message, no matter how many
+# people react. Anything else (e.g. ticket creation) is deduped per user.
+SINGLE_SHOT_ACTIONS = frozenset({
+    "approve_request",
+    "deny_request",
+    "close_ticket",
+    "pin_message",
+    "delete_message",
+    "timeout_user",
+    "warn_user",
+    "kick_user"
+})
+
+# Seconds after an action runs during which repeat reactions are absorbed
+ACTION_DEDUPE_WINDOW = 10
+
+# Permission bits that make a member a moderator for reaction actions:
+# administrator (1 << 3), manage_guild (1 << 5) and manage_messages (1 << 13)
+MOD_PERMISSIONS_MASK = (1 << 3) | (1 << 5) | (1 << 13)
+
+# Role permission bits that get a role access to reaction-created tickets:
+# administrator (1 << 3) and manage_messages (1 << 13)
+MOD_ROLE_PERMISSIONS_MASK = (1 << 3) | (1 << 13)
+
 # Data storage for reaction handlers
 DATA_DIR = "data"
 REACTION_CONFIG_FILE = os.path.join(DATA_DIR, "reaction_config.json")
 ACTIVE_HANDLERS_FILE = os.path.join(DATA_DIR, "active_reaction_handlers.json")
 
+def normalize_emoji(emoji) -> str:
+    """Normalize an emoji for lookups
+    
+    Discord may deliver unicode emoji with or without the U+FE0F variation
+    selector (e.g. 🗑️ vs 🗑), so it is stripped from lookup keys.
+    """
+    return str(emoji).replace("\ufe0f", "")
+
+class RawReaction:
+    """Lightweight stand-in for discord.Reaction built from a raw payload
+    
+    Action methods only use ``message``, ``emoji`` and ``remove()``, so this
+    lets them run without fetching the message and scanning its reactions.
+    """
+    
+    def __init__(self, message, emoji):
+        self.message = message
+        self.emoji = emoji
+    
+    async def remove(self, user) -> None:
+        """Remove this reaction for the given user"""
+        await self.message.remove_reaction(self.emoji, user)
+
+class ModeratorCache:
+    """Per-guild cache of moderator roles and member permission bitsets
+    
+    Member guild permissions are computed once and reused until the member's
+    roles or the guild's roles change. That makes the permission check on the
+    reaction hot path a dictionary lookup.
+    """
+    
+    def __init__(self):
+        # guild_id -> frozenset of moderator role IDs
+        self._mod_roles = {}
+        # guild_id -> {member_id: guild permission bits}
+        self._member_permissions = {}
+    
+    @staticmethod
+    def _is_mod_role(role) -> bool:
+        """Check if a role should get access to reaction-created tickets"""
+        name = role.name.lower()
+        return bool(role.permissions.value & MOD_ROLE_PERMISSIONS_MASK) or "mod" in name or "admin" in name
+    
+    def get_mod_role_ids(self, guild) -> frozenset:
+        """Get the IDs of the guild's moderator roles
+        
+        Args:
+            guild: Discord guild (server)
+            
+        Returns:
+            frozenset: Moderator role IDs
+        """
+        role_ids = self._mod_roles.get(guild.id)
+        if role_ids is None:
+            role_ids = frozenset(role.id for role in guild.roles if self._is_mod_role(role))
+            self._mod_roles[guild.id] = role_ids
+        return role_ids
+    
+    def get_member_permissions(self, member) -> int:
+        """Get a member's guild permission bits
+        
+        Args:
+            member: Discord member
+            
+        Returns:
+            int: Permission bitset
+        """
+        members = self._member_permissions.setdefault(member.guild.id, {})
+        permissions = members.get(member.id)
+        if permissions is None:
+            permissions = member.guild_permissions.value
+            members[member.id] = permissions
+        return permissions
+    
+    def is_moderator(self, member) -> bool:
+        """Check if a member has moderator permissions"""
+        return bool(self.get_member_permissions(member) & MOD_PERMISSIONS_MASK)
+    
+    def invalidate_guild(self, guild_id: int) -> None:
+        """Forget everything cached for a guild (role created/updated/deleted)"""
+        self._mod_roles.pop(guild_id, None)
+        self._member_permissions.pop(guild_id, None)
+    
+    def invalidate_member(self, guild_id: int, member_id: int) -> None:
+        """Forget a member's cached permissions (roles changed or member left)"""
+        members = self._member_permissions.get(guild_id)
+        if members:
+            members.pop(member_id, None)
+
 class ReactionActionHandler:
     """Handles message reaction-based actions"""
     
@@ -79,6 +204,17 @@ class ReactionActionHandler:
         self.bot = bot
         self.actions = DEFAULT_ACTIONS.copy()
         self.active_messages = {}
+        # Precomputed emoji -> action lookup tables, keyed by message ID
+        self.emoji_actions = {}
+        # Cached moderator roles and member permissions per guild
+        self.mod_cache = ModeratorCache()
+        
+        # Reaction debouncing: actions currently running, and when each
+        # action key last finished (monotonic time)
+        self._inflight_actions = set()
+        self._recent_actions = {}
+        self.suppressed_duplicates = 0
+        self.suppressed_by_action = {}
         
         # Ensure data directory exists
         os.makedirs(DATA_DIR, exist_ok=True)
@@ -127,10 +263,31 @@ class ReactionActionHandler:
                     for message_id, message_data in handlers_data.items()
                 }
                 
+                self.emoji_actions = {
+                    message_id: self._build_emoji_table(message_data.get("allowed_reactions", []))
+                    for message_id, message_data in self.active_messages.items()
+                }
+                
                 logger.info(f"Loaded {len(self.active_messages)} active reaction handlers")
         except Exception as e:
             logger.error(f"Error loading active reaction handlers: {e}")
             self.active_messages = {}
+            self.emoji_actions = {}
+    
+    def _build_emoji_table(self, allowed_reactions: List[str]) -> Dict[str, str]:
+        """Build the emoji -> action lookup table for a registered message
+        
+        Args:
+            allowed_reactions: List of allowed emoji reactions for the message
+            
+        Returns:
+            dict: Normalized emoji mapped to the action name
+        """
+        return {
+            normalize_emoji(emoji): self.actions[emoji]
+            for emoji in allowed_reactions
+            if emoji in self.actions
+        }
     
     def _save_active_handlers(self) -> None:
         """Save the current active message handlers to file"""
@@ -177,6 +334,7 @@ class ReactionActionHandler:
             "created_at": datetime.now().isoformat(),
             "data": data
         }
+        self.emoji_actions[message_id] = self._build_emoji_table(allowed_reactions)
         
         self._save_active_handlers()
         logger.info(f"Registered message {message_id} for reaction handling of type '{action_type}'")
@@ -192,6 +350,7 @@ class ReactionActionHandler:
         """
         if message_id in self.active_messages:
             del self.active_messages[message_id]
+            self.emoji_actions.pop(message_id, None)
             self._save_active_handlers()
             logger.info(f"Unregistered message {message_id} from reaction handling")
             return True
@@ -211,39 +370,111 @@ class ReactionActionHandler:
             return
         
         message_id = reaction.message.id
-        if message_id not in self.active_messages:
+        emoji_table = self.emoji_actions.get(message_id)
+        if not emoji_table:
+            return
+        
+        # Check if this reaction is allowed and configured for this message
+        action_name = emoji_table.get(normalize_emoji(reaction.emoji))
+        if not action_name:
+            logger.debug(f"Reaction {reaction.emoji} not configured for message {message_id}")
             return
         
-        # Check if this reaction is allowed for this message
         handler_data = self.active_messages[message_id]
-        emoji = str(reaction.emoji)
+        logger.info(f"Processing reaction action '{action_name}' from user {user.name} on message {message_id}")
+        
+        # Process the action based on action type and emoji
+        await self._process_action(action_name, reaction, user, handler_data)
+    
+    async def handle_raw_reaction_add(self, payload) -> None:
+        """Handle a reaction straight from a raw gateway payload
+        
+        The action is resolved from the precomputed emoji table and runs on a
+        partial message built from the payload's IDs. Only actions that need
+        the message's content look it up, in the message cache first and
+        over REST otherwise. Duplicate reactions are absorbed before that.
+        
+        Args:
+            payload: Discord RawReactionActionEvent
+        """
+        emoji_table = self.emoji_actions.get(payload.message_id)
+        if not emoji_table:
+            return
         
-        if emoji not in handler_data["allowed_reactions"]:
-            logger.debug(f"Reaction {emoji} not in allowed reactions for message {message_id}")
+        action_name = emoji_table.get(normalize_emoji(payload.emoji))
+        if not action_name:
+            logger.debug(f"Reaction {payload.emoji} not configured for message {payload.message_id}")
             return
         
-        if emoji not in self.actions:
-            logger.debug(f"Reaction {emoji} not configured with an action")
+        guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
+        if not guild:
             return
         
-        action_name = self.actions[emoji]
-        logger.info(f"Processing reaction action '{action_name}' from user {user.name} on message {message_id}")
+        # The member is included in reaction add payloads for guild messages
+        user = payload.member or guild.get_member(payload.user_id)
+        if not user or user.bot:
+            return
         
-        # Get the message if not cached
-        if not hasattr(reaction, "message") or not reaction.message:
-            try:
-                channel = self.bot.get_channel(handler_data["channel_id"])
-                if not channel:
-                    logger.error(f"Could not find channel {handler_data['channel_id']}")
-                    return
-                
-                reaction.message = await channel.fetch_message(message_id)
-            except Exception as e:
-                logger.error(f"Error fetching message {message_id}: {e}")
-                return
+        channel = guild.get_channel_or_thread(payload.channel_id)
+        if not channel:
+            logger.error(f"Could not find channel {payload.channel_id}")
+            return
         
-        # Process the action based on action type and emoji
-        await self._process_action(action_name, reaction, user, handler_data)
+        handler_data = self.active_messages[payload.message_id]
+        
+        # _process_action resolves the full message only for actions that need it
+        message = channel.get_partial_message(payload.message_id)
+        
+        logger.info(f"Processing reaction action '{action_name}' from user {user.name} on message {payload.message_id}")
+        
+        await self._process_action(action_name, RawReaction(message, payload.emoji), user, handler_data)
+    
+    def _get_cached_message(self, message_id: int):
+        """Look up a message in the bot's message cache
+        
+        Args:
+            message_id: Discord message ID
+            
+        This scans the whole cache, so it is only used for actions that need
+        the message's content, where the alternative is a REST fetch.
+        
+        Returns:
+            The cached message, or None if it is not cached
+        """
+        # Newest messages are at the end of the cache
+        return discord.utils.find(lambda m: m.id == message_id, reversed(self.bot.cached_messages))
+    
+    def _action_key(self, message_id: int, action_name: str, user_id: int) -> Tuple:
+        """Build the debounce key for an action
+        
+        Single-shot actions are keyed per message, everything else per user.
+        """
+        if action_name in SINGLE_SHOT_ACTIONS:
+            return (message_id, action_name)
+        return (message_id, action_name, user_id)
+    
+    def _is_duplicate_action(self, action_key: Tuple) -> bool:
+        """Check if an action is already running or ran very recently"""
+        if action_key in self._inflight_actions:
+            return True
+        
+        finished_at = self._recent_actions.get(action_key)
+        return finished_at is not None and time.monotonic() - finished_at < ACTION_DEDUPE_WINDOW
+    
+    def _record_suppressed(self, action_name: str, message_id: int) -> None:
+        """Count a reaction that was absorbed as a duplicate"""
+        self.suppressed_duplicates += 1
+        self.suppressed_by_action[action_name] = self.suppressed_by_action.get(action_name, 0) + 1
+        logger.debug(f"Suppressed duplicate '{action_name}' on message {message_id} ({self.suppressed_duplicates} total)")
+    
+    def _prune_recent_actions(self) -> None:
+        """Drop debounce entries whose window has passed"""
+        cutoff = time.monotonic() - ACTION_DEDUPE_WINDOW
+        self._recent_actions = {
+            key: finished_at
+            for key, finished_at in self._recent_actions.items()
+            if finished_at >= cutoff
+        }
     
     async def _process_action(self, action_name: str, reaction, user, handler_data: Dict[str, Any]) -> None:
         """Process a specific reaction action
@@ -270,11 +501,39 @@ class ReactionActionHandler:
                     logger.error(f"Error removing unauthorized reaction: {e}")
                 return
         
+        # Only one run per action key at a time, plus a short dedupe window.
+        # There is no await between the check and the claim, so this is safe.
+        action_key = self._action_key(reaction.message.id, action_name, user.id)
+        if self._is_duplicate_action(action_key):
+            self._record_suppressed(action_name, reaction.message.id)
+            return
+        self._inflight_actions.add(action_key)
+        action_ran = False
+        
         try:
+            # Resolve the full message if the action reads its content
+            if action_name in MESSAGE_CONTENT_ACTIONS and not isinstance(reaction.message, discord.Message):
+                cached = self._get_cached_message(reaction.message.id)
+                if cached is not None:
+                    reaction.message = cached
+                else:
+                    try:
+                        reaction.message = await reaction.message.fetch()
+                    except Exception as e:
+                        logger.error(f"Error fetching message {reaction.message.id}: {e}")
+                        return
+            
             # Call the action method
+            action_ran = True
             await action_method(reaction, user, handler_data)
         except Exception as e:
             logger.error(f"Error processing action '{action_name}': {e}")
+        finally:
+            self._inflight_actions.discard(action_key)
+            if action_ran:
+                self._recent_actions[action_key] = time.monotonic()
+                if len(self._recent_actions) > 1000:
+                    self._prune_recent_actions()
     
     async def _check_mod_permissions(self, user, guild) -> bool:
         """Check if user has moderator permissions
@@ -291,12 +550,8 @@ class ReactionActionHandler:
         if not member:
             return False
         
-        # Check for admin or manage messages permission
-        return (
-            member.guild_permissions.administrator or
-            member.guild_permissions.manage_messages or
-            member.guild_permissions.manage_guild
-        )
+        # Check for admin, manage messages or manage server permission
+        return self.mod_cache.is_moderator(member)
     
     # ===== Action Methods =====
     
@@ -792,31 +1047,37 @@ def setup(bot):
         if payload.user_id == bot.user.id:
             return
         
-        # Check if this is a message we're tracking
-        if payload.message_id in handler.active_messages:
-            # Get the necessary objects
-            guild = bot.get_guild(payload.guild_id)
-            if not guild:
-                return
-            
-            channel = guild.get_channel(payload.channel_id)
-            if not channel:
-                return
-            
-            try:
-                message = await channel.fetch_message(payload.message_id)
-                user = guild.get_member(payload.user_id)
-                
-                if not message or not user:
-                    return
-                
-                # Find the reaction
-                for reaction in message.reactions:
-                    if str(reaction.emoji) == str(payload.emoji):
-                        await handler.handle_reaction_add(reaction, user)
-                        break
-            except Exception as e:
-                logger.error(f"Error handling reaction: {e}")
+        try:
+            await handler.handle_raw_reaction_add(payload)
+        except Exception as e:
+            logger.error(f"Error handling reaction: {e}")
+    
+    # Keep the moderator cache in sync with role changes
+    async def on_guild_role_change(role, after=None):
+        handler.mod_cache.invalidate_guild(role.guild.id)
+    
+    async def on_member_update(before, after):
+        if before.roles != after.roles:
+            handler.mod_cache.invalidate_member(after.guild.id, after.id)
+    
+    async def on_member_remove(member):
+        handler.mod_cache.invalidate_member(member.guild.id, member.id)
+    
+    async def on_guild_update(before, after):
+        # The owner implicitly has every permission
+        if before.owner_id != after.owner_id:
+            handler.mod_cache.invalidate_guild(after.id)
+    
+    async def on_guild_remove(guild):
+        handler.mod_cache.invalidate_guild(guild.id)
+    
+    bot.add_listener(on_guild_role_change, "on_guild_role_create")
+    bot.add_listener(on_guild_role_change, "on_guild_role_update")
+    bot.add_listener(on_guild_role_change, "on_guild_role_delete")
+    bot.add_listener(on_member_update, "on_member_update")
+    bot.add_listener(on_member_remove, "on_member_remove")
+    bot.add_listener(on_guild_update, "on_guild_update")
+    bot.add_listener(on_guild_remove, "on_guild_remove")
     
     # Command for setting up a reaction message
     @bot.tree.command(
@@ -858,15 +1119,7 @@ def setup(bot):
                 allowed_reactions = ["🎫"]
                 
                 # Get mod roles for ticket permissions
-                mod_roles = []
-                for role in interaction.guild.roles:
-                    if (role.permissions.manage_messages or 
-                        role.permissions.administrator or
-                        "mod" in role.name.lower() or
-                        "admin" in role.name.lower()):
-                        mod_roles.append(role.id)
-                
-                data["mod_roles"] = mod_roles
+                data["mod_roles"] = list(handler.mod_cache.get_mod_role_ids(interaction.guild))
                 
             elif action_type.lower() == "approval":
                 allowed_reactions = ["✅", "❌"]
@@ -980,13 +1233,7 @@ def setup(bot):
             panel_message = await target_channel.send(embed=embed)
             
             # Register the message
-            mod_roles = []
-            for role in interaction.guild.roles:
-                if (role.permissions.manage_messages or 
-                    role.permissions.administrator or
-                    "mod" in role.name.lower() or
-                    "admin" in role.name.lower()):
-                    mod_roles.append(role.id)
+            mod_roles = list(handler.mod_cache.get_mod_role_ids(interaction.guild))
             
             handler.register_message(
                 message_id=panel_message.id,
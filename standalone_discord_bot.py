@@ -3,25 +3,23 @@
 Standalone Discord Bot
 
 This is a completely standalone Discord bot script that doesn't import
-any other modules from the project. It's solely purpose is to run 
-as an isolated Discord bot in the discord_bot workflow.
+the Flask app, database or any other bot modules from the project. It's
+solely purpose is to run as an isolated Discord bot in the discord_bot workflow.
 
-It also includes a minimal HTTP server for Render.com deployment
-to satisfy the port binding requirements.
+It also runs the shared status server on the bot's event loop for
+Render.com deployment to satisfy the port binding requirements.
 """
 
 import os
 import sys
 import logging
 import traceback
-import threading
 import random
 import string
 import json
 import aiohttp
 import asyncio
 from dotenv import load_dotenv
-from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # Configure logging
 logging.basicConfig(
@@ -34,7 +32,7 @@ logger = logging.getLogger("standalone_bot")
 # Print an obvious message about isolation mode
 print("="*80)
 print("STARTING DISCORD BOT IN COMPLETE ISOLATION MODE")
-print("This script does not import ANY other project modules")
+print("This script only imports the shared status server from the project")
 print("="*80)
 
 logger.info("Starting standalone Discord bot...")
@@ -72,6 +70,8 @@ def load_blacklisted_groups():
 
 def save_blacklisted_groups(blacklisted_groups):
     """Save blacklisted groups to file"""
+    # The blacklist changed, so the lookup sets have to be rebuilt
+    blacklist_index.clear()
     try:
         with open(BLACKLISTED_GROUPS_FILE, 'w') as f:
             json.dump(blacklisted_groups, f)
@@ -81,10 +81,21 @@ def save_blacklisted_groups(blacklisted_groups):
 # Initialize blacklisted groups
 blacklisted_groups = load_blacklisted_groups()
 
+# Frozen sets of blacklisted group IDs per guild, built on first use
+blacklist_index = {}
+
+def get_blacklist_index(guild_id):
+    """Get the set of blacklisted group IDs for a guild"""
+    index = blacklist_index.get(guild_id)
+    if index is None:
+        index = frozenset(blacklisted_groups.get(guild_id, []))
+        blacklist_index[guild_id] = index
+    return index
+
 # Roblox API utilities
 async def get_user_id_from_username(username):
     """Get Roblox user ID from username using Roblox API"""
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(trace_configs=[ROBLOX_TRACE]) as session:
         try:
             url = f"https://api.roblox.com/users/get-by-username?username={username}"
             async with session.get(url) as response:
@@ -103,7 +114,7 @@ async def get_user_id_from_username(username):
 
 async def get_user_groups(user_id):
     """Get groups a user belongs to using Roblox API"""
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(trace_configs=[ROBLOX_TRACE]) as session:
         try:
             url = f"https://groups.roblox.com/v2/users/{user_id}/groups/roles"
             async with session.get(url) as response:
@@ -126,11 +137,26 @@ except ImportError as e:
     logger.critical("Please make sure discord.py is installed")
     sys.exit(1)
 
+# These only depend on aiohttp and discord.py, so the bot stays isolated from the Flask app
+from utils.status_server import create_bot_status_server
+from utils.bot_metrics import MetricsCommandTree, instrument_bot
+from utils.command_sync import sync_commands
+from utils.tracing import TRACER
+
+# Records Roblox requests made from sampled commands as trace spans
+ROBLOX_TRACE = TRACER.http_trace_config("roblox")
+
 # Create bot instance with necessary intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(
+    command_prefix="!",
+    intents=intents,
+    tree_cls=MetricsCommandTree,
+    http_trace=TRACER.http_trace_config("discord")
+)
+instrument_bot(bot)
 
 @bot.event
 async def on_ready():
@@ -146,44 +172,12 @@ async def on_ready():
         )
     )
     
-    # Ensure commands are synced, with extra safety checks
-    try:
-        # First try syncing without clearing
-        synced = await bot.tree.sync()
-        logger.info(f"Synced {len(synced)} global command(s)")
-        
-        # If no commands were synced, try a more aggressive approach
-        if len(synced) < 10:  # We should have at least 10 commands
-            logger.warning(f"Only {len(synced)} commands synced. Attempting recovery...")
-            
-            # Try force sync to all guilds
-            for guild in bot.guilds:
-                guild_id = guild.id
-                try:
-                    # Force sync to this guild
-                    guild_commands = await bot.tree.sync(guild=discord.Object(id=guild_id))
-                    logger.info(f"Force synced {len(guild_commands)} commands to guild {guild.name} (ID: {guild_id})")
-                except Exception as e:
-                    logger.error(f"Failed to force sync commands to guild {guild.name}: {e}")
-            
-            # Try global sync one more time
-            synced = await bot.tree.sync()
-            logger.info(f"Re-synced {len(synced)} global command(s) after recovery attempt")
-        else:
-            # Normal guild sync if initial sync was successful
-            for guild in bot.guilds:
-                guild_id = guild.id
-                try:
-                    guild_commands = await bot.tree.sync(guild=discord.Object(id=guild_id))
-                    logger.info(f"Synced {len(guild_commands)} commands to guild {guild.name} (ID: {guild_id})")
-                except Exception as e:
-                    logger.error(f"Failed to sync commands to guild {guild.name}: {e}")
-        
-        logger.info("All commands should now be available. If commands are still missing, they may take up to an hour to propagate through Discord's systems.")
-        
-    except Exception as e:
-        logger.error(f"Failed to sync commands: {e}")
-        logger.error(traceback.format_exc())
+    # Only calls Discord when the commands changed since the last sync; the
+    # commands are all global, so there is nothing to sync per guild
+    await sync_commands(
+        bot.tree,
+        force=os.environ.get("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
+    )
     
     logger.info("Bot is ready!")
 
@@ -784,7 +778,7 @@ async def blacklistedgroups(interaction: discord.Interaction, group_id: str):
         
         # Try to get group details for a better message
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[ROBLOX_TRACE]) as session:
                 url = f"https://groups.roblox.com/v1/groups/{group_id}"
                 async with session.get(url) as response:
                     if response.status == 200:
@@ -851,7 +845,7 @@ async def removeblacklist(interaction: discord.Interaction, group_id: str):
         
         # Try to get group details for a better message
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[ROBLOX_TRACE]) as session:
                 url = f"https://groups.roblox.com/v1/groups/{group_id}"
                 async with session.get(url) as response:
                     if response.status == 200:
@@ -890,7 +884,8 @@ async def background(interaction: discord.Interaction, roblox_username: str):
     guild_id = str(interaction.guild_id)
     
     # Check if there are blacklisted groups for this server
-    if guild_id not in blacklisted_groups or not blacklisted_groups[guild_id]:
+    guild_blacklist = get_blacklist_index(guild_id)
+    if not guild_blacklist:
         embed = discord.Embed(
             title="No Blacklisted Groups",
             description="This server doesn't have any blacklisted groups set up.",
@@ -913,21 +908,16 @@ async def background(interaction: discord.Interaction, roblox_username: str):
     # Get groups user is in
     user_groups = await get_user_groups(user_id)
     
-    # Initialize variables
-    flagged_groups = []
-    user_group_ids = []
-    
     # Extract group IDs
-    for group_data in user_groups:
-        group = group_data.get("group", {})
-        group_id = str(group.get("id", ""))
-        group_name = group.get("name", "Unknown Group")
-        
-        user_group_ids.append(group_id)
-        
-        # Check if this group is blacklisted
-        if group_id in blacklisted_groups[guild_id]:
-            flagged_groups.append((group_id, group_name))
+    user_group_ids = [str(group_data.get("group", {}).get("id", "")) for group_data in user_groups]
+    
+    # Check all of the user's groups against the blacklist at once
+    flagged_ids = guild_blacklist.intersection(user_group_ids)
+    flagged_groups = [
+        (group_id, group_data.get("group", {}).get("name", "Unknown Group"))
+        for group_id, group_data in zip(user_group_ids, user_groups)
+        if group_id in flagged_ids
+    ]
     
     # Create response
     if flagged_groups:
@@ -960,87 +950,17 @@ async def background(interaction: discord.Interaction, roblox_username: str):
     
     await interaction.followup.send(embed=embed, ephemeral=True)
 
-class SimpleHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        """Handle GET requests with a simple status page"""
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        
-        message = f"""
-        <html>
-        <head>
-            <title>ForCorn Bot Status</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                .container {{ max-width: 800px; margin: 0 auto; }}
-                h1 {{ color: #5865F2; }}
-                .status {{ padding: 20px; background-color: #f0f0f0; border-radius: 10px; }}
-                .online {{ color: green; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>ForCorn Discord Bot</h1>
-                <div class="status">
-                    <h2>Status: <span class="online">Online</span></h2>
-                    <p>The bot is running in standalone mode.</p>
-                    <p>Connected to {len(bot.guilds)} servers</p>
-                    <p>This web server exists to satisfy port binding requirements for hosting platforms.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        self.wfile.write(message.encode('utf-8'))
-    
-    def log_message(self, format, *args):
-        """Override log_message to use our logger"""
-        logger.info(f"HTTP: {self.address_string()} - {format % args}")
+# Status page for Render.com port binding, served on the bot's own event loop
+status_server = create_bot_status_server(bot, "ForCorn Discord Bot")
 
-def start_http_server():
-    """Start a minimal HTTP server for Render.com port binding"""
-    # Determine port for the HTTP server
-    # Try PORT environment variable first (for Render.com compatibility)
-    port = os.environ.get('PORT')
-    if port:
-        port = int(port)
-    else:
-        # Try using non-standard port 9000 to avoid conflicts with Flask (which typically uses 5000)
-        port = 9000
-    
-    try:
-        server = HTTPServer(('0.0.0.0', port), SimpleHandler)
-        logger.info(f"Starting HTTP server on port {port}")
-        
-        # Start in a separate thread so it doesn't block the bot
-        server_thread = threading.Thread(target=server.serve_forever)
-        server_thread.daemon = True
-        server_thread.start()
-        logger.info("HTTP server started successfully")
-    except Exception as e:
-        logger.error(f"Failed to start HTTP server on port {port}: {e}")
-        
-        # If the first port failed, try an alternative port
-        if port != 8080:
-            try:
-                port = 8080
-                server = HTTPServer(('0.0.0.0', port), SimpleHandler)
-                logger.info(f"Starting HTTP server on alternative port {port}")
-                
-                server_thread = threading.Thread(target=server.serve_forever)
-                server_thread.daemon = True
-                server_thread.start()
-                logger.info("HTTP server started successfully on alternative port")
-            except Exception as e2:
-                logger.error(f"Failed to start HTTP server on alternative port {port}: {e2}")
+async def setup_hook():
+    """Start the status server once the bot's event loop is running"""
+    await status_server.start()
+
+bot.setup_hook = setup_hook
 
 def main():
     """Main function to run the bot"""
-    # Start the HTTP server for port binding
-    start_http_server()
-    
     # Run the bot
     try:
         logger.info("Starting Discord bot...")
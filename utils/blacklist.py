@@ -1,13 +1,47 @@
+import time
 import logging
 import discord
 from discord import Embed, Color
 
+from utils.invalidation import BUS
+
 logger = logging.getLogger(__name__)
 
 class BlacklistSystem:
+    # Seconds a guild's index is kept, in case an invalidation is lost
+    INDEX_TTL = 60
+    
     def __init__(self, roblox_api, config):
         self.roblox_api = roblox_api
         self.config = config
+        # Blacklisted group IDs per guild as (expires at, index), evicted
+        # whenever the blacklist changes in this or any other process
+        self.blacklist_index = {}
+        # Bumped on every eviction, so a load racing one isn't cached
+        self.blacklist_index_generation = 0
+        BUS.subscribe("blacklist", self.invalidate_blacklist_index)
+    
+    def get_blacklist_index(self, guild_id):
+        """Get the set of blacklisted group IDs (as strings) for a guild"""
+        guild_key = str(guild_id)
+        cached = self.blacklist_index.get(guild_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        generation = self.blacklist_index_generation
+        server_config = self.config.get_server_config(guild_id)
+        index = frozenset(str(group_id) for group_id in server_config.get("blacklisted_groups", []))
+        if generation == self.blacklist_index_generation:
+            self.blacklist_index[guild_key] = (time.monotonic() + self.INDEX_TTL, index)
+        return index
+    
+    def invalidate_blacklist_index(self, guild_id=None):
+        """Forget the cached blacklist for one guild, or for every guild"""
+        self.blacklist_index_generation += 1
+        if guild_id is None:
+            self.blacklist_index.clear()
+        else:
+            self.blacklist_index.pop(str(guild_id), None)
     
     async def add_blacklisted_group(self, guild_id, group_id):
         """Add a group to the blacklist"""
@@ -17,19 +51,10 @@ class BlacklistSystem:
             if not group_info:
                 return False, "Invalid group ID. Please check the ID and try again."
             
-            # Get server config
-            server_config = self.config.get_server_config(guild_id)
-            
-            # Check if group is already blacklisted
-            if str(group_id) in server_config.get("blacklisted_groups", []):
+            # Add to blacklist, which does nothing if it is already there
+            if not self.config.add_blacklisted_group(guild_id, group_id):
                 return False, f"Group '{group_info['name']}' is already blacklisted."
-            
-            # Add to blacklist
-            blacklisted_groups = server_config.get("blacklisted_groups", [])
-            blacklisted_groups.append(str(group_id))
-            
-            # Update config
-            self.config.update_server_config(guild_id, "blacklisted_groups", blacklisted_groups)
+            self.invalidate_blacklist_index(guild_id)
             
             return True, f"Added '{group_info['name']}' (ID: {group_id}) to the blacklisted groups."
         
@@ -40,20 +65,10 @@ class BlacklistSystem:
     async def remove_blacklisted_group(self, guild_id, group_id):
         """Remove a group from the blacklist"""
         try:
-            # Get server config
-            server_config = self.config.get_server_config(guild_id)
-            
-            # Check if group is blacklisted
-            blacklisted_groups = server_config.get("blacklisted_groups", [])
-            
-            if str(group_id) not in blacklisted_groups:
-                return False, "This group is not in the blacklist."
-            
             # Remove from blacklist
-            blacklisted_groups.remove(str(group_id))
-            
-            # Update config
-            self.config.update_server_config(guild_id, "blacklisted_groups", blacklisted_groups)
+            if not self.config.remove_blacklisted_group(guild_id, group_id):
+                return False, "This group is not in the blacklist."
+            self.invalidate_blacklist_index(guild_id)
             
             # Try to get group name for the response
             group_info = await self.roblox_api.get_group_info(group_id)
@@ -65,6 +80,28 @@ class BlacklistSystem:
             logger.error(f"Error removing blacklisted group: {e}")
             return False, "An error occurred while removing the group from the blacklist."
     
+    async def import_blacklisted_groups(self, guild_id, group_ids_text):
+        """Add many groups to the blacklist at once
+        
+        group_ids_text is a list of group IDs separated by commas, spaces or
+        new lines. Group IDs are not looked up on Roblox, so hundreds can be
+        imported in one go.
+        
+        Returns:
+            tuple: (added IDs, IDs already blacklisted, invalid entries)
+        """
+        entries = group_ids_text.replace(",", " ").split()
+        group_ids = [entry for entry in entries if entry.isdigit() and len(entry) <= 20]
+        invalid = [entry for entry in entries if not (entry.isdigit() and len(entry) <= 20)]
+        
+        added = self.config.bulk_add_blacklisted_groups(guild_id, group_ids)
+        if added:
+            self.invalidate_blacklist_index(guild_id)
+        
+        added_set = set(added)
+        already = [group_id for group_id in dict.fromkeys(group_ids) if group_id not in added_set]
+        return added, already, invalid
+    
     async def list_blacklisted_groups(self, guild_id):
         """List all blacklisted groups"""
         try:
@@ -106,11 +143,8 @@ class BlacklistSystem:
             if not user_id:
                 return False, [], "Could not find that Roblox username."
             
-            # Get server config
-            server_config = self.config.get_server_config(guild_id)
-            
             # Get blacklisted groups
-            blacklisted_groups = server_config.get("blacklisted_groups", [])
+            blacklisted_groups = self.get_blacklist_index(guild_id)
             
             if not blacklisted_groups:
                 return True, [], "No groups are currently blacklisted."
@@ -118,16 +152,19 @@ class BlacklistSystem:
             # Get user's groups
             user_groups = await self.roblox_api.get_user_groups(user_id)
             
-            # Check for blacklisted groups
+            # Check all of the user's groups against the blacklist at once
+            user_group_ids = [str(group["group"]["id"]) for group in user_groups]
+            flagged = blacklisted_groups.intersection(user_group_ids)
+            
             blacklisted_user_groups = []
-            for group in user_groups:
-                group_id = str(group["group"]["id"])
-                if group_id in blacklisted_groups:
-                    blacklisted_user_groups.append({
-                        "id": group_id,
-                        "name": group["group"]["name"],
-                        "url": f"https://www.roblox.com/groups/{group_id}"
-                    })
+            if flagged:
+                for group_id, group in zip(user_group_ids, user_groups):
+                    if group_id in flagged:
+                        blacklisted_user_groups.append({
+                            "id": group_id,
+                            "name": group["group"]["name"],
+                            "url": f"https://www.roblox.com/groups/{group_id}"
+                        })
             
             if blacklisted_user_groups:
                 return False, blacklisted_user_groups, f"User is in {len(blacklisted_user_groups)} blacklisted groups."
@@ -0,0 +1,282 @@
+"""
+Background blacklist screening
+
+Walks every verified member of a guild in chunks, checks their Roblox groups
+against the guild blacklist and posts one report of new hits to the logs
+channel. Users whose groups and blacklist are unchanged since their last
+screening are not checked again. Hits stay saved until their report has
+been delivered, and each guild is screened at most once per SCREEN_INTERVAL
+however often the bot restarts.
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import discord
+from discord import Embed, Color
+
+from utils.json_files import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Saved cursor and unreported hits for each guild, keyed by guild ID
+PROGRESS_FILE = Path("data") / "screening_progress.json"
+
+# When each guild last finished a screening, keyed by guild ID
+SCHEDULE_FILE = Path("data") / "screening_schedule.json"
+
+def hash_group_ids(group_ids):
+    """Hash a collection of group IDs independent of their order"""
+    return hashlib.sha256(",".join(sorted(group_ids)).encode()).hexdigest()
+
+class BlacklistScreener:
+    """Re-screens verified members against the guild blacklist"""
+    
+    # Discord IDs checked per chunk; progress is saved after each one
+    CHUNK_SIZE = 200
+    # Concurrent Roblox lookups, lowered when we get rate limited
+    MAX_CONCURRENCY = 5
+    # Seconds to pause after a chunk that hit rate limits
+    MIN_BACKOFF = 30
+    MAX_BACKOFF = 600
+    # Hits listed in the report before it is cut short
+    MAX_REPORTED_HITS = 50
+    # Seconds between scheduled screenings of a guild
+    SCREEN_INTERVAL = 6 * 60 * 60
+    
+    def __init__(self, bot, blacklist_system):
+        self.bot = bot
+        self.blacklist_system = blacklist_system
+        self.roblox_api = blacklist_system.roblox_api
+        
+        self.concurrency = self.MAX_CONCURRENCY
+        self.backoff = self.MIN_BACKOFF
+        # Guild IDs with a screening in progress
+        self.running = set()
+    
+    async def screen_guild(self, guild, restart=False):
+        """Screen all verified members of a guild and report new hits
+        
+        Returns:
+            dict: Counts of checked, skipped (unchanged), failed and flagged users,
+                or None if a screening is already running for the guild
+        """
+        if guild.id in self.running:
+            return None
+        
+        self.running.add(guild.id)
+        try:
+            return await self._screen_guild(guild, restart)
+        finally:
+            self.running.discard(guild.id)
+    
+    async def _screen_guild(self, guild, restart):
+        """Screen a guild, resuming from its saved cursor unless restarting"""
+        blacklist = self.blacklist_system.get_blacklist_index(guild.id)
+        stats = {"checked": 0, "unchanged": 0, "failed": 0, "flagged": 0}
+        if not blacklist:
+            self._clear_progress(guild.id)
+            return stats
+        
+        blacklist_hash = hash_group_ids(blacklist)
+        progress = self._load_progress(guild.id)
+        # Restarting walks every member again but keeps hits still waiting for a report
+        cursor = 0 if restart else progress.get("cursor", 0)
+        hits = progress.get("hits", [])
+        
+        member_ids = sorted(member.id for member in guild.members if not member.bot and member.id > cursor)
+        for start in range(0, len(member_ids), self.CHUNK_SIZE):
+            chunk = member_ids[start:start + self.CHUNK_SIZE]
+            hits.extend(await self._screen_chunk(guild, chunk, blacklist, blacklist_hash, stats))
+            
+            self._save_progress(guild.id, {"cursor": chunk[-1], "hits": hits})
+        
+        # Members are flagged in the database once checked, so a hit that
+        # wasn't reported stays saved for the next screening to report
+        hits = self._current_hits(hits, blacklist)
+        if hits and not await self._send_report(guild, hits):
+            self._save_progress(guild.id, {"cursor": 0, "hits": hits})
+        else:
+            self._clear_progress(guild.id)
+        self._mark_screened(guild.id)
+        
+        stats["flagged"] = len(hits)
+        logger.info(f"Blacklist screening for guild {guild.id} finished: {stats}")
+        return stats
+    
+    async def _screen_chunk(self, guild, discord_ids, blacklist, blacklist_hash, stats):
+        """Screen one chunk of members, returning new hits"""
+        # Import the database models here to avoid circular imports
+        from app import app, db
+        from models import RobloxVerification, BlacklistScreening
+        
+        with app.app_context():
+            verifications = {
+                row.roblox_id: (row.discord_id, row.roblox_username)
+                for row in RobloxVerification.query.filter(RobloxVerification.discord_id.in_(discord_ids)).all()
+            }
+        if not verifications:
+            return []
+        
+        rate_limited_before = self.roblox_api.rate_limited_count
+        user_groups = await self.roblox_api.get_users_groups(list(verifications), concurrency=self.concurrency)
+        stats["failed"] += len(verifications) - len(user_groups)
+        
+        hits = []
+        with app.app_context():
+            states = {
+                state.roblox_id: state
+                for state in BlacklistScreening.query.filter(
+                    BlacklistScreening.guild_id == guild.id,
+                    BlacklistScreening.roblox_id.in_(list(user_groups))
+                ).all()
+            }
+            
+            for roblox_id, groups in sorted(user_groups.items()):
+                group_names = {str(group["group"]["id"]): group["group"]["name"] for group in groups}
+                groups_hash = hash_group_ids(group_names)
+                state = states.get(roblox_id)
+                
+                # Nothing changed on either side since the last screening
+                if state and state.groups_hash == groups_hash and state.blacklist_hash == blacklist_hash:
+                    stats["unchanged"] += 1
+                    continue
+                
+                stats["checked"] += 1
+                flagged = sorted(blacklist.intersection(group_names))
+                previously_flagged = set(state.flagged_groups.split(",")) if state and state.flagged_groups else set()
+                
+                new_flags = [group_id for group_id in flagged if group_id not in previously_flagged]
+                if new_flags:
+                    discord_id, roblox_username = verifications[roblox_id]
+                    hits.append({
+                        "discord_id": discord_id,
+                        "roblox_username": roblox_username,
+                        "groups": [{"id": group_id, "name": group_names[group_id]} for group_id in new_flags]
+                    })
+                
+                if state:
+                    state.groups_hash = groups_hash
+                    state.blacklist_hash = blacklist_hash
+                    state.flagged_groups = ",".join(flagged)
+                else:
+                    db.session.add(BlacklistScreening(
+                        guild_id=guild.id,
+                        roblox_id=roblox_id,
+                        groups_hash=groups_hash,
+                        blacklist_hash=blacklist_hash,
+                        flagged_groups=",".join(flagged)
+                    ))
+            
+            db.session.commit()
+        
+        await self._pace(self.roblox_api.rate_limited_count - rate_limited_before)
+        return hits
+    
+    async def _pace(self, rate_limited):
+        """Slow down after rate limits and speed back up when they stop"""
+        if rate_limited:
+            self.concurrency = max(1, self.concurrency // 2)
+            logger.warning(
+                f"Blacklist screening hit {rate_limited} rate limits, pausing {self.backoff}s "
+                f"with concurrency {self.concurrency}"
+            )
+            await asyncio.sleep(self.backoff)
+            self.backoff = min(self.MAX_BACKOFF, self.backoff * 2)
+        else:
+            self.concurrency = min(self.MAX_CONCURRENCY, self.concurrency + 1)
+            self.backoff = self.MIN_BACKOFF
+    
+    @staticmethod
+    def _current_hits(hits, blacklist):
+        """Drop groups taken off the blacklist since the hits were found"""
+        current = []
+        for hit in hits:
+            groups = [group for group in hit["groups"] if group["id"] in blacklist]
+            if groups:
+                current.append(dict(hit, groups=groups))
+        return current
+    
+    async def _send_report(self, guild, hits):
+        """Post a single report of new blacklist hits to the logs channel
+        
+        Returns:
+            bool: True if the report was delivered
+        """
+        server_config = self.bot.config.get_server_config(guild.id)
+        logs_channel_id = server_config.get("logs_channel")
+        channel = guild.get_channel(int(logs_channel_id)) if logs_channel_id else None
+        if not channel:
+            logger.warning(
+                f"Blacklist screening found {len(hits)} members in guild {guild.id} but no logs channel is set, "
+                f"keeping them for the next screening"
+            )
+            return False
+        
+        lines = []
+        for hit in hits[:self.MAX_REPORTED_HITS]:
+            group_list = ", ".join(f"{group['name']} ({group['id']})" for group in hit["groups"])
+            lines.append(f"<@{hit['discord_id']}> (**{hit['roblox_username']}**): {group_list}")
+        
+        description = "\n".join(lines)
+        if len(description) > 4000:
+            description = description[:4000].rsplit("\n", 1)[0]
+        if len(hits) > self.MAX_REPORTED_HITS:
+            description += f"\n...and {len(hits) - self.MAX_REPORTED_HITS} more"
+        
+        embed = Embed(
+            title="Blacklist Screening Report",
+            description=description,
+            color=Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        embed.set_footer(text=f"{len(hits)} members found in blacklisted groups")
+        
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            logger.error(f"Could not send blacklist screening report to guild {guild.id}, keeping it for the next screening: {e}")
+            return False
+        return True
+    
+    def is_due(self, guild_id):
+        """Whether a guild's last finished screening is older than SCREEN_INTERVAL"""
+        screened_at = read_json(SCHEDULE_FILE).get(str(guild_id), 0)
+        return time.time() - screened_at >= self.SCREEN_INTERVAL
+    
+    def _mark_screened(self, guild_id):
+        """Record that a guild just finished a screening"""
+        schedule = read_json(SCHEDULE_FILE)
+        schedule[str(guild_id)] = time.time()
+        write_json(SCHEDULE_FILE, schedule)
+    
+    def _load_progress(self, guild_id):
+        """Get the saved progress of an interrupted screening"""
+        return self._read_progress_file().get(str(guild_id), {})
+    
+    def _save_progress(self, guild_id, progress):
+        """Save the cursor and unreported hits after a chunk"""
+        all_progress = self._read_progress_file()
+        all_progress[str(guild_id)] = progress
+        self._write_progress_file(all_progress)
+    
+    def _clear_progress(self, guild_id):
+        """Forget saved progress for a guild"""
+        all_progress = self._read_progress_file()
+        if all_progress.pop(str(guild_id), None) is not None:
+            self._write_progress_file(all_progress)
+    
+    @staticmethod
+    def _read_progress_file():
+        """Load saved progress for all guilds"""
+        return read_json(PROGRESS_FILE)
+    
+    @staticmethod
+    def _write_progress_file(all_progress):
+        """Save progress for all guilds"""
+        # Every cluster worker shares the file, so it is replaced atomically
+        write_json(PROGRESS_FILE, all_progress)
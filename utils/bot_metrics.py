@@ -0,0 +1,81 @@
+"""
+Discord bot metrics
+
+Times every slash command through a CommandTree subclass, exposes the
+gateway latency of a bot on the shared metrics registry, starts a sampled
+trace per command and starts the event-loop monitor. Create bots with tree_cls=MetricsCommandTree and call
+instrument_bot(bot).
+"""
+
+import time
+import logging
+
+from discord import app_commands
+
+from utils.metrics import REGISTRY
+from utils.loop_monitor import MONITOR
+from utils.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "discord_command_duration_seconds",
+    "Time spent handling slash commands",
+    ["command", "outcome"]
+)
+GATEWAY_LATENCY = REGISTRY.gauge(
+    "discord_gateway_latency_seconds",
+    "Latency between a gateway heartbeat and its acknowledgement"
+)
+
+# Keys in Interaction.extras holding when the command started and its trace
+STARTED_AT = "metrics_started_at"
+TRACE_SPAN = "trace_span"
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """Command tree that records how long each slash command takes"""
+    
+    async def interaction_check(self, interaction):
+        interaction.extras[STARTED_AT] = time.perf_counter()
+        
+        command = interaction.command
+        if command:
+            span = TRACER.start_trace(
+                f"command.{command.qualified_name}",
+                guild_id=interaction.guild_id,
+                user_id=interaction.user.id
+            )
+            if span:
+                interaction.extras[TRACE_SPAN] = span
+        return True
+    
+    async def on_error(self, interaction, error):
+        observe_command(interaction, "error")
+        await super().on_error(interaction, error)
+
+def observe_command(interaction, outcome):
+    """Record the duration of a finished slash command"""
+    TRACER.finish_trace(interaction.extras.pop(TRACE_SPAN, None), error=outcome if outcome != "success" else None)
+    
+    started_at = interaction.extras.pop(STARTED_AT, None)
+    if started_at is None:
+        return
+    
+    command = interaction.command
+    name = command.qualified_name if command else "unknown"
+    COMMAND_SECONDS.observe(time.perf_counter() - started_at, command=name, outcome=outcome)
+
+def instrument_bot(bot):
+    """Report command completions, gateway latency and loop lag for a bot
+    
+    Call once when creating the bot; the loop monitor starts on first connect.
+    """
+    async def on_connect():
+        MONITOR.start()
+    
+    async def on_app_command_completion(interaction, command):
+        observe_command(interaction, "success")
+    
+    bot.add_listener(on_connect)
+    bot.add_listener(on_app_command_completion)
+    GATEWAY_LATENCY.set_function(lambda: bot.latency if bot.is_ready() else None)
@@ -0,0 +1,223 @@
+"""
+Guild-wide nickname and role sync
+
+Refreshes the nickname and verified role of every verified member of a
+guild in one background job, instead of one /update at a time. Progress is
+saved after each batch so an interrupted job can pick up where it stopped.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import discord
+
+from utils.json_files import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Saved progress for each guild, keyed by guild ID
+PROGRESS_FILE = Path("data") / "sync_progress.json"
+
+class BulkSyncJob:
+    """Background job that syncs nicknames and roles for a whole guild"""
+    
+    # Members handled per batch; progress is saved after each one
+    BATCH_SIZE = 100
+    # Discord IDs per database query
+    QUERY_CHUNK_SIZE = 5000
+    # Concurrent Roblox lookups per batch
+    LOOKUP_CONCURRENCY = 5
+    # Concurrent member edits
+    WORKERS = 3
+    # Attempts per member edit when rate limited
+    MAX_EDIT_ATTEMPTS = 5
+    
+    def __init__(self, guild, verification_system, server_config, restart=False):
+        self.guild = guild
+        self.verification_system = verification_system
+        self.roblox_api = verification_system.roblox_api
+        self.group_id = server_config.get("group_id")
+        self.rank_codes = server_config.get("rank_codes")
+        self.verified_role_id = server_config.get("verified_role")
+        self.restart = restart
+        
+        self.cursor = 0
+        self.stats = {
+            "total": 0,
+            "processed": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "not_verified": 0,
+            "failed": 0
+        }
+        self.started_at = None
+        self.finished = False
+        self.error = None
+        # asyncio task running the job, kept so it is not garbage collected
+        self.task = None
+    
+    async def run(self, progress_callback=None):
+        """Run the job to completion
+        
+        Args:
+            progress_callback: Optional coroutine function called with the job after each batch
+        """
+        self.started_at = datetime.utcnow()
+        if self.restart:
+            self._clear_progress()
+        else:
+            self._load_progress()
+        
+        try:
+            verified_role = None
+            if self.verified_role_id:
+                verified_role = self.guild.get_role(int(self.verified_role_id))
+            
+            # Members are handled in ID order so the cursor is a single number
+            members = sorted(
+                (member for member in self.guild.members if not member.bot),
+                key=lambda member: member.id
+            )
+            self.stats["total"] = len(members)
+            remaining = [member for member in members if member.id > self.cursor]
+            if self.cursor:
+                logger.info(f"Resuming sync for guild {self.guild.id} after member {self.cursor} ({len(remaining)} left)")
+            
+            verifications = self._load_verifications([member.id for member in remaining])
+            
+            for start in range(0, len(remaining), self.BATCH_SIZE):
+                batch = remaining[start:start + self.BATCH_SIZE]
+                await self._sync_batch(batch, verifications, verified_role)
+                
+                self.cursor = batch[-1].id
+                self._save_progress()
+                if progress_callback:
+                    await progress_callback(self)
+            
+            self.finished = True
+            self._clear_progress()
+            logger.info(f"Finished sync for guild {self.guild.id}: {self.stats}")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Sync for guild {self.guild.id} stopped after member {self.cursor}: {e}")
+            raise
+        
+        return self.stats
+    
+    def _load_verifications(self, member_ids):
+        """Load the Roblox accounts linked to the given Discord IDs"""
+        # Import the database models here to avoid circular imports
+        from app import app
+        from models import RobloxVerification
+        
+        verifications = {}
+        with app.app_context():
+            for start in range(0, len(member_ids), self.QUERY_CHUNK_SIZE):
+                chunk = member_ids[start:start + self.QUERY_CHUNK_SIZE]
+                rows = RobloxVerification.query.filter(RobloxVerification.discord_id.in_(chunk)).all()
+                for row in rows:
+                    verifications[row.discord_id] = (row.roblox_id, row.roblox_username)
+        
+        return verifications
+    
+    async def _sync_batch(self, batch, verifications, verified_role):
+        """Work out and apply the changes for one batch of members"""
+        verified = [member for member in batch if member.id in verifications]
+        self.stats["not_verified"] += len(batch) - len(verified)
+        
+        ranks = {}
+        if self.group_id and verified:
+            ranks = await self.roblox_api.get_user_group_ranks(
+                [verifications[member.id][0] for member in verified],
+                self.group_id,
+                concurrency=self.LOOKUP_CONCURRENCY
+            )
+        
+        changes = asyncio.Queue()
+        for member in verified:
+            roblox_id, roblox_username = verifications[member.id]
+            
+            # Leave members alone if their rank could not be looked up
+            if self.group_id and roblox_id not in ranks:
+                self.stats["failed"] += 1
+                continue
+            
+            nickname = self.verification_system.build_nickname(roblox_username, ranks.get(roblox_id), self.rank_codes)
+            edit = {}
+            if member.nick != nickname:
+                edit["nick"] = nickname
+            if verified_role and verified_role not in member.roles:
+                edit["roles"] = member.roles[1:] + [verified_role]
+            
+            if edit:
+                changes.put_nowait((member, edit))
+            else:
+                self.stats["unchanged"] += 1
+        
+        workers = [asyncio.create_task(self._edit_worker(changes)) for _ in range(self.WORKERS)]
+        await asyncio.gather(*workers)
+        
+        self.stats["processed"] += len(batch)
+    
+    async def _edit_worker(self, changes):
+        """Apply queued member edits, backing off when rate limited"""
+        while not changes.empty():
+            member, edit = changes.get_nowait()
+            
+            for attempt in range(1, self.MAX_EDIT_ATTEMPTS + 1):
+                try:
+                    await member.edit(reason="Roblox group sync", **edit)
+                    self.stats["updated"] += 1
+                    break
+                except discord.Forbidden:
+                    self.stats["failed"] += 1
+                    break
+                except discord.HTTPException as e:
+                    if e.status != 429 or attempt == self.MAX_EDIT_ATTEMPTS:
+                        logger.error(f"Failed to sync member {member.id} in guild {self.guild.id}: {e}")
+                        self.stats["failed"] += 1
+                        break
+                    
+                    retry_after = getattr(e, "retry_after", None) or 2 ** attempt
+                    logger.warning(f"Rate limited while syncing guild {self.guild.id}, retrying in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+    
+    def _load_progress(self):
+        """Restore the cursor and stats of an interrupted run"""
+        progress = self._read_progress_file().get(str(self.guild.id))
+        if progress:
+            self.cursor = progress.get("cursor", 0)
+            self.stats.update(progress.get("stats", {}))
+    
+    def _save_progress(self):
+        """Save the cursor and stats after a batch"""
+        all_progress = self._read_progress_file()
+        all_progress[str(self.guild.id)] = {
+            "cursor": self.cursor,
+            "stats": self.stats,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        self._write_progress_file(all_progress)
+    
+    def _clear_progress(self):
+        """Forget saved progress for this guild"""
+        all_progress = self._read_progress_file()
+        if all_progress.pop(str(self.guild.id), None) is not None:
+            self._write_progress_file(all_progress)
+    
+    @staticmethod
+    def _read_progress_file():
+        """Load saved progress for all guilds"""
+        return read_json(PROGRESS_FILE)
+    
+    @staticmethod
+    def _write_progress_file(all_progress):
+        """Save progress for all guilds"""
+        # Every cluster worker shares the file, so it is replaced atomically
+        write_json(PROGRESS_FILE, all_progress)
+
+def has_saved_progress(guild_id):
+    """Check if a guild has an interrupted sync that can be resumed"""
+    return str(guild_id) in BulkSyncJob._read_progress_file()
@@ -0,0 +1,197 @@
+"""
+Cluster mode helpers
+
+In cluster mode persistent_bot.py supervises several bot processes, each
+running an AutoShardedBot for its own group of shards. Settings are already
+shared through the database; the status of each process is shared through
+small JSON files in a directory the supervisor hands to every worker, which
+the supervisor reads back to serve one aggregated status endpoint and the
+shard gauges on its /metrics (workers run without a web server of their own).
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import urllib.request
+from pathlib import Path
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SHARD_LATENCY = REGISTRY.gauge(
+    "discord_shard_latency_seconds",
+    "Gateway heartbeat latency of each shard",
+    ["shard"]
+)
+SHARD_GUILDS = REGISTRY.gauge(
+    "discord_shard_guilds",
+    "Guilds handled by each shard",
+    ["shard"]
+)
+
+# Reports older than this mean the worker is hung or gone
+STALE_AFTER = 60
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+def shard_groups(shard_count, cluster_count):
+    """Split shard IDs 0..shard_count-1 into cluster_count contiguous groups
+    
+    Returns:
+        list: One list of shard IDs per cluster; clusters beyond the shard count get none
+    """
+    groups = []
+    for cluster_id in range(cluster_count):
+        start = shard_count * cluster_id // cluster_count
+        end = shard_count * (cluster_id + 1) // cluster_count
+        groups.append(list(range(start, end)))
+    return groups
+
+def recommended_shard_count(token, timeout=10):
+    """Ask Discord how many shards the bot should run
+    
+    Returns:
+        int: The recommended shard count, or None if Discord couldn't be asked
+    """
+    request = urllib.request.Request(
+        GATEWAY_BOT_URL,
+        headers={"Authorization": f"Bot {token}", "User-Agent": "ForCornBot (cluster supervisor)"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return int(json.load(response)["shards"])
+    except Exception as e:
+        logger.error(f"Could not get the recommended shard count from Discord: {e}")
+        return None
+
+def shard_status(bot):
+    """Latency and guild count of each shard a bot runs
+    
+    Works for plain bots too, which report a single shard.
+    """
+    guild_counts = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    
+    shards = getattr(bot, "shards", None)
+    if shards is None:
+        latencies = [(bot.shard_id or 0, bot.latency)]
+        states = {bot.shard_id or 0: "closed" if bot.is_closed() else "online" if bot.is_ready() else "starting"}
+    else:
+        latencies = [(shard_id, shard.latency) for shard_id, shard in shards.items()]
+        states = {shard_id: "closed" if shard.is_closed() else "online" for shard_id, shard in shards.items()}
+    
+    return [
+        {
+            "shard_id": shard_id,
+            # Latency is NaN until the first heartbeat is acknowledged
+            "latency_ms": round(latency * 1000) if latency == latency and latency != float("inf") else None,
+            "guilds": guild_counts.get(shard_id, 0),
+            "status": states[shard_id]
+        }
+        for shard_id, latency in sorted(latencies)
+    ]
+
+def _write_json(path, data):
+    # Write then rename, so the supervisor never reads half a report
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+class ClusterReporter:
+    """Periodically publishes a worker's shard status for the supervisor"""
+    
+    # Seconds between reports
+    INTERVAL = 10
+    
+    def __init__(self, bot, cluster_id, status_dir):
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.path = Path(status_dir) / f"cluster-{cluster_id}.json"
+        self.task = None
+    
+    def report(self):
+        """Current status of this worker, as written to its status file"""
+        shards = shard_status(self.bot)
+        export_shard_metrics(shards)
+        
+        return {
+            "cluster_id": self.cluster_id,
+            "pid": os.getpid(),
+            "status": "online" if self.bot.is_ready() else "starting",
+            "shard_count": self.bot.shard_count,
+            "guilds": len(self.bot.guilds),
+            "shards": shards,
+            "updated_at": time.time()
+        }
+    
+    async def _run(self):
+        while True:
+            try:
+                _write_json(self.path, self.report())
+            except Exception as e:
+                logger.error(f"Error writing cluster status to {self.path}: {e}")
+            await asyncio.sleep(self.INTERVAL)
+    
+    def start(self):
+        if self.task is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+def export_shard_metrics(shards):
+    """Set the shard gauges to exactly these shards, dropping any others"""
+    SHARD_LATENCY.clear()
+    SHARD_GUILDS.clear()
+    for shard in shards:
+        if shard["latency_ms"] is not None:
+            SHARD_LATENCY.set(shard["latency_ms"] / 1000, shard=str(shard["shard_id"]))
+        SHARD_GUILDS.set(shard["guilds"], shard=str(shard["shard_id"]))
+
+def read_cluster_status(status_dir, stale_after=STALE_AFTER):
+    """Aggregate the status files of every worker in a cluster
+    
+    Stale reports are listed under clusters but left out of every total
+    and of the shard list.
+    
+    Returns:
+        dict: Totals and live shards across the cluster plus each worker's own report
+    """
+    clusters = []
+    now = time.time()
+    for path in sorted(Path(status_dir).glob("cluster-*.json")):
+        try:
+            with open(path, "r") as f:
+                report = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read cluster status {path}: {e}")
+            continue
+        
+        if now - report.get("updated_at", 0) > stale_after:
+            report["status"] = "stale"
+        report.setdefault("status", "unknown")
+        clusters.append(report)
+    
+    # A stale report says nothing about its guilds or shards any more
+    live = [report for report in clusters if report["status"] != "stale"]
+    shards = [
+        dict(shard, cluster_id=report["cluster_id"])
+        for report in live
+        for shard in report.get("shards", [])
+    ]
+    latencies = [shard["latency_ms"] for shard in shards if shard["latency_ms"] is not None]
+    return {
+        "clusters": clusters,
+        "shards": shards,
+        "guilds": sum(report.get("guilds", 0) for report in live),
+        "shards_online": sum(1 for shard in shards if shard["status"] == "online"),
+        "max_latency_ms": max(latencies) if latencies else None
+    }
@@ -0,0 +1,110 @@
+"""
+Slash command sync that skips Discord when nothing changed
+
+Syncing the command tree on every start counts against Discord's command
+rate limits and slows restarts down. Instead the tree is serialized the way
+discord.py sends it, hashed, and compared with the hash recorded after the
+last successful sync of the same application and scope (global or one
+guild). Only a different hash, or force=True, makes the API call.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+
+import discord
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+COMMAND_SYNCS = REGISTRY.counter(
+    "command_syncs_total",
+    "Slash command sync attempts by scope and outcome",
+    ["scope", "result"]
+)
+
+# Hash of the last synced command tree per "<application id>:<scope>"
+STATE_FILE = Path("data") / "command_sync.json"
+
+# One sync at a time, so a dev sync can't race the startup one
+_sync_lock = asyncio.Lock()
+
+def command_tree_hash(tree, guild=None):
+    """Fingerprint of the commands tree.sync would send for a scope
+    
+    Args:
+        tree: The app_commands.CommandTree to hash
+        guild: Guild to hash the guild-only commands of, or None for global ones
+    """
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    
+    # Registration order doesn't matter to Discord, so it shouldn't change the hash
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+def _load_state(state_file):
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read {state_file}, commands will be synced: {e}")
+        return {}
+
+def _save_state(state_file, state):
+    # Write then rename, so a crash mid-write can't leave half a file behind
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    temporary = state_file.with_suffix(".tmp")
+    with open(temporary, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temporary, state_file)
+
+async def sync_commands(tree, guild=None, force=False, state_file=STATE_FILE):
+    """Sync a scope of the command tree if it changed since the last sync
+    
+    Args:
+        tree: The app_commands.CommandTree to sync
+        guild: Guild to sync the guild-only commands of, or None for global ones
+        force: Sync even when the hash matches the last synced one
+        state_file: JSON file the last synced hashes are kept in
+    
+    Returns:
+        tuple: (synced, message) where synced is True if Discord was called
+    """
+    label = "guild" if guild else "global"
+    scope = f"guild {guild.id}" if guild else "global"
+    key = f"{tree.client.application_id}:{guild.id if guild else 'global'}"
+    
+    async with _sync_lock:
+        fingerprint = command_tree_hash(tree, guild)
+        state = _load_state(state_file)
+        
+        if not force and state.get(key) == fingerprint:
+            COMMAND_SYNCS.inc(scope=label, result="skipped")
+            logger.info(f"Commands for {scope} unchanged since the last sync, skipping it")
+            return False, f"Commands for {scope} are already up to date"
+        
+        try:
+            synced = await tree.sync(guild=guild)
+        except discord.HTTPException as e:
+            COMMAND_SYNCS.inc(scope=label, result="error")
+            logger.error(f"Failed to sync commands for {scope}: {e}")
+            return False, f"Failed to sync commands for {scope}: {e}"
+        
+        state[key] = fingerprint
+        try:
+            _save_state(state_file, state)
+        except OSError as e:
+            # The sync itself worked, the next start will just sync again
+            logger.warning(f"Could not record the command sync in {state_file}: {e}")
+        
+        COMMAND_SYNCS.inc(scope=label, result="synced")
+        logger.info(f"Synced {len(synced)} commands for {scope}")
+        return True, f"Synced {len(synced)} commands for {scope}"
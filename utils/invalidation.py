@@ -0,0 +1,331 @@
+"""
+Cross-process cache invalidation bus
+
+Bot workers and the web app each keep their own in-memory caches of guild
+settings. When one process writes a setting it publishes an invalidation
+on the bus; every process (the writer included) then evicts the affected
+keys from its caches, so nobody keeps serving the old value.
+
+On PostgreSQL the bus uses LISTEN/NOTIFY, so processes on different hosts
+see each other. On SQLite, where every process shares one file on one
+machine anyway, each process binds a Unix datagram socket in a directory
+derived from the database URL and publishing sends to all of them.
+
+Messages can be lost (a listener reconnecting, a full socket buffer), so
+caches fed by the bus should still expire on their own after a while.
+Set INVALIDATION_BUS=off to run without it.
+"""
+
+import os
+import json
+import atexit
+import time
+import uuid
+import select
+import socket
+import hashlib
+import inspect
+import logging
+import tempfile
+import threading
+import weakref
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS = REGISTRY.counter(
+    "cache_invalidations_total",
+    "Cache invalidations published by this process or received from others",
+    ["scope", "direction"]
+)
+
+# Datagrams larger than this are dropped; invalidations are tiny
+MAX_MESSAGE_SIZE = 4096
+
+def database_url():
+    """The database URL the bot uses, normalized the same way as app.py"""
+    url = os.environ.get("DATABASE_URL") or "sqlite:///bot.db"
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+class PostgresBackend:
+    """Sends invalidations with NOTIFY and receives them with LISTEN"""
+    
+    CHANNEL = "forcorn_cache_invalidation"
+    
+    # Seconds to wait before reconnecting after the listener lost its connection
+    RECONNECT_DELAY = 5
+    
+    def __init__(self, url, on_message, on_gap):
+        """
+        Args:
+            url: PostgreSQL URL, with or without a SQLAlchemy driver suffix
+            on_message: Called with each payload published by any process
+            on_gap: Called after (re)connecting, when messages may have been missed
+        """
+        # libpq doesn't understand SQLAlchemy's "postgresql+driver://" form
+        scheme, _, rest = url.partition("://")
+        self.dsn = f"{scheme.split('+')[0]}://{rest}"
+        self.on_message = on_message
+        self.on_gap = on_gap
+        self.running = False
+        self.thread = None
+        self.send_connection = None
+        self.send_lock = threading.Lock()
+    
+    def _connect(self):
+        # Only needed when the database is PostgreSQL
+        import psycopg2
+        
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+    
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._listen, name="invalidation-listener", daemon=True)
+        self.thread.start()
+    
+    def _listen(self):
+        while self.running:
+            connection = None
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                logger.info(f"Listening for cache invalidations on {self.CHANNEL}")
+                
+                # Anything published before LISTEN took effect was missed
+                self.on_gap()
+                
+                while self.running:
+                    # Wake up now and then to notice stop()
+                    if not select.select([connection], [], [], 5)[0]:
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self.on_message(connection.notifies.pop(0).payload)
+            except Exception as e:
+                if self.running:
+                    logger.error(f"Cache invalidation listener failed, reconnecting in {self.RECONNECT_DELAY}s: {e}")
+                    time.sleep(self.RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    connection.close()
+    
+    def send(self, payload):
+        with self.send_lock:
+            try:
+                if self.send_connection is None or self.send_connection.closed:
+                    self.send_connection = self._connect()
+                with self.send_connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.CHANNEL, payload))
+            except Exception:
+                # Reconnect on the next send
+                self.send_connection = None
+                raise
+    
+    def stop(self):
+        self.running = False
+        with self.send_lock:
+            if self.send_connection is not None:
+                self.send_connection.close()
+                self.send_connection = None
+
+class UnixSocketBackend:
+    """Sends invalidations as datagrams to every process's socket in a shared directory"""
+    
+    def __init__(self, directory, on_message):
+        """
+        Args:
+            directory: Directory holding one socket per subscribed process
+            on_message: Called with each payload received from another process
+        """
+        self.directory = directory
+        self.on_message = on_message
+        self.path = None
+        self.receiver = None
+        self.sender = None
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.bind(self.path)
+        # Wake up now and then to notice stop()
+        self.receiver.settimeout(1)
+        
+        # Never block a publisher on a process that stopped reading
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.setblocking(False)
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._listen, name="invalidation-listener", daemon=True)
+        self.thread.start()
+        logger.info(f"Listening for cache invalidations on {self.path}")
+        
+        # Don't leave the socket file behind for others to keep sending to
+        atexit.register(self.stop)
+    
+    def _listen(self):
+        while self.running:
+            try:
+                data = self.receiver.recv(MAX_MESSAGE_SIZE)
+            except socket.timeout:
+                continue
+            except OSError:
+                # Socket closed by stop()
+                break
+            self.on_message(data.decode())
+    
+    def send(self, payload):
+        data = payload.encode()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            
+            try:
+                self.sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The process that bound it is gone
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as e:
+                logger.warning(f"Could not send cache invalidation to {name}: {e}")
+    
+    def stop(self):
+        self.running = False
+        for sock in (self.receiver, self.sender):
+            if sock is not None:
+                sock.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+class InvalidationBus:
+    """Publishes cache invalidations and calls the subscribed evictors"""
+    
+    def __init__(self):
+        # scope -> references to handlers called with the invalidated key
+        self.handlers = {}
+        self.backend = None
+        self.lock = threading.Lock()
+        # NOTIFY is delivered to the sender too; its own messages are skipped
+        self.origin = uuid.uuid4().hex
+    
+    def subscribe(self, scope, handler):
+        """Call handler(key) whenever scope is invalidated, by any process
+        
+        key is a string, or None when every key should be evicted. Bound
+        methods are held weakly, so subscribing doesn't keep objects alive.
+        """
+        reference = weakref.WeakMethod(handler) if inspect.ismethod(handler) else (lambda: handler)
+        with self.lock:
+            self.handlers.setdefault(scope, []).append(reference)
+    
+    def publish(self, scope, key=None):
+        """Evict key from scope in this process, then tell the others"""
+        key = None if key is None else str(key)
+        self._dispatch(scope, key)
+        INVALIDATIONS.inc(scope=scope, direction="sent")
+        
+        backend = self.backend
+        if backend is None:
+            return
+        try:
+            backend.send(json.dumps({"origin": self.origin, "scope": scope, "key": key}))
+        except Exception as e:
+            # The other processes' caches will expire on their own
+            logger.warning(f"Could not publish cache invalidation for {scope} {key}: {e}")
+    
+    def _receive(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation: {payload[:100]}")
+            return
+        
+        if message.get("origin") == self.origin:
+            return
+        INVALIDATIONS.inc(scope=message.get("scope"), direction="received")
+        self._dispatch(message.get("scope"), message.get("key"))
+    
+    def _evict_all(self):
+        """Evict everything, for when messages may have been missed"""
+        with self.lock:
+            scopes = list(self.handlers)
+        for scope in scopes:
+            self._dispatch(scope, None)
+    
+    def _dispatch(self, scope, key):
+        with self.lock:
+            references = list(self.handlers.get(scope, []))
+        
+        for reference in references:
+            handler = reference()
+            if handler is None:
+                # The subscriber was garbage collected
+                with self.lock:
+                    if reference in self.handlers.get(scope, []):
+                        self.handlers[scope].remove(reference)
+                continue
+            
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Error evicting {scope} {key}: {e}")
+    
+    def start(self, url=None):
+        """Connect to the other processes; does nothing if already started
+        
+        Returns:
+            bool: True if the bus is running
+        """
+        if os.environ.get("INVALIDATION_BUS", "on").lower() in ("0", "off", "false", "no"):
+            return False
+        
+        with self.lock:
+            if self.backend is not None:
+                return True
+            
+            url = url or database_url()
+            try:
+                if url.startswith("postgresql"):
+                    backend = PostgresBackend(url, self._receive, self._evict_all)
+                elif hasattr(socket, "AF_UNIX"):
+                    # One directory per database, so unrelated deployments don't mix
+                    directory = os.environ.get("INVALIDATION_SOCKET_DIR") or os.path.join(
+                        tempfile.gettempdir(),
+                        "forcorn-invalidation-" + hashlib.sha1(url.encode()).hexdigest()[:12]
+                    )
+                    backend = UnixSocketBackend(directory, self._receive)
+                else:
+                    logger.warning("No cache invalidation transport on this platform, caches will only expire")
+                    return False
+                
+                backend.start()
+            except Exception as e:
+                logger.error(f"Could not start the cache invalidation bus: {e}")
+                return False
+            
+            self.backend = backend
+            return True
+    
+    def stop(self):
+        with self.lock:
+            backend, self.backend = self.backend, None
+        if backend is not None:
+            backend.stop()
+
+# Shared bus for the process
+BUS = InvalidationBus()
@@ -0,0 +1,196 @@
+"""
+Join-time blacklist screening
+
+Checks members who were verified before against the guild blacklist as they
+join, and flags, quarantines or kicks them depending on the server setting.
+During join bursts checks are queued and run one at a time instead of
+firing a Roblox lookup for every joiner at once.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Supported values for the join_screening setting
+JOIN_SCREENING_MODES = ("off", "flag", "quarantine", "kick")
+
+class JoinScreener:
+    """Screens joining members against the guild blacklist"""
+    
+    # Seconds a join check may take before it is handed to the queue
+    LATENCY_BUDGET = 2.0
+    # More joins than this within BURST_WINDOW seconds switches to queued mode
+    BURST_THRESHOLD = 5
+    BURST_WINDOW = 10
+    # Seconds between queued checks
+    QUEUE_DELAY = 0.5
+    
+    def __init__(self, bot, blacklist_system):
+        self.bot = bot
+        self.blacklist_system = blacklist_system
+        self.roblox_api = blacklist_system.roblox_api
+        
+        # Recent join times per guild, for burst detection
+        self.recent_joins = {}
+        # Queued checks and their worker per guild
+        self.queues = {}
+        self.workers = {}
+    
+    async def on_member_join(self, member):
+        """Screen a member that just joined"""
+        if member.bot:
+            return
+        
+        guild = member.guild
+        server_config = self.bot.config.get_server_config(guild.id)
+        mode = server_config.get("join_screening", "off")
+        if mode not in JOIN_SCREENING_MODES or mode == "off":
+            return
+        
+        # Every join counts towards burst detection, verified or not
+        burst = self._is_burst(guild.id)
+        
+        # Nothing to check against
+        if not self.blacklist_system.get_blacklist_index(guild.id):
+            return
+        
+        # Only members who verified in the past can be checked before they verify
+        verification = self._get_verification(member.id)
+        if not verification:
+            return
+        
+        if burst or guild.id in self.queues:
+            self._enqueue(member, verification, server_config)
+            return
+        
+        try:
+            await self.screen_member(member, verification, server_config, timeout=self.LATENCY_BUDGET)
+        except asyncio.TimeoutError:
+            logger.info(f"Join screening for {member.id} in guild {guild.id} went over budget, queueing it")
+            self._enqueue(member, verification, server_config)
+    
+    async def screen_member(self, member, verification, server_config, timeout=None):
+        """Check a member's groups and act on any blacklisted ones
+        
+        Raises asyncio.TimeoutError if looking up the groups takes longer than
+        timeout seconds; no action has been taken in that case.
+        """
+        roblox_id, roblox_username = verification
+        user_groups = await asyncio.wait_for(self.roblox_api.get_users_groups([roblox_id]), timeout=timeout)
+        if roblox_id not in user_groups:
+            logger.warning(f"Could not fetch Roblox groups for {member.id} during join screening")
+            return
+        
+        groups = user_groups[roblox_id]
+        blacklist = self.blacklist_system.get_blacklist_index(member.guild.id)
+        group_ids = [str(group["group"]["id"]) for group in groups]
+        flagged = blacklist.intersection(group_ids)
+        if not flagged:
+            return
+        
+        flagged_groups = [
+            {"id": group_id, "name": group["group"]["name"]}
+            for group_id, group in zip(group_ids, groups)
+            if group_id in flagged
+        ]
+        await self._take_action(member, roblox_username, flagged_groups, server_config)
+    
+    def _get_verification(self, discord_id):
+        """Look up a Discord user's linked Roblox account"""
+        # Import the database models here to avoid circular imports
+        from app import app
+        from models import RobloxVerification
+        
+        with app.app_context():
+            row = RobloxVerification.query.filter_by(discord_id=discord_id).first()
+            if row:
+                return row.roblox_id, row.roblox_username
+        return None
+    
+    def _is_burst(self, guild_id):
+        """Record a join and check if the guild is in a join burst"""
+        now = time.monotonic()
+        joins = self.recent_joins.setdefault(guild_id, deque())
+        joins.append(now)
+        while joins and joins[0] < now - self.BURST_WINDOW:
+            joins.popleft()
+        return len(joins) > self.BURST_THRESHOLD
+    
+    def _enqueue(self, member, verification, server_config):
+        """Queue a check to run after the ones already waiting"""
+        guild_id = member.guild.id
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = asyncio.Queue()
+            self.queues[guild_id] = queue
+            self.workers[guild_id] = asyncio.create_task(self._drain_queue(guild_id, queue))
+        queue.put_nowait((member, verification, server_config))
+    
+    async def _drain_queue(self, guild_id, queue):
+        """Run queued checks one at a time, then stop"""
+        logger.info(f"Join screening for guild {guild_id} switched to queued mode")
+        try:
+            while not queue.empty():
+                member, verification, server_config = queue.get_nowait()
+                try:
+                    await self.screen_member(member, verification, server_config)
+                except Exception as e:
+                    logger.error(f"Error screening {member.id} in guild {guild_id}: {e}")
+                await asyncio.sleep(self.QUEUE_DELAY)
+        finally:
+            self.queues.pop(guild_id, None)
+            self.workers.pop(guild_id, None)
+            logger.info(f"Join screening queue for guild {guild_id} drained")
+    
+    async def _take_action(self, member, roblox_username, flagged_groups, server_config):
+        """Flag, quarantine or kick a member in blacklisted groups"""
+        mode = server_config.get("join_screening", "off")
+        guild = member.guild
+        group_list = ", ".join(f"{group['name']} ({group['id']})" for group in flagged_groups)
+        reason = f"In blacklisted Roblox groups: {group_list}"[:512]
+        outcome = "Flagged"
+        
+        try:
+            if mode == "quarantine":
+                role_id = server_config.get("quarantine_role")
+                role = guild.get_role(int(role_id)) if role_id else None
+                if role:
+                    await member.add_roles(role, reason=reason)
+                    outcome = f"Quarantined with {role.mention}"
+                else:
+                    outcome = "Flagged (no quarantine role is set)"
+            elif mode == "kick":
+                await member.kick(reason=reason)
+                outcome = "Kicked"
+        except discord.Forbidden:
+            outcome = f"Flagged (missing permissions to {mode})"
+        except discord.HTTPException as e:
+            logger.error(f"Join screening action failed for {member.id} in guild {guild.id}: {e}")
+            outcome = f"Flagged ({mode} failed)"
+        
+        logger.info(f"Join screening: {outcome} {member} ({member.id}) in guild {guild.id}")
+        
+        logs_channel_id = server_config.get("logs_channel")
+        channel = guild.get_channel(int(logs_channel_id)) if logs_channel_id else None
+        if not channel:
+            return
+        
+        embed = discord.Embed(
+            title="⚠️ Blacklisted Member Joined",
+            description=f"{member.mention} (**{roblox_username}**) is in blacklisted groups.",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Groups", value=group_list[:1024], inline=False)
+        embed.add_field(name="Action", value=outcome, inline=False)
+        
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            logger.error(f"Could not log join screening result in guild {guild.id}: {e}")
@@ -0,0 +1,31 @@
+"""
+Small JSON state files shared between processes
+
+Progress and schedule files under data/ are read and rewritten by every
+bot process (each cluster worker included). Writing to a temporary file
+and renaming it over the old one means a reader never sees a truncated
+file, and a crash mid-write leaves the previous contents in place.
+"""
+
+import os
+import json
+from pathlib import Path
+
+def read_json(path, default=None):
+    """Load a JSON file, or default ({} if not given) if it is missing or corrupt"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {} if default is None else default
+
+def write_json(path, data, indent=2):
+    """Atomically replace a JSON file with data"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # One temporary file per process, so concurrent writers don't share it
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temporary, path)
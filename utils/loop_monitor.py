@@ -0,0 +1,214 @@
+"""
+Event-loop lag monitor
+
+A heartbeat task measures how late the event loop wakes it up, and a
+watchdog thread notices when the heartbeat stops while the loop is blocked.
+When a stall crosses the threshold the watchdog grabs the stack of the loop
+thread, which is the code doing the blocking, and the stall is added to a
+rolling table of the slowest handlers for /debug loop and /debug/loop.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a callback scheduled for a known time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked for longer than the stall threshold"
+)
+
+# Standard library location, skipped when looking for the code to blame
+_STDLIB_PATH = os.path.dirname(os.__file__)
+
+def _is_library(filename):
+    """Check if a frame belongs to the standard library or an installed package"""
+    return filename.startswith(_STDLIB_PATH) or "site-packages" in filename
+
+class LoopMonitor:
+    """Measures event-loop lag and records what blocked the loop"""
+    
+    # Seconds between heartbeats
+    INTERVAL = 0.1
+    # Lag in seconds that counts as a stall and gets its stack captured
+    THRESHOLD = 0.25
+    # Handlers kept in the table; the least slow one is dropped when full
+    MAX_HANDLERS = 100
+    # Frames kept from each captured stack
+    STACK_DEPTH = 15
+    
+    def __init__(self):
+        self.loop = None
+        self.loop_thread_id = None
+        self.task = None
+        self.watchdog = None
+        
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        # Stats per blocking handler, keyed by handler name
+        self.handlers = {}
+        
+        self._lock = threading.Lock()
+        self._beat = 0
+        self._last_beat_at = time.monotonic()
+        # Stack captured by the watchdog during the current beat, if any
+        self._capture = None
+        self._captured_beat = None
+    
+    @property
+    def running(self):
+        """Whether the heartbeat task is active"""
+        return self.task is not None and not self.task.done()
+    
+    def start(self):
+        """Start monitoring the running event loop"""
+        if self.running:
+            return
+        
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self._last_beat_at = time.monotonic()
+        self.task = self.loop.create_task(self._heartbeat())
+        
+        if self.watchdog is None or not self.watchdog.is_alive():
+            self.watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self.watchdog.start()
+        logger.info("Event loop monitor started")
+    
+    def stop(self):
+        """Stop monitoring; the watchdog thread exits on its next check"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+    
+    async def _heartbeat(self):
+        """Sleep for INTERVAL over and over, measuring how late each wake-up is"""
+        while True:
+            expected = self.loop.time() + self.INTERVAL
+            await asyncio.sleep(self.INTERVAL)
+            lag = max(0.0, self.loop.time() - expected)
+            
+            with self._lock:
+                capture = self._capture if self._captured_beat == self._beat else None
+                self._capture = None
+                self._beat += 1
+                self._last_beat_at = time.monotonic()
+            
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            if lag >= self.THRESHOLD:
+                self._record_stall(lag, capture)
+    
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is stalled"""
+        while self.running:
+            time.sleep(self.INTERVAL / 2)
+            
+            with self._lock:
+                stalled_for = time.monotonic() - self._last_beat_at - self.INTERVAL
+                if stalled_for < self.THRESHOLD or self._captured_beat == self._beat:
+                    continue
+                beat = self._beat
+            
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            capture = self._describe(traceback.extract_stack(frame))
+            
+            with self._lock:
+                if self._beat == beat:
+                    self._capture = capture
+                    self._captured_beat = beat
+    
+    def _describe(self, stack):
+        """Work out the handler and blocking line from a captured stack
+        
+        The handler is the outermost frame below the event loop outside the
+        standard library and installed packages, the location the innermost.
+        """
+        start = 0
+        for index, frame in enumerate(stack):
+            if frame.name == "_run" and frame.filename.endswith(os.path.join("asyncio", "events.py")):
+                start = index + 1
+        own_frames = [frame for frame in stack[start:] if not _is_library(frame.filename)]
+        
+        # Library entry points like discord.py's event dispatch wrap everything,
+        # so blame the outermost and innermost frames of our own code
+        handler_frame = own_frames[0] if own_frames else stack[min(start, len(stack) - 1)]
+        location_frame = own_frames[-1] if own_frames else stack[-1]
+        
+        return {
+            "handler": f"{handler_frame.name} ({self._short_path(handler_frame.filename)})",
+            "location": f"{self._short_path(location_frame.filename)}:{location_frame.lineno} in {location_frame.name}",
+            "stack": "".join(traceback.format_list(stack[start:][-self.STACK_DEPTH:]))
+        }
+    
+    @staticmethod
+    def _short_path(path):
+        """Shorten a path relative to the working directory when possible"""
+        try:
+            relative = os.path.relpath(path)
+        except ValueError:
+            return path
+        return path if relative.startswith("..") else relative
+    
+    def _record_stall(self, lag, capture):
+        """Add a stall to the handler table"""
+        self.stalls += 1
+        LOOP_STALLS.inc()
+        
+        if capture is None:
+            # Ended before the watchdog got to look at it
+            capture = {"handler": "unknown", "location": None, "stack": None}
+        else:
+            logger.warning(
+                f"Event loop blocked for {lag:.3f}s by {capture['handler']} at {capture['location']}"
+            )
+        
+        stats = self.handlers.get(capture["handler"])
+        if stats is None:
+            if len(self.handlers) >= self.MAX_HANDLERS:
+                least = min(self.handlers, key=lambda name: self.handlers[name]["total"])
+                del self.handlers[least]
+            stats = self.handlers[capture["handler"]] = {"count": 0, "total": 0.0, "max": 0.0}
+        
+        stats["count"] += 1
+        stats["total"] += lag
+        if lag >= stats["max"]:
+            stats["max"] = lag
+            stats["location"] = capture["location"]
+            stats["stack"] = capture["stack"]
+        stats["last_seen"] = time.time()
+    
+    def top_handlers(self, limit=10):
+        """Get the handlers that blocked the loop the longest in total"""
+        ranked = sorted(self.handlers.items(), key=lambda item: item[1]["total"], reverse=True)
+        return [{"handler": name, **stats} for name, stats in ranked[:limit]]
+    
+    def report(self, limit=10):
+        """Summary of the loop's health for the debug command and endpoint"""
+        return {
+            "running": self.running,
+            "threshold_seconds": self.THRESHOLD,
+            "last_lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+            "stalls": self.stalls,
+            "top_handlers": self.top_handlers(limit)
+        }
+
+# One event loop runs the bot, so the whole process shares one monitor
+MONITOR = LoopMonitor()
@@ -0,0 +1,249 @@
+"""
+Prometheus-style metrics
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text format for the /metrics endpoint. Every metric caps how
+many label combinations it tracks; once the cap is hit, new combinations are
+folded into a single "other" series so a bad label can't grow memory or
+scrape size without bound. Has no dependencies so it can be used anywhere.
+"""
+
+import re
+import math
+import time
+import asyncio
+import functools
+import threading
+from urllib.parse import urlsplit
+
+# Label value used for combinations past a metric's series limit
+OVERFLOW_LABEL = "other"
+# Default series limit per metric
+MAX_SERIES = 200
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _escape_label(value):
+    """Escape a label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    """Format a sample value for the text format"""
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _format_labels(names, values, extra=None):
+    """Format a label set, with an optional extra pre-formatted pair"""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base class handling label validation and the series limit"""
+    
+    type_name = None
+    
+    def __init__(self, name, help_text, labelnames=(), max_series=MAX_SERIES):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        """Turn label keyword arguments into a series key, folding overflow into one series"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        if key not in self._series and len(self._series) >= self.max_series:
+            key = (OVERFLOW_LABEL,) * len(self.labelnames)
+        return key
+    
+    def render(self):
+        """Render this metric's lines in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in sorted(series):
+            lines.extend(self._render_series(key, value))
+        return lines
+    
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(Metric):
+    """Value that only goes up"""
+    
+    type_name = "counter"
+    
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a function at scrape time"""
+    
+    type_name = "gauge"
+    
+    def __init__(self, name, help_text, labelnames=(), max_series=MAX_SERIES):
+        super().__init__(name, help_text, labelnames, max_series)
+        self._function = None
+    
+    def set(self, value, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+    
+    def clear(self):
+        """Drop every series, e.g. before setting the ones that still exist"""
+        with self._lock:
+            self._series.clear()
+    
+    def set_function(self, function):
+        """Read the (unlabelled) value by calling function on every scrape
+        
+        The function may return None to leave the gauge out of the scrape.
+        """
+        self._function = function
+    
+    def render(self):
+        if self._function:
+            try:
+                value = self._function()
+            except Exception:
+                value = None
+            with self._lock:
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    self._series.pop((), None)
+                else:
+                    self._series[()] = value
+        return super().render()
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, max_series=MAX_SERIES):
+        super().__init__(name, help_text, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    def time(self, **labels):
+        """Context manager observing the time spent inside it"""
+        return _Timer(self, labels)
+    
+    def _render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together on /metrics"""
+    
+    def __init__(self):
+        self.metrics = {}
+    
+    def _register(self, metric_class, name, *args, **kwargs):
+        # Asking for an existing name returns the same metric, so modules can share them
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+        return metric
+    
+    def counter(self, name, help_text, labelnames=(), **kwargs):
+        return self._register(Counter, name, help_text, labelnames, **kwargs)
+    
+    def gauge(self, name, help_text, labelnames=(), **kwargs):
+        return self._register(Gauge, name, help_text, labelnames, **kwargs)
+    
+    def histogram(self, name, help_text, labelnames=(), **kwargs):
+        return self._register(Histogram, name, help_text, labelnames, **kwargs)
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+# Registry shared by the whole process
+REGISTRY = MetricsRegistry()
+
+# Content type of REGISTRY.render() output
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def time_calls(histogram, label_name):
+    """Decorator factory timing calls into histogram, labelled with the function name
+    
+    Works on both plain and async functions.
+    """
+    def decorator(function):
+        labels = {label_name: function.__name__}
+        
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return function(*args, **kwargs)
+        return wrapper
+    
+    return decorator
+
+# Path segments that are IDs, collapsed so each endpoint is one label value
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+def endpoint_label(url):
+    """Reduce a URL to host and path with IDs replaced, e.g. groups.roblox.com/v1/groups/:id/roles"""
+    parts = urlsplit(url)
+    path = "/".join(":id" if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    return f"{parts.hostname or ''}{path}"
@@ -0,0 +1,176 @@
+"""
+Rank code matching for nickname generation
+
+Roblox group rank names are mapped to the short codes used in nicknames
+(e.g. "Lieutenant General" -> "LTGEN"). Servers can add their own codes on
+top of the defaults.
+"""
+
+import re
+
+# Mapping of rank names to standardized codes
+DEFAULT_RANK_CODES = {
+    # Military ranks (general structure)
+    "Owner": "OWN",
+    "Co-Owner": "COWN",
+    "President": "PRES",
+    "Vice President": "VPRES",
+    "Commander in Chief": "CIC",
+    "Commander": "CMD",
+    "Chief of Defence Staff": "CDS",
+    "Chief of Staff": "COS",
+    "Executive Officer": "XO",
+    "Director": "DIR",
+    "General": "GEN",
+    "Lieutenant General": "LTGEN",
+    "Major General": "MJGEN",
+    "Brigadier General": "BGEN",
+    "Colonel": "COL",
+    "Lieutenant Colonel": "LTCOL",
+    "Major": "MAJ",
+    "Captain": "CAPT",
+    "Lieutenant": "LT",
+    "Second Lieutenant": "2LT",
+    "Officer Cadet": "OCDT",
+    "Warrant Officer": "WO",
+    "Staff Sergeant": "SSGT",
+    "Sergeant": "SGT",
+    "Corporal": "CPL",
+    "Lance Corporal": "LCPL",
+    "Private First Class": "PFC",
+    "Private": "PVT",
+    "Recruit": "RCT",
+    # Admin ranks
+    "Administrator": "ADMN",
+    "Moderator": "MOD",
+    "Trial Moderator": "TMOD",
+    "Developer": "DEV",
+    "Builder": "BLDR",
+    # Default fallback for any other ranks
+    "Member": "MBR"
+}
+
+class RankCodeMatcher:
+    """Precompiled matcher from rank names to rank codes
+    
+    Known ranks are kept in a lowercase table for exact matches and compiled
+    into a single overlapping-match pattern for partial matches, so one pass
+    over a rank name finds every known rank it contains. The longest one wins,
+    so "Lieutenant General" never matches as "Lieutenant". Results are memoized
+    per rank name, and matchers for servers' custom codes are built once and
+    kept on the matcher they extend.
+    """
+    
+    # Memoized results are dropped once this many rank names are cached
+    MAX_CACHE_SIZE = 4096
+    
+    # Custom-code matchers are dropped once this many code sets are cached
+    MAX_CUSTOM_MATCHERS = 128
+    
+    def __init__(self, rank_codes):
+        """Compile the matcher
+        
+        Args:
+            rank_codes: Mapping of rank names to codes; earlier entries win ties
+        """
+        self._rank_codes = dict(rank_codes)
+        self._exact = {}
+        self._order = {}
+        self._cache = {}
+        self._custom_matchers = {}
+        
+        for rank_name, code in rank_codes.items():
+            lowered = rank_name.lower()
+            if lowered and lowered not in self._exact:
+                self._order[lowered] = len(self._order)
+                self._exact[lowered] = code
+        
+        # A lookahead reports a match at every position; longer ranks are
+        # tried first so each position yields its longest known rank
+        known_ranks = sorted(self._exact, key=len, reverse=True)
+        self._pattern = None
+        if known_ranks:
+            self._pattern = re.compile(
+                "(?=(" + "|".join(re.escape(rank) for rank in known_ranks) + "))"
+            )
+        
+        # Shortest first, so a fragment like "Lieut" maps to the closest rank
+        self._shortest_first = sorted(self._exact, key=len)
+    
+    def with_custom_codes(self, custom_codes):
+        """Get the matcher for a server's custom codes layered over this one
+        
+        Args:
+            custom_codes: Optional mapping of rank names to codes for the server
+            
+        Returns:
+            RankCodeMatcher: This matcher if there are no custom codes, else a
+            shared matcher where the custom codes win over this one's
+        """
+        if not custom_codes:
+            return self
+        
+        # Only as costly as the server's own codes, not the whole table
+        key = frozenset(custom_codes.items())
+        matcher = self._custom_matchers.get(key)
+        if matcher is None:
+            # Custom codes come first so they win over the base table on ties
+            rank_codes = dict(sorted(custom_codes.items()))
+            rank_codes.update(
+                (rank_name, code) for rank_name, code in self._rank_codes.items()
+                if rank_name not in rank_codes
+            )
+            matcher = RankCodeMatcher(rank_codes)
+            if len(self._custom_matchers) >= self.MAX_CUSTOM_MATCHERS:
+                self._custom_matchers.clear()
+            self._custom_matchers[key] = matcher
+        return matcher
+    
+    def match(self, rank_name):
+        """Convert a rank name to a standardized code"""
+        if not rank_name:
+            return None
+        
+        code = self._cache.get(rank_name)
+        if code is None:
+            code = self._match(rank_name)
+            if len(self._cache) >= self.MAX_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[rank_name] = code
+        return code
+    
+    def _match(self, rank_name):
+        """Match a rank name without the memo"""
+        lowered = rank_name.lower()
+        
+        # Exact (case-insensitive) match
+        code = self._exact.get(lowered)
+        if code is not None:
+            return code
+        
+        # Longest known rank contained in the rank name
+        if self._pattern is not None:
+            best = None
+            for found in self._pattern.finditer(lowered):
+                rank = found.group(1)
+                if (
+                    best is None
+                    or len(rank) > len(best)
+                    or (len(rank) == len(best) and self._order[rank] < self._order[best])
+                ):
+                    best = rank
+            if best is not None:
+                return self._exact[best]
+        
+        # Rank name is part of a known rank (e.g. "Lieut")
+        for rank in self._shortest_first:
+            if lowered in rank:
+                return self._exact[rank]
+        
+        # If no match found, use first 3-4 characters of the rank name as a code
+        if len(rank_name) >= 4:
+            return rank_name[:4].upper()
+        return rank_name.upper()
+
+# Matcher for the default table, shared by every verification system
+DEFAULT_RANK_MATCHER = RankCodeMatcher(DEFAULT_RANK_CODES)
@@ -0,0 +1,205 @@
+"""
+Background rank-change poller
+
+Checks the Roblox group roles of verified members a batch at a time and
+updates the nicknames of members whose rank changed since the last check.
+The batch size and poll interval adapt to how often Roblox rate limits us.
+"""
+
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+class RankPoller:
+    """Polls group roles in rotating batches and pushes nickname updates"""
+    
+    # Seconds between poll cycles when Roblox is not rate limiting us
+    BASE_INTERVAL = 60
+    MAX_INTERVAL = 600
+    # Users looked up per cycle, shared between all guilds
+    MIN_BATCH_SIZE = 5
+    MAX_BATCH_SIZE = 200
+    BATCH_INCREASE = 5
+    # Candidate Discord IDs checked per verified member wanted in a batch
+    CANDIDATE_FACTOR = 5
+    
+    def __init__(self, bot, verification_system):
+        self.bot = bot
+        self.verification_system = verification_system
+        self.roblox_api = verification_system.roblox_api
+        
+        self.batch_size = 20
+        self.interval = self.BASE_INTERVAL
+        # Last Discord ID checked in each guild
+        self.cursors = {}
+        # Last guild polled, so a cycle that can't reach every guild resumes after it
+        self.guild_cursor = 0
+        self.stats = {
+            "cycles": 0,
+            "checked": 0,
+            "changed": 0,
+            "updated": 0
+        }
+    
+    async def run_cycle(self):
+        """Poll one batch of members across all guilds with a group configured"""
+        guilds = []
+        for guild in self.bot.guilds:
+            server_config = self.bot.config.get_server_config(guild.id)
+            if server_config.get("group_id"):
+                guilds.append((guild, server_config))
+        
+        if not guilds:
+            return
+        
+        rate_limited_before = self.roblox_api.rate_limited_count
+        
+        # Start after the last guild polled, so with more guilds than the batch
+        # allows for every guild still gets its turn in a later cycle
+        guilds.sort(key=lambda entry: entry[0].id)
+        start = bisect_right([guild.id for guild, _ in guilds], self.guild_cursor)
+        guilds = guilds[start:] + guilds[:start]
+        
+        # Never look up more users in a cycle than the batch size
+        budget = self.batch_size
+        for index, (guild, server_config) in enumerate(guilds):
+            if budget <= 0:
+                break
+            
+            limit = max(1, budget // (len(guilds) - index))
+            try:
+                budget -= await self.poll_guild(guild, server_config, limit)
+            except Exception as e:
+                logger.error(f"Error polling ranks for guild {guild.id}: {e}")
+                budget -= limit
+            self.guild_cursor = guild.id
+        
+        self.stats["cycles"] += 1
+        self._adjust_budget(self.roblox_api.rate_limited_count - rate_limited_before)
+    
+    async def poll_guild(self, guild, server_config, limit):
+        """Check the next batch of verified members in a guild
+        
+        Returns:
+            int: Number of users looked up on Roblox
+        """
+        # Import the database models here to avoid circular imports
+        from app import app, db
+        from models import RankSnapshot
+        
+        group_id = server_config.get("group_id")
+        verifications = self._next_batch(guild, limit)
+        if not verifications:
+            return 0
+        
+        roles = await self.roblox_api.get_user_group_roles(
+            [verification[1] for verification in verifications],
+            group_id
+        )
+        self.stats["checked"] += len(roles)
+        
+        # Diff against the stored snapshot; a changed rank is only stored once
+        # the nickname was updated, so a failed update is retried next time round
+        changed = []
+        with app.app_context():
+            snapshots = {
+                snapshot.roblox_id: snapshot
+                for snapshot in RankSnapshot.query.filter(
+                    RankSnapshot.guild_id == guild.id,
+                    RankSnapshot.roblox_id.in_(list(roles))
+                ).all()
+            }
+            
+            for discord_id, roblox_id, roblox_username in verifications:
+                if roblox_id not in roles:
+                    continue  # Lookup failed, try again next time round
+                
+                role = roles[roblox_id]
+                role_id = role["id"] if role else None
+                snapshot = snapshots.get(roblox_id)
+                
+                if snapshot is None:
+                    # First time we see this user, just record a baseline
+                    db.session.add(RankSnapshot(guild_id=guild.id, roblox_id=roblox_id, role_id=role_id))
+                elif snapshot.role_id != role_id:
+                    changed.append((discord_id, roblox_id, roblox_username, role_id))
+            
+            if db.session.new:
+                db.session.commit()
+        
+        self.stats["changed"] += len(changed)
+        
+        updated = []
+        for discord_id, roblox_id, roblox_username, role_id in changed:
+            member = guild.get_member(discord_id)
+            if not member:
+                continue
+            
+            success, result = await self.verification_system.update_nickname(
+                member,
+                roblox_username,
+                group_id,
+                server_config.get("rank_codes")
+            )
+            if success:
+                updated.append((roblox_id, role_id))
+                self.stats["updated"] += 1
+                logger.info(f"Rank change for {member.name} in guild {guild.id}, nickname now {result}")
+            else:
+                logger.warning(f"Could not update nickname of {member.name} in guild {guild.id}, will retry: {result}")
+        
+        if updated:
+            with app.app_context():
+                for roblox_id, role_id in updated:
+                    RankSnapshot.query.filter_by(guild_id=guild.id, roblox_id=roblox_id).update({"role_id": role_id})
+                db.session.commit()
+        
+        return len(verifications)
+    
+    def _next_batch(self, guild, limit):
+        """Get the next verified members after the guild's cursor
+        
+        Returns:
+            list: (discord_id, roblox_id, roblox_username) tuples
+        """
+        # Import the database models here to avoid circular imports
+        from app import app
+        from models import RobloxVerification
+        
+        member_ids = sorted(member.id for member in guild.members if not member.bot)
+        if not member_ids:
+            return []
+        
+        cursor = self.cursors.get(guild.id, 0)
+        start = bisect_right(member_ids, cursor)
+        if start >= len(member_ids):
+            start = 0  # Wrap around to the start of the member list
+        
+        candidates = member_ids[start:start + limit * self.CANDIDATE_FACTOR]
+        with app.app_context():
+            rows = RobloxVerification.query.filter(
+                RobloxVerification.discord_id.in_(candidates)
+            ).order_by(RobloxVerification.discord_id).limit(limit).all()
+            batch = [(row.discord_id, row.roblox_id, row.roblox_username) for row in rows]
+        
+        # Move past every candidate checked, or just past the batch if it filled up
+        if len(batch) == limit:
+            self.cursors[guild.id] = batch[-1][0]
+        else:
+            self.cursors[guild.id] = candidates[-1]
+        
+        return batch
+    
+    def _adjust_budget(self, rate_limited):
+        """Shrink the batch on rate limits and grow it slowly otherwise"""
+        if rate_limited:
+            self.batch_size = max(self.MIN_BATCH_SIZE, self.batch_size // 2)
+            self.interval = min(self.MAX_INTERVAL, self.interval * 2)
+            logger.warning(
+                f"Rank poller hit {rate_limited} rate limits, batch size now {self.batch_size}, "
+                f"interval {self.interval}s"
+            )
+        else:
+            self.batch_size = min(self.MAX_BATCH_SIZE, self.batch_size + self.BATCH_INCREASE)
+            self.interval = max(self.BASE_INTERVAL, self.interval // 2)
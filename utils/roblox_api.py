@@ -1,41 +1,65 @@
 import os
+import time
+import asyncio
 import logging
 import aiohttp
 from aiohttp.client_exceptions import ClientError
+from utils.metrics import REGISTRY, endpoint_label
+from utils.tracing import TRACER
+from utils.roblox_fake import get_shared_backend
 
 logger = logging.getLogger(__name__)
 
+REQUEST_SECONDS = REGISTRY.histogram(
+    "roblox_request_duration_seconds",
+    "Time spent on Roblox API requests",
+    ["endpoint", "method", "status"]
+)
+
 class RobloxAPI:
-    def __init__(self):
-        self.base_url = "https://api.roblox.com"
-        self.users_base_url = "https://users.roblox.com"
-        self.groups_base_url = "https://groups.roblox.com"
-        self.thumbnails_base_url = "https://thumbnails.roblox.com"
+    def __init__(self, api_root=None):
+        # Every request goes to api_root instead of the roblox.com hosts when
+        # set, e.g. the local stand-in server used by the benchmarks
+        self.api_root = (api_root or os.environ.get("ROBLOX_API_ROOT") or "").rstrip("/") or None
+        self.base_url = self._url("api", "")
+        self.users_base_url = self._url("users", "")
+        self.groups_base_url = self._url("groups", "")
+        self.thumbnails_base_url = self._url("thumbnails", "")
         
         # Cache for user IDs and usernames
         self.username_to_id_cache = {}
         self.id_to_username_cache = {}
         
-        # Flag to enable simulation mode instead of real API calls
-        # Set to False to use real API calls
-        self.simulation_mode = False
-        logger.info("Using real Roblox API for all operations")
-        
-        # Simulate some group roles for testing
-        self.simulated_roles = {
-            # For any group ID, return these roles
-            "default": [
-                {"id": 1, "name": "Guest", "rank": 1},
-                {"id": 2, "name": "Member", "rank": 2},
-                {"id": 3, "name": "Admin", "rank": 3},
-                {"id": 4, "name": "Officer", "rank": 4},
-                {"id": 5, "name": "Manager", "rank": 5},
-                {"id": 6, "name": "Owner", "rank": 6}
-            ]
-        }
-        
-        # Simulate user data
-        self.simulated_users = {}
+        # Short-lived cache of group memberships, plus lookups in progress so
+        # concurrent callers for the same user share one request
+        self.user_groups_cache = {}
+        self.user_groups_cache_ttl = 60
+        self._user_groups_pending = {}
+        
+        # Running request counters, used by background jobs to pace themselves
+        self.request_count = 0
+        self.rate_limited_count = 0
+        
+        # Fake backend answering requests instead of the network (see
+        # utils.roblox_fake), shared by every client when ROBLOX_FAKE_BACKEND is set
+        self.backend = get_shared_backend() if os.environ.get("ROBLOX_FAKE_BACKEND") else None
+        if self.backend is None:
+            logger.info("Using real Roblox API for all operations")
+    
+    @property
+    def simulation_mode(self):
+        """Whether requests go to a fake backend instead of Roblox"""
+        return self.backend is not None
+    
+    @simulation_mode.setter
+    def simulation_mode(self, enabled):
+        self.backend = get_shared_backend() if enabled else None
+    
+    def _url(self, subdomain, path):
+        """Build the URL of a Roblox endpoint, honouring api_root"""
+        if self.api_root:
+            return f"{self.api_root}{path}"
+        return f"https://{subdomain}.roblox.com{path}"
     
     async def make_request(self, url, method="GET", headers=None, data=None, params=None, token=None):
         """Make a request to the Roblox API"""
@@ -72,7 +96,7 @@ class RobloxAPI:
         # Use a non-standard port for the request
         # This can help bypass some network restrictions
         url_parts = url.split('://')
-        if len(url_parts) > 1:
+        if len(url_parts) > 1 and not self.api_root:
             scheme = url_parts[0]
             host_path = url_parts[1].split('/', 1)
             host = host_path[0]
@@ -82,8 +106,24 @@ class RobloxAPI:
             modified_url = f"https://{host}/{path}"
             url = modified_url
         
+        started_at = time.perf_counter()
+        status = "error"
+        span = TRACER.start_span("roblox.request", method=method, endpoint=endpoint_label(url))
         try:
             logger.info(f"Making {method} request to {url}")
+            self.request_count += 1
+            
+            if self.backend is not None:
+                response = await self.backend.request(method, url, data=data, params=params, headers=headers)
+                status = response.status
+                if response.status == 200:
+                    return response.data
+                
+                logger.error(f"Error {response.status} from simulated Roblox API: {response.data}")
+                if response.status == 429:
+                    self.rate_limited_count += 1
+                return None
+            
             # Use a longer timeout for stability
             timeout = aiohttp.ClientTimeout(total=30)
             
@@ -106,6 +146,7 @@ class RobloxAPI:
                     json=data,
                     params=params,
                 ) as response:
+                    status = response.status
                     if response.status == 200:
                         try:
                             return await response.json()
@@ -130,6 +171,7 @@ class RobloxAPI:
                         elif response.status == 404:
                             logger.error(f"Resource not found at {url}")
                         elif response.status == 429:
+                            self.rate_limited_count += 1
                             logger.error("Rate limit exceeded. Please try again later.")
                         
                         return None
@@ -142,6 +184,14 @@ class RobloxAPI:
         except Exception as e:
             logger.error(f"Request to {url} failed: {e}")
             return None
+        finally:
+            TRACER.end_span(span, status=status)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at,
+                endpoint=endpoint_label(url),
+                method=method,
+                status=status
+            )
     
     async def get_csrf_token(self, token):
         """Get CSRF token for Roblox API requests that require authentication"""
@@ -164,6 +214,10 @@ class RobloxAPI:
             "Referer": "https://www.roblox.com/"
         }
         
+        if self.backend is not None:
+            response = await self.backend.request("POST", f"{self.base_url}/csrf-token", headers=headers)
+            return response.headers.get("x-csrf-token", "") if response.status == 403 else ""
+        
         # Configure SSL context to be less strict
         ssl_context = None
         try:
@@ -180,10 +234,10 @@ class RobloxAPI:
         # Try multiple different endpoints in order
         endpoints = [
             f"{self.base_url}/csrf-token",
-            "https://auth.roblox.com/v2/logout", 
-            "https://accountsettings.roblox.com/v1/email",
-            "https://auth.roblox.com/v1/account/pin",
-            "https://economy.roblox.com/v1/user/currency"
+            self._url("auth", "/v2/logout"),
+            self._url("accountsettings", "/v1/email"),
+            self._url("auth", "/v1/account/pin"),
+            self._url("economy", "/v1/user/currency")
         ]
         
         conn = aiohttp.TCPConnector(ssl=ssl_context)
@@ -211,7 +265,7 @@ class RobloxAPI:
                 
                 # Try a direct get to the site to see if we can connect at all
                 try:
-                    async with session.get("https://www.roblox.com/", headers={
+                    async with session.get(self._url("www", "/"), headers={
                         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Roblox Discord Bot"
                     }) as test_response:
                         if test_response.status == 200:
@@ -238,30 +292,6 @@ class RobloxAPI:
         if username in self.username_to_id_cache:
             return self.username_to_id_cache[username]
             
-        # If in simulation mode, simulate user ID generation
-        if self.simulation_mode:
-            # Generate a consistent user ID from the username
-            import hashlib
-            # Create a hash of the username and use first 10 digits as the ID
-            hash_obj = hashlib.md5(username.encode())
-            user_id = int(hash_obj.hexdigest(), 16) % 10000000000
-            
-            logger.info(f"SIMULATION: Generating user ID {user_id} for username {username}")
-            
-            # Store in the simulated users dictionary
-            self.simulated_users[username] = {
-                "id": user_id,
-                "name": username,
-                "displayName": username,
-                "groups": []  # No groups by default
-            }
-            
-            # Cache the result
-            self.username_to_id_cache[username] = user_id
-            self.id_to_username_cache[user_id] = username
-            return user_id
-        
-        # If not in simulation mode, use the real API
         url = f"{self.users_base_url}/v1/usernames/users"
         data = {
             "usernames": [username],
@@ -328,72 +358,104 @@ class RobloxAPI:
     
     async def get_group_info(self, group_id):
         """Get information about a group"""
-        # If in simulation mode, return simulated group info
-        if self.simulation_mode:
-            logger.info(f"SIMULATION: Getting info for group {group_id}")
-            return {
-                "id": int(group_id),
-                "name": f"Simulated Group {group_id}",
-                "description": "This is a simulated group for testing purposes",
-                "owner": {
-                    "id": 1234567890,
-                    "username": "SimulatedOwner"
-                },
-                "memberCount": 42,
-                "created": "2023-01-01T00:00:00Z"
-            }
-            
-        # If not in simulation mode, use the real API
         url = f"{self.groups_base_url}/v1/groups/{group_id}"
         return await self.make_request(url)
     
-    async def get_user_groups(self, user_id):
-        """Get all groups a user is in"""
-        # If in simulation mode, check/create simulated user groups
-        if self.simulation_mode:
-            logger.info(f"SIMULATION: Getting groups for user {user_id}")
-            
-            # Find the username for this user ID to get their data
-            username = None
-            for name, data in self.simulated_users.items():
-                if data.get("id") == user_id:
-                    username = name
+    async def get_user_groups(self, user_id, use_cache=True):
+        """Get all groups a user is in
+        
+        Results are cached for user_groups_cache_ttl seconds. Failed lookups
+        return an empty list and are not cached.
+        """
+        groups = await self._get_user_groups_cached(user_id, use_cache)
+        return groups if groups is not None else []
+    
+    async def get_users_groups(self, user_ids, concurrency=5, use_cache=True):
+        """Get the groups of many users
+        
+        Roblox has no endpoint for several users' groups, so lookups run
+        concurrently (bounded by concurrency) and go through the groups cache.
+        
+        Returns:
+            dict: user ID -> list of groups. Users whose lookup failed are left out.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def lookup(user_id):
+            async with semaphore:
+                return user_id, await self._get_user_groups_cached(user_id, use_cache)
+        
+        results = await asyncio.gather(*(lookup(user_id) for user_id in set(user_ids)))
+        return {user_id: groups for user_id, groups in results if groups is not None}
+    
+    async def get_user_group_roles(self, user_ids, group_id, concurrency=5, use_cache=True):
+        """Get the roles of many users in one group
+        
+        Returns:
+            dict: user ID -> role dict (id, name, rank), or None if the user is
+                not in the group. Users whose lookup failed are left out.
+        """
+        roles = {}
+        for user_id, groups in (await self.get_users_groups(user_ids, concurrency, use_cache)).items():
+            roles[user_id] = None
+            for group in groups:
+                if str(group["group"]["id"]) == str(group_id):
+                    roles[user_id] = group["role"]
                     break
-            
-            # If user doesn't exist in simulation, create a new user entry
-            if not username:
-                username = f"SimUser{user_id}"
-                self.simulated_users[username] = {
-                    "id": user_id,
-                    "name": username,
-                    "displayName": username,
-                    "groups": []
-                }
-            
-            # If user doesn't have groups yet, add them to the default group
-            user_data = self.simulated_users[username]
-            if not user_data.get("groups"):
-                # Add this user to the default group with default role
-                user_data["groups"] = [
-                    {
-                        "group": {
-                            "id": 123456,
-                            "name": "Default Simulated Group",
-                            "memberCount": 42
-                        },
-                        "role": {
-                            "id": 2,  # Member role ID
-                            "name": "Member",
-                            "rank": 2
-                        }
-                    }
-                ]
-                self.simulated_users[username] = user_data
-                
-            # Format the response to match Roblox API format
-            return user_data.get("groups", [])
-            
-        # If not in simulation mode, use the real API
+        return roles
+    
+    async def get_user_group_ranks(self, user_ids, group_id, concurrency=5):
+        """Get the rank names of many users in one group
+        
+        Returns:
+            dict: user ID -> rank name, or None if the user is not in the group.
+                Users whose lookup failed are left out.
+        """
+        roles = await self.get_user_group_roles(user_ids, group_id, concurrency)
+        return {user_id: role["name"] if role else None for user_id, role in roles.items()}
+    
+    def invalidate_user_groups(self, user_id=None):
+        """Drop cached group memberships for one user, or for everyone"""
+        if user_id is None:
+            self.user_groups_cache.clear()
+        else:
+            self.user_groups_cache.pop(str(user_id), None)
+    
+    async def _get_user_groups_cached(self, user_id, use_cache=True):
+        """Get a user's groups through the cache, or None if the lookup failed"""
+        cache_key = str(user_id)
+        if use_cache:
+            cached = self.user_groups_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        
+        # Join a lookup that is already in flight for this user
+        pending = self._user_groups_pending.get(cache_key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_user_groups(user_id))
+            self._user_groups_pending[cache_key] = pending
+            pending.add_done_callback(lambda _: self._user_groups_pending.pop(cache_key, None))
+        
+        groups = await asyncio.shield(pending)
+        if groups is not None:
+            self.user_groups_cache[cache_key] = (time.monotonic() + self.user_groups_cache_ttl, groups)
+            if len(self.user_groups_cache) > 10000:
+                self._prune_user_groups_cache()
+        return groups
+    
+    def _prune_user_groups_cache(self):
+        """Remove expired group membership entries"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self.user_groups_cache.items() if expires_at <= now]
+        for key in expired:
+            del self.user_groups_cache[key]
+        
+        # Everything is still fresh, so start over rather than rescanning on every insert
+        if len(self.user_groups_cache) > 10000:
+            self.user_groups_cache.clear()
+    
+    async def _fetch_user_groups(self, user_id):
+        """Fetch all groups a user is in, or None if the request failed"""
         url = f"{self.groups_base_url}/v2/users/{user_id}/groups/roles"
         
         response = await self.make_request(url)
@@ -401,7 +463,7 @@ class RobloxAPI:
         if response and "data" in response:
             return response["data"]
         
-        return []
+        return None
     
     async def get_user_group_rank(self, user_id, group_id):
         """Get a user's rank in a specific group"""
@@ -425,80 +487,13 @@ class RobloxAPI:
     
     async def rank_user_in_group(self, user_id, group_id, rank_id, token, attempt=1):
         """Change a user's rank in a group with fallback to alternative endpoints"""
-        # If in simulation mode, use simulated ranking
-        if self.simulation_mode:
-            logger.info(f"SIMULATION: Ranking user {user_id} in group {group_id} to role ID {rank_id}")
-            
-            # Find the username for this user ID
-            username = None
-            for name, data in self.simulated_users.items():
-                if data.get("id") == user_id:
-                    username = name
-                    break
-            
-            # If user doesn't exist in simulation, create a new user entry
-            if not username:
-                username = f"SimUser{user_id}"
-                self.simulated_users[username] = {
-                    "id": user_id,
-                    "name": username,
-                    "displayName": username,
-                    "groups": []
-                }
-            
-            # Get the user's data
-            user_data = self.simulated_users[username]
-            
-            # Find the specified group in user's groups
-            group_found = False
-            groups = user_data.get("groups", [])
-            
-            # Get the role info from simulated roles
-            roles = self.simulated_roles.get("default", [])
-            role_info = None
-            
-            for role in roles:
-                if role["id"] == int(rank_id):
-                    role_info = role
-                    break
-            
-            if not role_info:
-                logger.error(f"SIMULATION: Role ID {rank_id} not found in simulated roles")
-                return False
-            
-            # Update the user's group role or add them to the group
-            for i, group in enumerate(groups):
-                if str(group["group"]["id"]) == str(group_id):
-                    groups[i]["role"] = role_info
-                    group_found = True
-                    break
-            
-            # If user is not in this group yet, add them
-            if not group_found:
-                groups.append({
-                    "group": {
-                        "id": int(group_id),
-                        "name": f"Simulated Group {group_id}",
-                        "memberCount": 42
-                    },
-                    "role": role_info
-                })
-            
-            # Update the user data
-            user_data["groups"] = groups
-            self.simulated_users[username] = user_data
-            
-            logger.info(f"SIMULATION: Successfully ranked user {user_id} to role {rank_id} ({role_info['name']}) in group {group_id}")
-            return True
-            
-        # If not in simulation mode, use real API with fallback methods
         # Primary API endpoint
         url = f"{self.groups_base_url}/v1/groups/{group_id}/users/{user_id}"
         data = {"roleId": rank_id}
         
         # Alternative URLs for backup attempts
-        alt_url_1 = f"https://groups.roblox.com/v1/groups/{group_id}/users/{user_id}/role"
-        alt_url_2 = f"https://www.roblox.com/groups/api/change-member-rank"
+        alt_url_1 = self._url("groups", f"/v1/groups/{group_id}/users/{user_id}/role")
+        alt_url_2 = self._url("www", "/groups/api/change-member-rank")
         
         # Clean up token if needed
         if token.startswith(".ROBLOSECURITY="):
@@ -547,39 +542,46 @@ class RobloxAPI:
         # Make the request manually to get more detailed error information
         try:
             logger.info(f"Attempting to rank user with method {attempt} to URL: {current_url}")
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
-                    method=method,
-                    url=current_url,
-                    json=current_data,
-                    headers=headers,
-                    timeout=20  # Longer timeout for ranking
-                ) as response:
-                    # Log detailed response information
-                    response_text = await response.text()
-                    
-                    # Check if the request was successful
-                    if response.status == 200:
-                        logger.info(f"Successfully ranked user {user_id} to role {rank_id} in group {group_id} (method {attempt})")
-                        return True
-                    else:
-                        logger.error(f"Failed to rank user {user_id} in group {group_id}. Status: {response.status}")
-                        logger.error(f"Response body: {response_text}")
-                        
-                        # If this is the first or second attempt and we get an error, try the next method
-                        if attempt < 3:
-                            logger.info(f"Retrying with alternative method (attempt {attempt + 1})")
-                            return await self.rank_user_in_group(user_id, group_id, rank_id, token, attempt + 1)
-                        
-                        # Log specific error details on final attempt
-                        if response.status == 401:
-                            logger.error("Authentication failed - token may be invalid or expired")
-                        elif response.status == 403:
-                            logger.error("Permission denied - check if the authenticated user has ranking permissions")
-                        elif response.status == 400:
-                            logger.error("Bad request - role ID may be invalid or user cannot be ranked to this role")
-                        
-                        return False
+            if self.backend is not None:
+                response = await self.backend.request(method, current_url, data=current_data, headers=headers)
+                status = response.status
+                response_text = str(response.data)
+            else:
+                async with aiohttp.ClientSession() as session:
+                    async with session.request(
+                        method=method,
+                        url=current_url,
+                        json=current_data,
+                        headers=headers,
+                        timeout=20  # Longer timeout for ranking
+                    ) as response:
+                        # Log detailed response information
+                        status = response.status
+                        response_text = await response.text()
+            
+            # Check if the request was successful
+            if status == 200:
+                logger.info(f"Successfully ranked user {user_id} to role {rank_id} in group {group_id} (method {attempt})")
+                self.invalidate_user_groups(user_id)
+                return True
+            else:
+                logger.error(f"Failed to rank user {user_id} in group {group_id}. Status: {status}")
+                logger.error(f"Response body: {response_text}")
+                
+                # If this is the first or second attempt and we get an error, try the next method
+                if attempt < 3:
+                    logger.info(f"Retrying with alternative method (attempt {attempt + 1})")
+                    return await self.rank_user_in_group(user_id, group_id, rank_id, token, attempt + 1)
+                
+                # Log specific error details on final attempt
+                if status == 401:
+                    logger.error("Authentication failed - token may be invalid or expired")
+                elif status == 403:
+                    logger.error("Permission denied - check if the authenticated user has ranking permissions")
+                elif status == 400:
+                    logger.error("Bad request - role ID may be invalid or user cannot be ranked to this role")
+                
+                return False
         except aiohttp.ClientConnectorError as e:
             logger.error(f"Connection error while ranking user (method {attempt}): {e}")
             # Try next method if available
@@ -604,15 +606,6 @@ class RobloxAPI:
     
     async def get_group_roles(self, group_id):
         """Get all roles in a group"""
-        # If in simulation mode, return simulated roles
-        if self.simulation_mode:
-            logger.info(f"SIMULATION: Getting roles for group {group_id}")
-            
-            # Return our simulated roles for all group IDs
-            roles = self.simulated_roles.get("default", [])
-            return roles
-            
-        # If not in simulation mode, use the real API
         url = f"{self.groups_base_url}/v1/groups/{group_id}/roles"
         
         response = await self.make_request(url)
@@ -624,36 +617,6 @@ class RobloxAPI:
         
     async def get_authenticated_user(self, token):
         """Get information about the authenticated user from token"""
-        # If in simulation mode, return simulated authenticated user
-        if self.simulation_mode:
-            logger.info(f"SIMULATION: Validating Roblox token")
-            
-            # Extract the first 8 characters of the token to simulate a consistent user
-            # This allows different tokens to simulate different users
-            sim_user_id = 0
-            sim_username = "RankerCBA"  # Default username if token is empty
-            
-            if token:
-                # Clean up token if it includes the full cookie format
-                if token.startswith(".ROBLOSECURITY="):
-                    token = token.replace(".ROBLOSECURITY=", "")
-                token = token.strip().strip('"\'')
-                
-                # Use the first few characters to determine a simulated user ID
-                from hashlib import md5
-                hash_obj = md5(token[:8].encode() if len(token) >= 8 else token.encode())
-                sim_user_id = int(hash_obj.hexdigest(), 16) % 10000000000
-                sim_username = f"SimUser{sim_user_id}"
-            
-            # Create a simulated authenticated user response
-            logger.info(f"SIMULATION: Successfully authenticated as Roblox user: {sim_username}")
-            return {
-                "id": sim_user_id,
-                "name": sim_username,
-                "displayName": sim_username
-            }
-            
-        # If not in simulation mode, use the real API
         # Clean up token if it includes the full cookie format
         if token.startswith(".ROBLOSECURITY="):
             token = token.replace(".ROBLOSECURITY=", "")
@@ -662,12 +625,12 @@ class RobloxAPI:
         token = token.strip().strip('"\'')
         
         # Use our more robust make_request method
-        url = "https://users.roblox.com/v1/users/authenticated"
+        url = self._url("users", "/v1/users/authenticated")
         
         # Try multiple endpoints in case one fails
         alternative_urls = [
-            "https://www.roblox.com/my/profile/json",  # Alternative endpoint
-            "https://accountinformation.roblox.com/v1/description", # Another alternative
+            self._url("www", "/my/profile/json"),  # Alternative endpoint
+            self._url("accountinformation", "/v1/description"), # Another alternative
         ]
         
         # First try main endpoint
@@ -696,7 +659,7 @@ class RobloxAPI:
                     
                 elif 'description' in alt_data:  # accountinformation endpoint
                     # We need to make another request to get the user info
-                    me_data = await self.make_request("https://users.roblox.com/v1/users/authenticated", 
+                    me_data = await self.make_request(self._url("users", "/v1/users/authenticated"), 
                                                     headers=None, token=token)
                     if me_data and 'name' in me_data:
                         logger.info(f"Successfully authenticated via secondary attempt as: {me_data['name']}")
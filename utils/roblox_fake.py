@@ -0,0 +1,375 @@
+"""
+Fake Roblox backend
+
+An in-process stand-in for the Roblox web API that RobloxAPI can use instead
+of the network. It answers the same endpoints with the same JSON shapes, so
+every RobloxAPI method works unchanged against it.
+
+Data is generated on demand from a seed rather than stored: user N is
+"SimUser<N>" and their groups are derived from the seed and their ID, so a
+backend with millions of users costs no memory until something changes.
+Changes (rank updates, profile descriptions, users registered by name) are
+kept in dictionaries keyed by ID and name, so every lookup is direct.
+
+Latency, server errors and 429 rate limiting can be injected for load tests.
+
+Enable it for the whole bot by setting ROBLOX_FAKE_BACKEND=1; the other
+ROBLOX_FAKE_* variables read by FakeRobloxBackend.from_env tune it.
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import random
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Roles every generated group has, lowest rank first
+DEFAULT_ROLE_NAMES = ["Guest", "Member", "Admin", "Officer", "Manager", "Owner"]
+
+# Prefix of generated usernames; "SimUser42" is user 42
+USERNAME_PREFIX = "SimUser"
+
+# IDs given to users registered by name live above this, out of the generated range
+REGISTERED_ID_BASE = 10_000_000_000
+
+class FakeResponse:
+    """Status, JSON body and headers of a fake API response"""
+    
+    __slots__ = ("status", "data", "headers")
+    
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = data if data is not None else {}
+        self.headers = headers or {}
+
+def _error(status, code, message):
+    return FakeResponse(status, {"errors": [{"code": code, "message": message}]})
+
+class FakeRobloxBackend:
+    """Seeded, indexed fake of the Roblox users, groups and thumbnails APIs"""
+    
+    def __init__(self, seed=1, user_count=1_000_000, group_count=10_000, groups_per_user=5,
+                 primary_group_id=None, primary_group_share=0.5, auto_register=True,
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0):
+        self.seed = seed
+        self.user_count = user_count
+        self.group_count = group_count
+        self.groups_per_user = min(groups_per_user, group_count)
+        # A group (e.g. the one a staging server is set up with) that a share
+        # of all users belong to, on top of their generated groups
+        self.primary_group_id = int(primary_group_id) if primary_group_id else None
+        self.primary_group_share = primary_group_share
+        # Whether unknown usernames are created on first lookup, like the old simulation mode
+        self.auto_register = auto_register
+        
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._fault_rng = random.Random(seed)
+        
+        # Users registered by name, indexed both ways
+        self._registered_ids = {}
+        self._registered_names = {}
+        # Changes on top of the generated data, keyed by user ID
+        self._descriptions = {}
+        self._memberships = {}
+        
+        self.csrf_token = hashlib.sha1(f"{seed}:csrf".encode()).hexdigest()
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0}
+        
+        self._routes = [
+            ("POST", re.compile(r"^/v1/usernames/users$"), self._usernames_to_users),
+            ("POST", re.compile(r"^/v1/users$"), self._users_by_ids),
+            ("GET", re.compile(r"^/v1/users/authenticated$"), self._authenticated_user),
+            ("GET", re.compile(r"^/v1/users/avatar$"), self._avatar_thumbnails),
+            ("GET", re.compile(r"^/v1/users/(\d+)$"), self._user),
+            ("GET", re.compile(r"^/v1/groups/(\d+)$"), self._group_info),
+            ("GET", re.compile(r"^/v1/groups/(\d+)/roles$"), self._group_roles),
+            ("GET", re.compile(r"^/v2/users/(\d+)/groups/roles$"), self._user_groups),
+            ("PATCH", re.compile(r"^/v1/groups/(\d+)/users/(\d+)$"), self._set_role),
+            ("POST", re.compile(r"^/v1/groups/(\d+)/users/(\d+)/role$"), self._set_role),
+            ("POST", re.compile(r"^/groups/api/change-member-rank$"), self._change_member_rank),
+            ("GET", re.compile(r"^/my/profile/json$"), self._profile_json),
+            ("POST", re.compile(r"^/(csrf-token|v2/logout|v1/email|v1/account/pin|v1/user/currency)$"), self._csrf_probe)
+        ]
+    
+    @classmethod
+    def from_env(cls):
+        """Configure from the ROBLOX_FAKE_* environment variables"""
+        def number(name, default, kind=float):
+            try:
+                return kind(os.environ.get(name, default))
+            except ValueError:
+                return default
+        
+        return cls(
+            seed=number("ROBLOX_FAKE_SEED", 1, int),
+            user_count=number("ROBLOX_FAKE_USERS", 1_000_000, int),
+            group_count=number("ROBLOX_FAKE_GROUPS", 10_000, int),
+            groups_per_user=number("ROBLOX_FAKE_GROUPS_PER_USER", 5, int),
+            primary_group_id=os.environ.get("ROBLOX_FAKE_PRIMARY_GROUP") or None,
+            latency=number("ROBLOX_FAKE_LATENCY_MS", 0.0) / 1000,
+            jitter=number("ROBLOX_FAKE_JITTER_MS", 0.0) / 1000,
+            error_rate=number("ROBLOX_FAKE_ERROR_RATE", 0.0),
+            rate_limit_rate=number("ROBLOX_FAKE_RATE_LIMIT_RATE", 0.0)
+        )
+    
+    # Generated data
+    
+    def _rng(self, kind, key):
+        """Random generator for one piece of data, the same on every run"""
+        return random.Random(f"{self.seed}:{kind}:{key}")
+    
+    def user_exists(self, user_id):
+        return 1 <= user_id <= self.user_count or user_id in self._registered_names
+    
+    def username(self, user_id):
+        """Username of a user, or None if there is no such user"""
+        if 1 <= user_id <= self.user_count:
+            return f"{USERNAME_PREFIX}{user_id}"
+        return self._registered_names.get(user_id)
+    
+    def user_id(self, username):
+        """ID of a username, registering unknown names when auto_register is on"""
+        key = username.lower()
+        user_id = self._registered_ids.get(key)
+        if user_id is not None:
+            return user_id
+        
+        prefix = USERNAME_PREFIX.lower()
+        if key.startswith(prefix) and key[len(prefix):].isdigit():
+            generated_id = int(key[len(prefix):])
+            if 1 <= generated_id <= self.user_count and key == f"{prefix}{generated_id}":
+                return generated_id
+        
+        if not self.auto_register:
+            return None
+        return self.register_user(username)
+    
+    def register_user(self, username):
+        """Add a user with a stable ID derived from their name"""
+        digest = int(hashlib.md5(username.lower().encode()).hexdigest(), 16)
+        user_id = REGISTERED_ID_BASE + digest % REGISTERED_ID_BASE
+        self._registered_ids[username.lower()] = user_id
+        self._registered_names[user_id] = username
+        return user_id
+    
+    def description(self, user_id):
+        return self._descriptions.get(user_id, f"Simulated profile of {self.username(user_id)}")
+    
+    def set_description(self, user_id, description):
+        """Change a user's profile description, e.g. to hold a verification code"""
+        self._descriptions[int(user_id)] = description
+    
+    def group_exists(self, group_id):
+        return 1 <= group_id <= self.group_count or group_id == self.primary_group_id
+    
+    def group_roles(self, group_id):
+        return [
+            {"id": group_id * 100 + rank, "name": name, "rank": rank}
+            for rank, name in enumerate(DEFAULT_ROLE_NAMES, start=1)
+        ]
+    
+    def group_info(self, group_id):
+        rng = self._rng("group", group_id)
+        return {
+            "id": group_id,
+            "name": f"Simulated Group {group_id}",
+            "description": "This is a simulated group for testing purposes",
+            "owner": {"id": 1, "username": f"{USERNAME_PREFIX}1"},
+            "memberCount": rng.randint(10, 100_000),
+            "publicEntryAllowed": True
+        }
+    
+    def memberships(self, user_id):
+        """A user's groups as group ID -> role; changes are stored, the rest is generated"""
+        memberships = self._memberships.get(user_id)
+        if memberships is not None:
+            return memberships
+        
+        memberships = {}
+        if 1 <= user_id <= self.user_count:
+            rng = self._rng("memberships", user_id)
+            group_ids = rng.sample(range(1, self.group_count + 1), self.groups_per_user)
+            if self.primary_group_id and rng.random() < self.primary_group_share:
+                group_ids.append(self.primary_group_id)
+            for group_id in group_ids:
+                # Nobody is generated as a group owner
+                memberships[group_id] = rng.choice(self.group_roles(group_id)[:-1])
+        return memberships
+    
+    def set_role(self, user_id, group_id, role):
+        memberships = dict(self.memberships(user_id))
+        memberships[group_id] = role
+        self._memberships[user_id] = memberships
+    
+    # Request handling
+    
+    async def request(self, method, url, data=None, params=None, headers=None):
+        """Answer one API request
+        
+        Returns:
+            FakeResponse: Status, JSON body and headers
+        """
+        self.stats["requests"] += 1
+        
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self._fault_rng.gauss(self.latency, self.jitter)))
+        
+        roll = self._fault_rng.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            response = _error(429, 0, "Too many requests")
+            response.headers["Retry-After"] = "1"
+            return response
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.stats["errors_injected"] += 1
+            return _error(500, 0, "InternalServerError")
+        
+        path = urlsplit(url).path.rstrip("/") or "/"
+        for route_method, pattern, handler in self._routes:
+            if route_method == method.upper():
+                match = pattern.match(path)
+                if match:
+                    return handler(match, data or {}, params or {}, headers or {})
+        return _error(404, 0, "NotFound")
+    
+    def _usernames_to_users(self, match, data, params, headers):
+        users = []
+        for username in data.get("usernames", []):
+            user_id = self.user_id(str(username))
+            if user_id is not None:
+                name = self.username(user_id)
+                users.append({"requestedUsername": username, "id": user_id, "name": name, "displayName": name})
+        return FakeResponse(200, {"data": users})
+    
+    def _users_by_ids(self, match, data, params, headers):
+        users = []
+        for user_id in data.get("userIds", []):
+            user_id = int(user_id)
+            if self.user_exists(user_id):
+                name = self.username(user_id)
+                users.append({"id": user_id, "name": name, "displayName": name})
+        return FakeResponse(200, {"data": users})
+    
+    def _user(self, match, data, params, headers):
+        user_id = int(match.group(1))
+        if not self.user_exists(user_id):
+            return _error(404, 3, "The user id is invalid.")
+        name = self.username(user_id)
+        return FakeResponse(200, {
+            "id": user_id,
+            "name": name,
+            "displayName": name,
+            "description": self.description(user_id),
+            "created": "2020-01-01T00:00:00Z",
+            "isBanned": False
+        })
+    
+    def _token_user(self, headers):
+        """The user a .ROBLOSECURITY cookie belongs to, or None without one"""
+        cookie = headers.get("Cookie", "")
+        if ".ROBLOSECURITY=" not in cookie:
+            return None
+        token = cookie.split(".ROBLOSECURITY=", 1)[1]
+        # Like the old simulation mode, the first characters pick the user
+        digest = int(hashlib.md5(token[:8].encode()).hexdigest(), 16)
+        return self.user_id(f"{USERNAME_PREFIX}{digest % self.user_count + 1}")
+    
+    def _authenticated_user(self, match, data, params, headers):
+        user_id = self._token_user(headers)
+        if user_id is None:
+            return _error(401, 0, "Authorization has been denied for this request.")
+        name = self.username(user_id)
+        return FakeResponse(200, {"id": user_id, "name": name, "displayName": name})
+    
+    def _profile_json(self, match, data, params, headers):
+        user_id = self._token_user(headers)
+        if user_id is None:
+            return _error(401, 0, "Authorization has been denied for this request.")
+        name = self.username(user_id)
+        return FakeResponse(200, {"UserId": user_id, "Username": name, "DisplayName": name})
+    
+    def _avatar_thumbnails(self, match, data, params, headers):
+        size = params.get("size", "420x420")
+        image_format = params.get("format", "png")
+        thumbnails = []
+        for user_id in str(params.get("userIds", "")).split(","):
+            if user_id.strip().isdigit():
+                thumbnails.append({
+                    "targetId": int(user_id),
+                    "state": "Completed" if self.user_exists(int(user_id)) else "Blocked",
+                    "imageUrl": f"https://tr.rbxcdn.com/simulated/{user_id}/{size}/AvatarHeadshot/{image_format.capitalize()}"
+                })
+        return FakeResponse(200, {"data": thumbnails})
+    
+    def _group_info(self, match, data, params, headers):
+        group_id = int(match.group(1))
+        if not self.group_exists(group_id):
+            return _error(400, 1, "Group is invalid or does not exist.")
+        return FakeResponse(200, self.group_info(group_id))
+    
+    def _group_roles(self, match, data, params, headers):
+        group_id = int(match.group(1))
+        if not self.group_exists(group_id):
+            return _error(400, 1, "Group is invalid or does not exist.")
+        return FakeResponse(200, {"groupId": group_id, "roles": self.group_roles(group_id)})
+    
+    def _user_groups(self, match, data, params, headers):
+        user_id = int(match.group(1))
+        if not self.user_exists(user_id):
+            return _error(400, 3, "The user is invalid or does not exist.")
+        groups = [
+            {
+                "group": {"id": group_id, "name": f"Simulated Group {group_id}", "memberCount": self.group_info(group_id)["memberCount"]},
+                "role": role
+            }
+            for group_id, role in self.memberships(user_id).items()
+        ]
+        return FakeResponse(200, {"data": groups})
+    
+    def _csrf_probe(self, match, data, params, headers):
+        """Roblox answers unauthenticated writes with 403 and a fresh CSRF token"""
+        return FakeResponse(403, {"errors": [{"code": 0, "message": "Token Validation Failed"}]},
+                            {"x-csrf-token": self.csrf_token})
+    
+    def _rank(self, group_id, user_id, role_id, headers):
+        if headers.get("X-CSRF-TOKEN") != self.csrf_token:
+            return self._csrf_probe(None, None, None, headers)
+        if self._token_user(headers) is None:
+            return _error(401, 0, "Authorization has been denied for this request.")
+        if not self.group_exists(group_id):
+            return _error(400, 1, "The group is invalid or does not exist.")
+        if group_id not in self.memberships(user_id):
+            return _error(400, 3, "The user is invalid or does not exist.")
+        
+        role = next((role for role in self.group_roles(group_id) if role["id"] == role_id), None)
+        if not role:
+            return _error(400, 2, "The roleset is invalid or does not exist.")
+        
+        self.set_role(user_id, group_id, role)
+        return FakeResponse(200, {})
+    
+    def _set_role(self, match, data, params, headers):
+        return self._rank(int(match.group(1)), int(match.group(2)), int(data.get("roleId", 0)), headers)
+    
+    def _change_member_rank(self, match, data, params, headers):
+        return self._rank(int(data.get("groupId", 0)), int(data.get("userId", 0)), int(data.get("roleSetId", 0)), headers)
+
+_shared_backend = None
+
+def get_shared_backend():
+    """The process-wide backend, so every RobloxAPI sees the same fake data"""
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = FakeRobloxBackend.from_env()
+        logger.info(
+            f"Using the fake Roblox backend ({_shared_backend.user_count} users, "
+            f"{_shared_backend.group_count} groups, seed {_shared_backend.seed})"
+        )
+    return _shared_backend
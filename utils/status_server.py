@@ -0,0 +1,297 @@
+"""
+Shared status and health HTTP server
+
+Serves the status page hosting platforms like Render need for port binding,
+plus /metrics for Prometheus scrapes.
+It runs on an asyncio event loop (the bot's own loop, or a single background
+loop for non-async processes) with aiohttp, and answers requests from a
+snapshot that is refreshed every few seconds instead of being rebuilt on
+every hit. Only depends on aiohttp so the standalone bots can use it too.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import hmac
+import logging
+import threading
+from datetime import datetime
+from html import escape
+
+from aiohttp import web
+
+from utils.metrics import REGISTRY, CONTENT_TYPE
+from utils.loop_monitor import MONITOR
+from utils.tracing import TRACER
+from utils.cluster import shard_status
+
+logger = logging.getLogger(__name__)
+
+# Port used when the PORT environment variable is not set
+DEFAULT_PORT = 9000
+# Port tried if the first one is taken
+FALLBACK_PORT = 8080
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
+        h1 {{ color: #5865F2; }}
+        .status {{ padding: 20px; border-radius: 5px; background-color: #f0f0f0; }}
+        .online {{ color: green; }}
+        .offline {{ color: #721c24; }}
+        td {{ padding: 2px 16px 2px 0; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <div class="status">
+        <p><strong>Status:</strong> <span class="{status_class}">{status}</span></p>
+        <table>{rows}</table>
+    </div>
+    <p>This web server exists to satisfy port binding requirements for hosting platforms.
+    <a href="/status">JSON</a> &middot; <a href="/healthz">Health check</a></p>
+</body>
+</html>
+"""
+
+class StatusServer:
+    """aiohttp server for /, /status and /healthz backed by a cached snapshot"""
+    
+    # Seconds between snapshot refreshes
+    REFRESH_INTERVAL = 5
+    
+    def __init__(self, title="ForCorn Bot Status", health_check=None):
+        """
+        Args:
+            title: Heading of the HTML page
+            health_check: Optional function returning False when /healthz should fail
+        """
+        self.title = title
+        self.health_check = health_check
+        self.started_at = time.time()
+        # (name, source) pairs, each source a function returning a JSON-safe value
+        self.sources = []
+        
+        self.snapshot = {}
+        self.snapshot_json = b"{}"
+        self.page = b""
+        self.etag = None
+        
+        self.port = None
+        self.runner = None
+        self.refresh_task = None
+    
+    def add_source(self, source, name=None):
+        """Add a section to the snapshot, computed by calling source()
+        
+        Without a name, the dict returned by source is merged into the top level.
+        """
+        self.sources.append((name, source))
+    
+    def refresh(self):
+        """Rebuild the snapshot, its JSON and HTML renderings and ETag"""
+        snapshot = {"status": "online", "uptime_seconds": int(time.time() - self.started_at)}
+        for name, source in self.sources:
+            try:
+                value = source()
+            except Exception as e:
+                logger.error(f"Status source {name or source} failed: {e}")
+                continue
+            
+            if name is None:
+                snapshot.update(value)
+            else:
+                snapshot[name] = value
+        snapshot["updated_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        
+        self.snapshot = snapshot
+        self.snapshot_json = json.dumps(snapshot, sort_keys=True, default=str).encode()
+        self.page = self._render(snapshot).encode()
+        self.etag = '"' + hashlib.sha1(self.snapshot_json).hexdigest()[:16] + '"'
+    
+    def _render(self, snapshot):
+        """Render the snapshot as the HTML status page"""
+        rows = "".join(
+            f"<tr><td><strong>{escape(str(key))}</strong></td><td>{escape(self._format_value(value))}</td></tr>"
+            for key, value in snapshot.items()
+            if key != "status"
+        )
+        status = str(snapshot.get("status", "unknown"))
+        return PAGE_TEMPLATE.format(
+            title=escape(self.title),
+            status=escape(status.capitalize()),
+            status_class="online" if status in ("online", "running") else "offline",
+            rows=rows
+        )
+    
+    @staticmethod
+    def _format_value(value):
+        """Format one snapshot value for the HTML page"""
+        if isinstance(value, dict):
+            return ", ".join(f"{key}: {item}" for key, item in value.items()) or "-"
+        if value is None:
+            return "N/A"
+        return str(value)
+    
+    def _cached_response(self, request, body, content_type):
+        """Answer from the cached snapshot, or with 304 if the client has it"""
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type=content_type, charset="utf-8", headers=headers)
+    
+    async def handle_page(self, request):
+        """Serve the HTML status page"""
+        return self._cached_response(request, self.page, "text/html")
+    
+    async def handle_status(self, request):
+        """Serve the snapshot as JSON"""
+        return self._cached_response(request, self.snapshot_json, "application/json")
+    
+    async def handle_healthz(self, request):
+        """Cheap liveness check that never touches the snapshot"""
+        if self.health_check and not self.health_check():
+            return web.Response(status=503, text="unhealthy")
+        return web.Response(text="ok")
+    
+    async def handle_metrics(self, request):
+        """Serve the metrics registry in the Prometheus text format"""
+        return web.Response(body=REGISTRY.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+    
+    @staticmethod
+    def _check_debug_token(request):
+        """Hide debug endpoints unless DEBUG_TOKEN is set and given"""
+        token = os.environ.get("DEBUG_TOKEN")
+        given = request.headers.get("X-Debug-Token") or request.query.get("token")
+        # Compared as bytes, since compare_digest rejects non-ASCII strings
+        if not token or not given or not hmac.compare_digest(given.encode(), token.encode()):
+            raise web.HTTPNotFound()
+    
+    async def handle_debug_loop(self, request):
+        """Serve the event loop monitor report"""
+        self._check_debug_token(request)
+        return web.json_response(MONITOR.report(), dumps=lambda data: json.dumps(data, default=str))
+    
+    async def handle_debug_traces(self, request):
+        """Serve the slowest recent sampled traces"""
+        self._check_debug_token(request)
+        try:
+            limit = min(100, int(request.query.get("limit", 20)))
+        except ValueError:
+            limit = 20
+        return web.json_response(TRACER.slowest(limit), dumps=lambda data: json.dumps(data, default=str))
+    
+    async def _refresh_loop(self):
+        """Keep the snapshot fresh while the server runs"""
+        while True:
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing status snapshot: {e}")
+    
+    async def start(self, port=None):
+        """Start serving on the running event loop
+        
+        Uses the PORT environment variable if no port is given, and falls
+        back to FALLBACK_PORT if that port is taken.
+        """
+        if port is None:
+            port = int(os.environ.get("PORT", DEFAULT_PORT))
+        
+        app = web.Application()
+        app.router.add_get("/", self.handle_page)
+        app.router.add_get("/status", self.handle_status)
+        app.router.add_get("/healthz", self.handle_healthz)
+        app.router.add_get("/health", self.handle_healthz)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/debug/loop", self.handle_debug_loop)
+        app.router.add_get("/debug/traces", self.handle_debug_traces)
+        
+        self.refresh()
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        
+        for candidate in dict.fromkeys((port, FALLBACK_PORT)):
+            try:
+                await web.TCPSite(self.runner, "0.0.0.0", candidate).start()
+                self.port = candidate
+                break
+            except OSError as e:
+                logger.error(f"Failed to start status server on port {candidate}: {e}")
+        else:
+            await self.runner.cleanup()
+            self.runner = None
+            return False
+        
+        self.refresh_task = asyncio.create_task(self._refresh_loop())
+        logger.info(f"Status server started on port {self.port}")
+        return True
+    
+    async def stop(self):
+        """Stop serving"""
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+    
+    def start_in_thread(self, port=None):
+        """Run the server on its own event loop in a daemon thread
+        
+        For processes without an asyncio loop of their own. Returns once the
+        server is listening or has failed to start.
+        """
+        ready = threading.Event()
+        
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            started = loop.run_until_complete(self.start(port))
+            ready.set()
+            if started:
+                loop.run_forever()
+        
+        thread = threading.Thread(target=run, name="status-server", daemon=True)
+        thread.start()
+        ready.wait()
+        return thread
+
+def bot_status(bot):
+    """Snapshot section with the connection state of a discord.py bot"""
+    ready = bot.is_ready()
+    latency = bot.latency
+    return {
+        "status": "online" if ready else "starting",
+        "guilds": len(bot.guilds),
+        "latency_ms": round(latency * 1000) if ready and latency == latency else None
+    }
+
+def bot_queue_depths(bot):
+    """Snapshot section with the background work waiting in the bot's cogs"""
+    depths = {}
+    
+    verification = bot.get_cog("VerificationCommands")
+    if verification:
+        depths["verification_jobs"] = len(verification.verification_system.jobs.jobs)
+        # A job that raised keeps finished=False until /syncall replaces it
+        depths["sync_jobs"] = sum(
+            1 for job in verification.sync_jobs.values() if not job.finished and not job.error
+        )
+        depths["join_screening"] = sum(queue.qsize() for queue in verification.join_screener.queues.values())
+    
+    return depths
+
+def create_bot_status_server(bot, title="ForCorn Bot Status"):
+    """Build a status server reporting on a discord.py bot"""
+    server = StatusServer(title)
+    server.add_source(lambda: bot_status(bot))
+    server.add_source(lambda: bot_queue_depths(bot), "queues")
+    server.add_source(lambda: shard_status(bot), "shards")
+    return server
@@ -0,0 +1,275 @@
+"""
+Sampled request tracing
+
+Follows one command invocation through its Roblox API calls, database calls
+and Discord REST requests as a tree of timed spans. Only a sample of
+invocations is traced (TRACE_SAMPLE_RATE, 0 to 1, off by default); spans
+outside a sampled trace cost a single context lookup. Finished traces are
+written as JSON lines to TRACE_FILE and the slowest recent ones are kept in
+memory for the status server's /debug/traces endpoint.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+import aiohttp
+
+from utils.metrics import endpoint_label
+
+logger = logging.getLogger(__name__)
+
+# Span that new spans become children of, per task
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation within a trace"""
+    
+    __slots__ = (
+        "trace", "span_id", "parent_id", "name", "attributes",
+        "start", "duration", "error", "_started", "_token"
+    )
+    
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self._started = time.perf_counter()
+        self._token = None
+    
+    def set(self, **attributes):
+        """Add attributes to the span"""
+        self.attributes.update(attributes)
+    
+    def to_dict(self):
+        """JSON-safe form of the span"""
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+class Trace:
+    """All the spans recorded for one sampled invocation"""
+    
+    __slots__ = ("trace_id", "root", "spans", "finished")
+    
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.root = None
+        self.spans = []
+        self.finished = False
+    
+    def to_dict(self):
+        """JSON-safe form of the trace with all its spans"""
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": self.root.start,
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+class Tracer:
+    """Starts sampled traces, records their spans and exports finished ones"""
+    
+    # Spans kept per trace; later spans are dropped and counted
+    MAX_SPANS = 500
+    
+    def __init__(self, sample_rate=0.0, export_path=None, buffer_size=200):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        # Recently finished traces, oldest dropped first
+        self.recent = deque(maxlen=buffer_size)
+        self._export_file = None
+    
+    @classmethod
+    def from_env(cls):
+        """Configure from TRACE_SAMPLE_RATE and TRACE_FILE"""
+        try:
+            sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))
+        except ValueError:
+            sample_rate = 0.0
+        return cls(
+            sample_rate=min(1.0, max(0.0, sample_rate)),
+            export_path=os.environ.get("TRACE_FILE", os.path.join("data", "traces.jsonl"))
+        )
+    
+    def start_trace(self, name, **attributes):
+        """Maybe start a trace, making its root span current
+        
+        Returns:
+            Span: The root span, or None if this invocation was not sampled
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        
+        trace = Trace()
+        span = trace.root = Span(trace, name, None, attributes)
+        trace.spans.append(span)
+        _current_span.set(span)
+        return span
+    
+    def finish_trace(self, span, error=None):
+        """End a trace started with start_trace and export it"""
+        if span is None or span.trace.finished:
+            return
+        
+        trace = span.trace
+        trace.finished = True
+        span.duration = time.perf_counter() - span._started
+        span.error = error
+        self.recent.append(trace)
+        self._export(trace)
+    
+    def start_span(self, name, activate=True, **attributes):
+        """Start a child of the current span, if a sampled trace is running
+        
+        With activate, the span becomes current until end_span is called
+        from the same task.
+        
+        Returns:
+            Span: The new span, or None outside a sampled trace
+        """
+        parent = _current_span.get()
+        if parent is None or parent.trace.finished:
+            return None
+        
+        trace = parent.trace
+        span = Span(trace, name, parent.span_id, attributes)
+        if len(trace.spans) < self.MAX_SPANS:
+            trace.spans.append(span)
+        else:
+            trace.root.attributes["dropped_spans"] = trace.root.attributes.get("dropped_spans", 0) + 1
+        
+        if activate:
+            span._token = _current_span.set(span)
+        return span
+    
+    def end_span(self, span, error=None, **attributes):
+        """End a span started with start_span"""
+        if span is None:
+            return
+        
+        span.duration = time.perf_counter() - span._started
+        span.error = error
+        span.attributes.update(attributes)
+        if span._token is not None:
+            _current_span.reset(span._token)
+            span._token = None
+    
+    @contextmanager
+    def span(self, name, **attributes):
+        """Context manager recording a child span around a block"""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            self.end_span(span, error=type(e).__name__)
+            raise
+        else:
+            self.end_span(span)
+    
+    def traced(self, name=None):
+        """Decorator recording a span around every call of a plain or async function"""
+        def decorator(function):
+            span_name = name or function.__qualname__
+            
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+            
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        
+        return decorator
+    
+    def slowest(self, limit=20):
+        """Get the slowest recently finished traces"""
+        traces = sorted(self.recent, key=lambda trace: trace.root.duration, reverse=True)
+        return [trace.to_dict() for trace in traces[:limit]]
+    
+    def _export(self, trace):
+        """Append a finished trace to the export file as one JSON line"""
+        if not self.export_path:
+            return
+        
+        try:
+            if self._export_file is None:
+                directory = os.path.dirname(self.export_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._export_file = open(self.export_path, "a", buffering=1)
+            self._export_file.write(json.dumps(trace.to_dict(), default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not export trace to {self.export_path}: {e}")
+            self.export_path = None
+    
+    def http_trace_config(self, component):
+        """aiohttp TraceConfig recording a span for every request of a session
+        
+        Spans are named "<component>.request" and labelled with the method,
+        endpoint and status.
+        """
+        async def on_request_start(session, context, params):
+            context.span = self.start_span(
+                f"{component}.request",
+                activate=False,
+                method=params.method,
+                endpoint=endpoint_label(str(params.url))
+            )
+        
+        async def on_request_end(session, context, params):
+            self.end_span(context.span, status=params.response.status)
+        
+        async def on_request_exception(session, context, params):
+            self.end_span(context.span, error=type(params.exception).__name__)
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+def read_slowest_traces(path, limit=20, max_lines=5000):
+    """Get the slowest traces among the last lines of an export file"""
+    try:
+        with open(path, "r") as f:
+            lines = deque(f, maxlen=max_lines)
+    except FileNotFoundError:
+        return []
+    
+    traces = []
+    for line in lines:
+        try:
+            traces.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    traces.sort(key=lambda trace: trace.get("duration_ms") or 0, reverse=True)
+    return traces[:limit]
+
+# Tracer shared by the whole process
+TRACER = Tracer.from_env()
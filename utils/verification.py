@@ -4,6 +4,8 @@ import discord
 import logging
 from discord import Embed, Color
 import aiohttp
+from utils.rank_codes import DEFAULT_RANK_CODES, DEFAULT_RANK_MATCHER
+from utils.verification_jobs import VerificationJobQueue
 
 logger = logging.getLogger(__name__)
 
@@ -20,66 +22,19 @@ class VerificationSystem:
     def __init__(self, roblox_api):
         self.roblox_api = roblox_api
         # Mapping of rank names to standardized codes
-        self.rank_codes = {
-            # Military ranks (general structure)
-            "Owner": "OWN",
-            "Co-Owner": "COWN",
-            "President": "PRES",
-            "Vice President": "VPRES",
-            "Commander in Chief": "CIC",
-            "Commander": "CMD",
-            "Chief of Defence Staff": "CDS",
-            "Chief of Staff": "COS",
-            "Executive Officer": "XO",
-            "Director": "DIR",
-            "General": "GEN",
-            "Lieutenant General": "LTGEN",
-            "Major General": "MJGEN",
-            "Brigadier General": "BGEN",
-            "Colonel": "COL",
-            "Lieutenant Colonel": "LTCOL",
-            "Major": "MAJ",
-            "Captain": "CAPT",
-            "Lieutenant": "LT",
-            "Second Lieutenant": "2LT",
-            "Officer Cadet": "OCDT",
-            "Warrant Officer": "WO",
-            "Staff Sergeant": "SSGT",
-            "Sergeant": "SGT",
-            "Corporal": "CPL",
-            "Lance Corporal": "LCPL",
-            "Private First Class": "PFC",
-            "Private": "PVT",
-            "Recruit": "RCT",
-            # Admin ranks
-            "Administrator": "ADMN",
-            "Moderator": "MOD",
-            "Trial Moderator": "TMOD",
-            "Developer": "DEV",
-            "Builder": "BLDR",
-            # Default fallback for any other ranks
-            "Member": "MBR"
-        }
+        self.rank_codes = dict(DEFAULT_RANK_CODES)
+        # Shared compiled matcher; servers' custom codes are layered over it on demand
+        self.rank_matcher = DEFAULT_RANK_MATCHER
+        # Running profile checks, one per Discord user
+        self.jobs = VerificationJobQueue(self)
     
-    def get_rank_code(self, rank_name):
-        """Convert a rank name to a standardized code"""
-        if not rank_name:
-            return None
-            
-        # Check for exact match first
-        if rank_name in self.rank_codes:
-            return self.rank_codes[rank_name]
-        
-        # Check for partial matches
-        for known_rank, code in self.rank_codes.items():
-            if known_rank.lower() in rank_name.lower() or rank_name.lower() in known_rank.lower():
-                return code
+    def get_rank_code(self, rank_name, custom_codes=None):
+        """Convert a rank name to a standardized code
         
-        # If no match found, use first 3-4 characters of the rank name as a code
-        if len(rank_name) >= 4:
-            return rank_name[:4].upper()
-        else:
-            return rank_name.upper()
+        custom_codes is the server's own rank-code map, which takes
+        precedence over the built-in table.
+        """
+        return self.rank_matcher.with_custom_codes(custom_codes).match(rank_name)
     
     def generate_verification_code(self, length=6):
         """Generate a random verification code"""
@@ -129,10 +84,6 @@ class VerificationSystem:
     async def verify_user(self, member, roblox_username, code):
         """Check if the verification code is in the user's Roblox profile"""
         try:
-            # Import the database models here to avoid circular imports
-            from app import db, app
-            from models import RobloxVerification
-            
             # Get user info and check if the code is in their profile
             user_id = await self.roblox_api.get_user_id_from_username(roblox_username)
             if not user_id:
@@ -142,27 +93,7 @@ class VerificationSystem:
             description = await self.roblox_api.get_user_description(user_id)
             
             if code in description:
-                # Store the verification in the database - using app context properly
-                with app.app_context():
-                    # Check if there's already a verification record
-                    existing_verification = RobloxVerification.query.filter_by(discord_id=member.id).first()
-                    
-                    if existing_verification:
-                        # Update existing record
-                        existing_verification.roblox_id = user_id
-                        existing_verification.roblox_username = roblox_username
-                    else:
-                        # Create new record
-                        new_verification = RobloxVerification(
-                            discord_id=member.id,
-                            roblox_id=user_id,
-                            roblox_username=roblox_username
-                        )
-                        db.session.add(new_verification)
-                    
-                    db.session.commit()
-                
-                logger.info(f"User {member.id} verified as Roblox user {roblox_username} (ID: {user_id})")
+                self.save_verification(member, user_id, roblox_username)
                 return True, user_id
             else:
                 return False, "Verification code not found in your profile. Please make sure you added it correctly."
@@ -171,7 +102,62 @@ class VerificationSystem:
             logger.error(f"Error verifying user: {e}")
             return False, "An error occurred while verifying your account. Please try again later."
     
-    async def update_nickname(self, member, roblox_username, group_id=None):
+    def save_verification(self, member, user_id, roblox_username):
+        """Store the link between a Discord member and their Roblox account"""
+        # Import the database models here to avoid circular imports
+        from app import db, app
+        from models import RobloxVerification
+        
+        # Store the verification in the database - using app context properly
+        with app.app_context():
+            # Check if there's already a verification record
+            existing_verification = RobloxVerification.query.filter_by(discord_id=member.id).first()
+            
+            if existing_verification:
+                # Update existing record
+                existing_verification.roblox_id = user_id
+                existing_verification.roblox_username = roblox_username
+            else:
+                # Create new record
+                new_verification = RobloxVerification(
+                    discord_id=member.id,
+                    roblox_id=user_id,
+                    roblox_username=roblox_username
+                )
+                db.session.add(new_verification)
+            
+            db.session.commit()
+        
+        logger.info(f"User {member.id} verified as Roblox user {roblox_username} (ID: {user_id})")
+    
+    def build_nickname(self, roblox_username, rank_name=None, rank_codes=None):
+        """Build the nickname for a Roblox user and their group rank"""
+        # Default format without group rank
+        new_nickname = f"{roblox_username}"
+        
+        # Convert rank name to standardized code
+        rank_code = self.get_rank_code(rank_name, rank_codes) if rank_name else None
+        if rank_code:
+            new_nickname = f"[{rank_code}] {roblox_username}"
+        
+        # Discord has a 32 character nickname limit
+        if len(new_nickname) > 32:
+            # Truncate the username to fit within the limit
+            code_length = len(rank_code) + 3 if rank_code else 0  # 3 for [ ]
+            
+            max_username_length = 32 - code_length
+            truncated_username = roblox_username[:max_username_length]
+            
+            if rank_code:
+                new_nickname = f"[{rank_code}] {truncated_username}"
+            else:
+                new_nickname = truncated_username
+            
+            logger.info(f"Nickname truncated from '{roblox_username}' to '{truncated_username}' due to Discord's 32 character limit")
+        
+        return new_nickname
+    
+    async def update_nickname(self, member, roblox_username, group_id=None, rank_codes=None):
         """Update the nickname of a member based on their Roblox info"""
         try:
             # Import the database models here to avoid circular imports
@@ -193,34 +179,16 @@ class VerificationSystem:
                 if not user_id:
                     return False, "Could not find that Roblox username."
             
-            # Default format without group rank
-            new_nickname = f"{roblox_username}"
-            rank_name = None
-            
             # If group_id is provided, get the user's rank
+            rank_name = None
             if group_id:
-                # Get group rank
                 rank_name = await self.roblox_api.get_user_group_rank(user_id, group_id)
-                if rank_name:
-                    # Convert rank name to standardized code
-                    rank_code = self.get_rank_code(rank_name)
-                    new_nickname = f"[{rank_code}] {roblox_username}"
             
-            # Discord has a 32 character nickname limit
-            if len(new_nickname) > 32:
-                # Truncate the username to fit within the limit
-                rank_code = self.get_rank_code(rank_name) if rank_name else None
-                code_length = len(rank_code) + 3 if rank_code else 0  # 3 for [ ]
-                
-                max_username_length = 32 - code_length
-                truncated_username = roblox_username[:max_username_length]
-                
-                if rank_code:
-                    new_nickname = f"[{rank_code}] {truncated_username}"
-                else:
-                    new_nickname = truncated_username
-                
-                logger.info(f"Nickname truncated from '{roblox_username}' to '{truncated_username}' due to Discord's 32 character limit")
+            new_nickname = self.build_nickname(roblox_username, rank_name, rank_codes)
+            
+            # Nothing to do if the nickname is already correct
+            if member.nick == new_nickname:
+                return True, new_nickname
             
             # Update the nickname
             try:
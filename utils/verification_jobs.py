@@ -0,0 +1,101 @@
+"""
+Verification jobs
+
+Roblox profile edits can take a while to show up, so instead of checking the
+description once per button press, each user gets one background job that
+polls their profile with backoff for a bounded window. Pressing the button
+again while a job is running waits on that same job.
+"""
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class VerificationJob:
+    """Polls one user's Roblox profile for their verification code"""
+    
+    # Seconds to keep checking the profile before giving up
+    POLL_WINDOW = 120
+    # Seconds between checks, doubling after each miss
+    INITIAL_DELAY = 3
+    MAX_DELAY = 20
+    
+    def __init__(self, verification_system, member, roblox_username, code):
+        self.verification_system = verification_system
+        self.roblox_api = verification_system.roblox_api
+        self.member = member
+        self.roblox_username = roblox_username
+        self.code = code
+        
+        self.checks = 0
+        # Set when a job for a newer code takes over
+        self.superseded = False
+        self.task = None
+    
+    async def run(self):
+        """Poll the profile until the code shows up or the window runs out
+        
+        Returns:
+            tuple: (success, roblox_id or error message)
+        """
+        try:
+            user_id = await self.roblox_api.get_user_id_from_username(self.roblox_username)
+            if not user_id:
+                return False, "Could not find that Roblox username."
+            
+            deadline = time.monotonic() + self.POLL_WINDOW
+            delay = self.INITIAL_DELAY
+            while True:
+                self.checks += 1
+                description = await self.roblox_api.get_user_description(user_id)
+                if self.code in (description or ""):
+                    self.verification_system.save_verification(self.member, user_id, self.roblox_username)
+                    return True, user_id
+                
+                if time.monotonic() + delay > deadline:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(self.MAX_DELAY, delay * 2)
+                
+                if self.superseded:
+                    return False, "This verification code was replaced by a newer one."
+            
+            logger.info(f"Verification code for {self.member.id} not found after {self.checks} checks")
+            return False, "Verification code not found in your profile. Please make sure you added it correctly."
+        
+        except Exception as e:
+            logger.error(f"Error verifying user: {e}")
+            return False, "An error occurred while verifying your account. Please try again later."
+
+class VerificationJobQueue:
+    """Keeps at most one running verification job per Discord user"""
+    
+    def __init__(self, verification_system):
+        self.verification_system = verification_system
+        # Running jobs by Discord ID
+        self.jobs = {}
+    
+    def submit(self, member, roblox_username, code):
+        """Start a verification job, or join the one already running for the user
+        
+        Returns:
+            tuple: (job, created) where created is False if an existing job was reused
+        """
+        job = self.jobs.get(member.id)
+        if job and not job.task.done():
+            if job.code == code and job.roblox_username == roblox_username:
+                return job, False
+            job.superseded = True
+        
+        job = VerificationJob(self.verification_system, member, roblox_username, code)
+        job.task = asyncio.create_task(job.run())
+        job.task.add_done_callback(lambda task: self._forget(member.id, job))
+        self.jobs[member.id] = job
+        return job, True
+    
+    def _forget(self, discord_id, job):
+        """Drop a finished job unless a newer one replaced it"""
+        if self.jobs.get(discord_id) is job:
+            del self.jobs[discord_id]
@@ -0,0 +1,202 @@
+"""
+Bulk import and export of verified users
+
+Streams RobloxVerification rows to and from CSV or JSONL files a chunk at a
+time, so servers moving over from another verification bot can bring their
+members along without everyone running /verify again. Imports upsert on
+discord_id in batches; neither direction holds the whole file in memory.
+"""
+
+import csv
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Columns written on export and read on import
+FIELDS = ("discord_id", "roblox_id", "roblox_username", "verified_at")
+
+# Rows per upsert batch and per export fetch
+CHUNK_SIZE = 1000
+
+def detect_format(path):
+    """Work out the file format from its extension"""
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Can't tell the format of {path}, use a .csv or .jsonl file")
+
+def export_verifications(file, fmt, chunk_size=CHUNK_SIZE):
+    """Write every verified user to an open text file
+    
+    Returns:
+        int: Number of rows written
+    """
+    # Import the database models here to avoid circular imports
+    from app import app, db
+    from models import RobloxVerification
+    
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+    
+    count = 0
+    with app.app_context():
+        query = db.select(
+            RobloxVerification.discord_id,
+            RobloxVerification.roblox_id,
+            RobloxVerification.roblox_username,
+            RobloxVerification.verified_at
+        ).order_by(RobloxVerification.id).execution_options(yield_per=chunk_size)
+        
+        for row in db.session.execute(query):
+            record = {
+                "discord_id": row.discord_id,
+                "roblox_id": row.roblox_id,
+                "roblox_username": row.roblox_username,
+                "verified_at": row.verified_at.isoformat() if row.verified_at else None
+            }
+            if writer:
+                writer.writerow(record)
+            else:
+                file.write(json.dumps(record) + "\n")
+            count += 1
+    
+    logger.info(f"Exported {count} verified users")
+    return count
+
+def import_verifications(file, fmt, chunk_size=CHUNK_SIZE):
+    """Upsert verified users from an open text file
+    
+    Existing rows for the same Discord ID are overwritten.
+    
+    Returns:
+        dict: Counts of imported and invalid rows
+    """
+    stats = {"imported": 0, "invalid": 0}
+    
+    if fmt == "csv":
+        records = enumerate(csv.DictReader(file), start=1)
+    else:
+        records = _read_jsonl(file)
+    
+    chunk = {}
+    for line_number, record in records:
+        # Lines that aren't JSON were already logged by _read_jsonl
+        if record is None:
+            stats["invalid"] += 1
+            continue
+        
+        row = _parse_record(record)
+        if row is None:
+            stats["invalid"] += 1
+            logger.warning(f"Skipping invalid row {line_number}: {record}")
+            continue
+        
+        # Later rows for the same Discord ID win, as they would across chunks
+        chunk[row["discord_id"]] = row
+        if len(chunk) >= chunk_size:
+            stats["imported"] += _upsert_chunk(list(chunk.values()))
+            chunk = {}
+    
+    if chunk:
+        stats["imported"] += _upsert_chunk(list(chunk.values()))
+    
+    logger.info(f"Imported verified users: {stats}")
+    return stats
+
+def _read_jsonl(file):
+    """Yield (line number, record) for each non-blank line, with None for lines that aren't JSON"""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            logger.warning(f"Skipping invalid row {line_number}, not valid JSON: {e}")
+            yield line_number, None
+
+def find_discord_ids(roblox_id):
+    """Get the Discord IDs verified as a Roblox account"""
+    # Import the database models here to avoid circular imports
+    from app import app
+    from models import RobloxVerification
+    
+    with app.app_context():
+        rows = RobloxVerification.query.filter_by(roblox_id=roblox_id).all()
+        return [row.discord_id for row in rows]
+
+def _parse_record(record):
+    """Validate one imported record, returning a row dict or None"""
+    try:
+        discord_id = int(record["discord_id"])
+        roblox_id = int(record["roblox_id"])
+        roblox_username = str(record["roblox_username"]).strip()
+    except (KeyError, TypeError, ValueError):
+        return None
+    
+    if discord_id <= 0 or roblox_id <= 0 or not roblox_username or len(roblox_username) > 50:
+        return None
+    
+    verified_at = None
+    if record.get("verified_at"):
+        try:
+            verified_at = datetime.fromisoformat(record["verified_at"])
+        except (TypeError, ValueError):
+            return None
+    
+    return {
+        "discord_id": discord_id,
+        "roblox_id": roblox_id,
+        "roblox_username": roblox_username,
+        "verified_at": verified_at or datetime.utcnow()
+    }
+
+def _upsert_chunk(rows):
+    """Insert or update one batch of rows keyed on discord_id"""
+    # Import the database models here to avoid circular imports
+    from app import app, db
+    from models import RobloxVerification
+    
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            # One executemany relying on the unique discord_id constraint
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            
+            statement = insert(RobloxVerification)
+            statement = statement.on_conflict_do_update(
+                index_elements=["discord_id"],
+                set_={
+                    "roblox_id": statement.excluded.roblox_id,
+                    "roblox_username": statement.excluded.roblox_username,
+                    "verified_at": statement.excluded.verified_at
+                }
+            )
+            db.session.execute(statement, rows)
+        else:
+            # Other databases: update the rows that exist and add the rest
+            existing = {
+                verification.discord_id: verification
+                for verification in RobloxVerification.query.filter(
+                    RobloxVerification.discord_id.in_([row["discord_id"] for row in rows])
+                ).all()
+            }
+            for row in rows:
+                verification = existing.get(row["discord_id"])
+                if verification:
+                    verification.roblox_id = row["roblox_id"]
+                    verification.roblox_username = row["roblox_username"]
+                    verification.verified_at = row["verified_at"]
+                else:
+                    db.session.add(RobloxVerification(**row))
+        
+        db.session.commit()
+    
+    return len(rows)
@@ -57,65 +57,85 @@ models_imported = False
 db = SQLAlchemy(model_class=Base)
 db.init_app(app)
 
-# Import models and initialize database
-with app.app_context():
-    try:
-        # Import models if available
+# Set once init_database has run, whether or not it managed to connect
+database_initialized = False
+
+def init_database():
+    """Import the models and create tables, falling back to SQLite if PostgreSQL fails
+    
+    Runs before the first request rather than at import, so workers boot
+    without waiting on the database.
+    """
+    global db_connected, models_imported, database_initialized
+    
+    if database_initialized:
+        return db_connected
+    database_initialized = True
+    
+    with app.app_context():
         try:
-            import models
-            models_imported = True
-            logger.info("Models imported successfully")
-        except ImportError:
-            logger.warning("Could not import models, database functionality may be limited")
-        
-        # Attempt to create tables
-        db.create_all()
-        logger.info("Database tables created")
-        db_connected = True
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Error initializing database: {error_msg}")
-        
-        # Store the error message for display
-        app.config["DB_ERROR"] = error_msg
-        
-        # If PostgreSQL connection fails, try SQLite as fallback
-        if "postgresql" in database_url.lower() and not os.environ.get("FORCE_POSTGRES", False):
-            logger.info("Attempting to use SQLite as fallback...")
+            # Import models if available
+            try:
+                import models
+                models_imported = True
+                logger.info("Models imported successfully")
+            except ImportError:
+                logger.warning("Could not import models, database functionality may be limited")
             
-            # Close any existing connections
-            db.session.remove()
-            db.engine.dispose()
+            # Attempt to create tables
+            db.create_all()
+            logger.info("Database tables created")
+            db_connected = True
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Error initializing database: {error_msg}")
             
-            # Switch to SQLite
-            fallback_db_url = "sqlite:///app.db"
-            app.config["SQLALCHEMY_DATABASE_URI"] = fallback_db_url
+            # Store the error message for display
+            app.config["DB_ERROR"] = error_msg
             
-            # Reinitialize with SQLite
-            try:
-                # Don't call init_app again, just change the URI
-                if models_imported:
-                    try:
-                        with app.app_context():
-                            db.create_all()
-                            logger.info(f"Successfully switched to SQLite fallback: {fallback_db_url}")
-                            db_connected = True
-                    except:
-                        logger.warning("Could not create tables automatically, trying to reconnect")
-                        # This is a more aggressive approach to reset the SQLAlchemy connection
-                        db.engine.dispose()
-                        db.get_engine(app, bind=None)
-                        with app.app_context():
-                            db.create_all()
-                            logger.info("Successfully recreated engine and created tables")
-                            db_connected = True
-                else:
-                    logger.warning("Models not imported, database functionality will be limited")
-            except Exception as sqlite_error:
-                logger.error(f"SQLite fallback also failed: {sqlite_error}")
-                logger.error("Web application will run with severely limited functionality")
-        else:
-            logger.error("Web application will run with limited functionality")
+            # If PostgreSQL connection fails, try SQLite as fallback
+            if "postgresql" in database_url.lower() and not os.environ.get("FORCE_POSTGRES", False):
+                logger.info("Attempting to use SQLite as fallback...")
+                
+                # Close any existing connections
+                db.session.remove()
+                db.engine.dispose()
+                
+                # Switch to SQLite
+                fallback_db_url = "sqlite:///app.db"
+                app.config["SQLALCHEMY_DATABASE_URI"] = fallback_db_url
+                
+                # Reinitialize with SQLite
+                try:
+                    # Don't call init_app again, just change the URI
+                    if models_imported:
+                        try:
+                            with app.app_context():
+                                db.create_all()
+                                logger.info(f"Successfully switched to SQLite fallback: {fallback_db_url}")
+                                db_connected = True
+                        except:
+                            logger.warning("Could not create tables automatically, trying to reconnect")
+                            # This is a more aggressive approach to reset the SQLAlchemy connection
+                            db.engine.dispose()
+                            db.get_engine(app, bind=None)
+                            with app.app_context():
+                                db.create_all()
+                                logger.info("Successfully recreated engine and created tables")
+                                db_connected = True
+                    else:
+                        logger.warning("Models not imported, database functionality will be limited")
+                except Exception as sqlite_error:
+                    logger.error(f"SQLite fallback also failed: {sqlite_error}")
+                    logger.error("Web application will run with severely limited functionality")
+            else:
+                logger.error("Web application will run with limited functionality")
+    
+    return db_connected
+
+@app.before_request
+def init_database_on_first_request():
+    init_database()
 
 # Routes
 @app.route('/')